@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import subprocess
+import cv2
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.getcwd())
+from src.services.frame_source import FrameSource
+
+# FrameSource "auto" thresholds derived from this benchmark (ffmpeg 7.0, x264 with 3 B-frames;
+# seconds per run, 20s clips except the 90s stride >= GOP rows, median of 3-5 where repeated):
+#
+#   source  GOP  stride   seek    grab  keyframe  ffmpeg
+#   720p     48     1       -     2.51      -      3.14
+#   720p     48     5    14.68    1.76    2.85     2.35
+#   720p     48    30     2.83    2.18    2.05     1.73
+#   720p     48    48    10.19    7.96    9.36       -
+#   720p     48    60     5.42    8.62    6.69       -
+#   720p     48   150     2.56    9.44    2.62       -
+#   1080p   250     1       -     6.89      -      8.02
+#   1080p   250     2       -     6.28      -      4.98
+#   1080p   250     5   118.37    4.28    9.43     5.42
+#   1080p   250    30    20.22    4.92    7.28     5.23
+#   1080p   250   250    22.20   20.15   22.14       -
+#   1080p   250   300     9.33   19.55    9.34       -
+#   1080p   250   750     4.09   16.08    4.06       -
+#   2160p   250     1       -    13.25      -     13.20
+#   2160p   250     2       -    11.22      -      9.90
+#   2160p   250     5       -     9.96      -     10.76
+#   2160p   250    30       -     7.85      -      8.53
+#
+# - stride > GOP: seek (keyframe measures the same, within noise; at exactly one GOP
+#   every seek still re-decodes a whole GOP and grab wins)
+# - ffmpeg only when stride <= FFMPEG_MAX_STRIDE on sources >= FFMPEG_MIN_DIM
+#   (10-20% ahead of grab at stride 2 from 1080p up, level or behind everywhere else)
+# - grab otherwise, including the production stride of 30
+SAMPLES_DIR = "test_output"
+MEDIA_FILES = ["bad1.mp4", "bad2.mp4", "good1.mp4", "good3.mp4"]
+# Synthetic fixtures (H.264 with B-frames) so the benchmark runs without the media set:
+# (name, size, seconds, GOP length, open GOP)
+SYNTHETIC = [
+    ("synth_720p_gop48", "1280x720", 20, 48, False),
+    ("synth_1080p_gop250", "1920x1080", 20, 250, False),
+    ("synth_480p_opengop", "854x480", 20, 50, True),
+]
+STRIDES = [5, 15, 30, 60, 300]
+STRATEGIES = ["seek", "grab", "keyframe", "ffmpeg"]
+# Sampled frames are compared as 64px grayscale thumbnails; FFmpeg scales with
+# its own bilinear filter, so it only has to match within this mean difference
+TOLERANCE = {"seek": 0.0, "keyframe": 0.0, "ffmpeg": 3.0}
+
+def make_synthetic(name, size, seconds, gop, open_gop):
+    output_path = os.path.join(SAMPLES_DIR, f"{name}.mp4")
+    if os.path.exists(output_path):
+        return output_path
+
+    print(f"Generating {output_path}...")
+    os.makedirs(SAMPLES_DIR, exist_ok=True)
+    subprocess.run([
+        "ffmpeg", "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30", "-t", str(seconds),
+        "-c:v", "libx264", "-g", str(gop), "-bf", "3", "-x264-params", f"open-gop={int(open_gop)}",
+        "-pix_fmt", "yuv420p", "-y", output_path
+    ], check=True, capture_output=True)
+    return output_path
+
+def load_fixtures():
+    fixtures = []
+    for media_file in MEDIA_FILES:
+        video_path = os.path.join(SAMPLES_DIR, media_file)
+        if not os.path.exists(video_path):
+            print(f"Skipping {video_path} - not found")
+            continue
+        fixtures.append((media_file, video_path))
+    for name, *params in SYNTHETIC:
+        fixtures.append((name, make_synthetic(name, *params)))
+    return fixtures
+
+def thumbnail(rgb):
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    return cv2.resize(gray, (64, 64 * gray.shape[0] // gray.shape[1]), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+def time_strategy(video_path, stride, strategy):
+    start = time.perf_counter()
+    samples = []
+    with FrameSource(video_path, stride, strategy=strategy) as source:
+        used = source.strategy
+        for frame in source:
+            samples.append((frame.index, thumbnail(frame.rgb)))
+    return time.perf_counter() - start, samples, used
+
+def compare(reference, samples):
+    """Max mean-abs-difference against the sequential decode (inf if the sampled indices differ)"""
+    if [i for i, _ in reference] != [i for i, _ in samples]:
+        return float("inf")
+    return max((float(np.mean(np.abs(a - b))) for (_, a), (_, b) in zip(reference, samples)), default=0.0)
+
+def run_benchmark():
+    results = []
+
+    for name, video_path in load_fixtures():
+        with FrameSource(video_path, 30, strategy="seek") as probe:
+            gop = probe.average_gop
+            total_frames = probe.total_frames
+
+        for stride in STRIDES:
+            with FrameSource(video_path, stride, strategy="auto") as source:
+                auto_choice = source.strategy
+
+            timings, samples, used = {}, {}, {}
+            for strategy in STRATEGIES:
+                timings[strategy], samples[strategy], used[strategy] = time_strategy(video_path, stride, strategy)
+
+            # Sequential decoding is the ground truth for which frame is frame n
+            diffs = {s: compare(samples["grab"], samples[s]) for s in STRATEGIES if s != "grab"}
+            results.append({
+                "media": name,
+                "frames": total_frames,
+                "gop": gop,
+                "stride": stride,
+                "samples": len(samples["grab"]),
+                "timings": timings,
+                "best": min(timings, key=timings.get),
+                "auto": auto_choice,
+                # How far the "auto" choice is from the fastest strategy
+                "auto_ratio": timings[auto_choice] / min(timings.values()),
+                "diffs": diffs,
+                # A strategy that fell back (e.g. no ffmpeg) is compared as what actually ran
+                "ok": all(d <= TOLERANCE[used[s]] for s, d in diffs.items()),
+            })
+
+    # Output Table
+    print("\n" + "="*150)
+    print(f"auto: seek for stride > GOP, ffmpeg for stride <= {FrameSource.FFMPEG_MAX_STRIDE} "
+          f"on sources >= {FrameSource.FFMPEG_MIN_DIM}px, grab otherwise")
+    header = (f"{'Media':<20} | {'Frames':<7} | {'GOP':<6} | {'Stride':<6} | " + " | ".join(f"{s:<9}" for s in STRATEGIES)
+              + f" | {'Best':<9} | {'Auto':<9} | {'Auto/best':<9} | {'Max diff (seek/kf/ffmpeg)':<26} | {'Parity':<6}")
+    print(header)
+    print("-"*150)
+    for r in results:
+        gop_str = f"{r['gop']:.1f}" if r["gop"] else "n/a"
+        cols = " | ".join(f"{r['timings'][s]:<9.2f}" for s in STRATEGIES)
+        diffs = "/".join(f"{r['diffs'][s]:.2f}" for s in ("seek", "keyframe", "ffmpeg"))
+        print(f"{r['media']:<20} | {r['frames']:<7} | {gop_str:<6} | {r['stride']:<6} | {cols} | {r['best']:<9} | {r['auto']:<9} | "
+              f"{r['auto_ratio']:<9.2f} | {diffs:<26} | {'ok' if r['ok'] else 'FAIL':<6}")
+    print("="*150 + "\n")
+
+    if not all(r["ok"] for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    run_benchmark()
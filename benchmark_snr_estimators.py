@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import subprocess
+import librosa
+import numpy as np
+from scipy.stats import spearmanr
+
+# Add project root to path
+sys.path.append(os.getcwd())
+from src.services.clarity_analyzer import ClarityAnalyzer
+from src.models.audio_buffer import AudioBuffer
+
+SAMPLES_DIR = "test_output"
+MEDIA_FILES = ["bad1.mp4", "bad2.mp4", "good1.mp4", "good3.mp4"]
+ESTIMATORS = ["hpss", "percentile"]
+# Synthetic fixtures (known SNR) so the comparison runs without the media set
+SYNTHETIC_SNRS_DB = [0, 5, 10, 20, 30]
+SYNTHETIC_SECONDS = 60
+
+def extract_audio_tmp(input_path):
+    output_path = input_path.replace(".mp4", ".wav")
+    if os.path.exists(output_path):
+        return output_path
+
+    print(f"Extracting {input_path}...")
+    subprocess.run([
+        "ffmpeg", "-i", input_path, "-q:a", "0", "-map", "a", "-y", output_path
+    ], check=True, capture_output=True)
+    return output_path
+
+def synthetic_speech(snr_db, seconds=SYNTHETIC_SECONDS, sr=ClarityAnalyzer.SAMPLE_RATE, seed=0):
+    """Voiced 'syllables' (harmonic stacks, 60% duty) in white noise at the given speech-frame SNR"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 120 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    gate = (np.sin(2 * np.pi * 2.5 * t) > -0.3).astype(float)
+    speech = voiced * gate
+    speech_power = np.mean(speech[gate > 0] ** 2)
+    noise = rng.standard_normal(len(t)) * np.sqrt(speech_power / 10 ** (snr_db / 10))
+    y = speech + noise
+    return (0.5 * y / np.max(np.abs(y))).astype(np.float32)
+
+def load_fixtures():
+    fixtures = []
+    for media_file in MEDIA_FILES:
+        mp4_path = os.path.join(SAMPLES_DIR, media_file)
+        if not os.path.exists(mp4_path):
+            print(f"Skipping {mp4_path} - not found")
+            continue
+        wav_path = extract_audio_tmp(mp4_path)
+        fixtures.append((media_file, None, AudioBuffer.from_file(wav_path)))
+    for snr_db in SYNTHETIC_SNRS_DB:
+        audio = AudioBuffer(synthetic_speech(snr_db), ClarityAnalyzer.SAMPLE_RATE)
+        fixtures.append((f"synth_{snr_db}dB", snr_db, audio))
+    return fixtures
+
+def time_estimator(analyzer, y):
+    """SNR cost on top of the STFT that compute_clarity already shares"""
+    stft = librosa.stft(y, n_fft=analyzer.N_FFT, hop_length=analyzer.HOP_LENGTH)
+    magnitude = np.abs(stft)
+    start = time.perf_counter()
+    snr = analyzer.estimate_snr(y, stft, magnitude)
+    return float(snr), time.perf_counter() - start
+
+def run_benchmark():
+    analyzers = {name: ClarityAnalyzer(snr_estimator=name) for name in ESTIMATORS}
+    results = []
+
+    for name, true_snr, audio in load_fixtures():
+        y = audio.at_rate(ClarityAnalyzer.SAMPLE_RATE)
+        row = {"media": name, "seconds": len(y) / ClarityAnalyzer.SAMPLE_RATE, "true": true_snr}
+        for estimator, analyzer in analyzers.items():
+            row[f"{estimator}_snr"], row[f"{estimator}_time"] = time_estimator(analyzer, y)
+            start = time.perf_counter()
+            report = analyzer.analyze_clarity("", audio)
+            row[f"{estimator}_clarity_time"] = time.perf_counter() - start
+            row[f"{estimator}_score"] = float(report["clarity_score"])
+            row[f"{estimator}_noisy"] = "High background noise" in report["reasons"]
+        results.append(row)
+
+    # Output Table
+    print("\n" + "="*130)
+    print(f"{'Media':<14} | {'Secs':<6} | {'True':<5} | {'HPSS dB':<8} | {'Pctl dB':<8} | {'HPSS s':<7} | {'Pctl s':<7} | "
+          f"{'Clarity HPSS (s)':<17} | {'Clarity Pctl (s)':<17} | {'Noise flag':<10}")
+    print("-"*130)
+    for r in results:
+        true_str = f"{r['true']}" if r["true"] is not None else "n/a"
+        flag = "agree" if r["hpss_noisy"] == r["percentile_noisy"] else "DIFFER"
+        print(f"{r['media']:<14} | {r['seconds']:<6.1f} | {true_str:<5} | {r['hpss_snr']:<8.2f} | {r['percentile_snr']:<8.2f} | "
+              f"{r['hpss_time']:<7.3f} | {r['percentile_time']:<7.3f} | "
+              f"{r['hpss_score']:>6.2f} ({r['hpss_clarity_time']:.2f}s)   | {r['percentile_score']:>6.2f} ({r['percentile_clarity_time']:.2f}s)   | {flag:<10}")
+    print("="*130)
+
+    hpss = np.array([r["hpss_snr"] for r in results])
+    pctl = np.array([r["percentile_snr"] for r in results])
+    speedup = sum(r["hpss_time"] for r in results) / max(sum(r["percentile_time"] for r in results), 1e-9)
+    print(f"SNR speedup (percentile vs hpss): {speedup:.1f}x")
+    if len(results) > 2:
+        print(f"Rank agreement (Spearman): {spearmanr(hpss, pctl).correlation:.3f}")
+    print(f"Mean |hpss - percentile|: {np.mean(np.abs(hpss - pctl)):.2f} dB")
+    print(f"Mean clarity score delta: {np.mean([abs(r['hpss_score'] - r['percentile_score']) for r in results]):.2f}")
+    print(f"Noise flag agreement: {sum(r['hpss_noisy'] == r['percentile_noisy'] for r in results)}/{len(results)}\n")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -7,28 +7,18 @@ from datetime import datetime
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.orm import Session
 from ..entities.analysis import Analysis
+from ..entities.analysis_job import AnalysisJob
 from ..entities.user import User
 from ..services.file_processing import FileProcessingService
-from ..services.filler_word_analyzer import FillerWordAnalyzer
-from ..services.loudness_analyzer import LoudnessAnalyzer
-from ..services.wpm_analyzer import WPMAnalyzer
-from ..services.intonation_analyzer import IntonationAnalyzer
-from ..services.video_analyzer import VideoAnalyzer
-from ..services.topic_coverage_analyzer import TopicCoverageAnalyzer
-from ..services.gesture_analyzer import GestureAnalyzer
-from ..services.conclusion_generator import ConclusionGenerator
-from ..services.clarity_analyzer import ClarityAnalyzer
 from ..utils.response_builder import ResponseBuilder
-from concurrent.futures import ProcessPoolExecutor
-from ..utils.LLM_judge import prepare_gemini_input
-from ..services.gemini_feedback import GeminiFeedbackService
 from ..services.gemini_feedback import FinalFeedback
 from ..services.progress_service import ProgressService
-import functools
+from ..services.result_cache import ResultCache
+from ..services.transcript_cache import TranscriptCache
+from ..services.job_queue import SqlJobQueue
 
-from ..services.analysis_orchestrator import AnalysisOrchestrator
 from ..models.analysis_context import AnalysisContext
-from ..utils.executors import get_cpu_executor
+from ..models.word_prosody import WordProsody
 
 class AnalysisController:
     """Controller for handling file analysis operations"""
@@ -41,27 +31,38 @@ class AnalysisController:
         if not self.assemblyai_key:
             raise ValueError("ASSEMBLYAI_API_KEY environment variable not set")
 
-        # Initialize Services
-        self.file_service = FileProcessingService(self.assemblyai_key)
-        self.filler_analyzer = FillerWordAnalyzer()
-        self.loudness_analyzer = LoudnessAnalyzer()
-        self.wpm_analyzer = WPMAnalyzer()
-        self.intonation_analyzer = IntonationAnalyzer()
-        self.video_analyzer = VideoAnalyzer()
-        self.gesture_analyzer = GestureAnalyzer()
-        self.topic_analyzer = TopicCoverageAnalyzer()
-        self.conclusion_generator = ConclusionGenerator()
-        self.clarity_analyzer = ClarityAnalyzer()
-        self.feedback_service = GeminiFeedbackService(api_key=self.gemini_key)
+        # Initialize Services (lightweight: upload handling, queue, progress)
+        self.file_service = FileProcessingService(self.assemblyai_key, transcript_cache=TranscriptCache())
         self.progress_service = ProgressService()
-        
-        # Initialize Orchestrator
-        self.orchestrator = AnalysisOrchestrator(
-            self.file_service, self.filler_analyzer, self.loudness_analyzer,
-            self.wpm_analyzer, self.intonation_analyzer, self.video_analyzer,
-            self.gesture_analyzer, self.topic_analyzer, self.conclusion_generator,
-            self.clarity_analyzer, self.feedback_service
-        )
+        self.job_queue = SqlJobQueue()
+
+        # Analyzers and orchestrator are built on first use, so an API process
+        # that only submits jobs never loads the ML models
+        self._orchestrator = None
+
+    @property
+    def orchestrator(self):
+        if self._orchestrator is None:
+            from ..services.filler_word_analyzer import FillerWordAnalyzer
+            from ..services.loudness_analyzer import LoudnessAnalyzer
+            from ..services.wpm_analyzer import WPMAnalyzer
+            from ..services.intonation_analyzer import IntonationAnalyzer
+            from ..services.video_analyzer import VideoAnalyzer
+            from ..services.topic_coverage_analyzer import TopicCoverageAnalyzer
+            from ..services.gesture_analyzer import GestureAnalyzer
+            from ..services.conclusion_generator import ConclusionGenerator
+            from ..services.clarity_analyzer import ClarityAnalyzer
+            from ..services.gemini_feedback import GeminiFeedbackService
+            from ..services.analysis_orchestrator import AnalysisOrchestrator
+
+            self._orchestrator = AnalysisOrchestrator(
+                self.file_service, FillerWordAnalyzer(), LoudnessAnalyzer(),
+                WPMAnalyzer(), IntonationAnalyzer(), VideoAnalyzer(),
+                GestureAnalyzer(), TopicCoverageAnalyzer(), ConclusionGenerator(),
+                ClarityAnalyzer(), GeminiFeedbackService(api_key=self.gemini_key),
+                result_cache=ResultCache()
+            )
+        return self._orchestrator
 
     async def create_analysis(
         self,
@@ -80,16 +81,7 @@ class AnalysisController:
             return ResponseBuilder.error(message, 400)
 
         # 2. Database Record Initialization
-        analysis = Analysis(
-            user_id=user.id,
-            file_name=file.filename,
-            file_type="pending",
-            status="processing",
-        )
-        db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
-        
+        analysis = self._create_record(file, user, db, status="processing")
         tracking_id = progress_id or str(analysis.id)
         self.progress_service.update_progress(tracking_id, 5, "uploading")
 
@@ -97,66 +89,179 @@ class AnalysisController:
         temp_dir = None
         try:
             # Prepare file and local paths
-            _, _, file_type, audio_path = await self.file_service.process_file(file)
+            _, _, file_type, audio_path, content_hash = await self.file_service.process_file(file)
             temp_dir = os.path.dirname(audio_path)
             file_ext = os.path.splitext(file.filename)[1]
             input_path = os.path.join(temp_dir, f"input{file_ext}")
 
-            # Create context for the orchestrator
-            context = AnalysisContext(
-                tracking_id=tracking_id,
-                file_type=file_type,
-                audio_path=audio_path,
-                input_path=input_path,
-                temp_dir=temp_dir,
-                start_time=time.perf_counter()
+            return_data = await self._run_and_store(
+                analysis, db, tracking_id, file_type, input_path, content_hash, topic, audience_position
             )
-
-            # Run the heavy lifting
-            await self.orchestrator.run_pipeline(context, topic, audience_position)
-
-            # 4. Finalize Results
-            analysis.status = "completed"
-            analysis.file_type = file_type
-            analysis.transcript = context.transcript
-            analysis.captions = context.captions
-            analysis.llm_judge_feedback = context.final_data["llm_judge_feedback"].model_dump_json()
-            
-            # Map module results back to entity
-            res = context.results
-            analysis.wpm_data = context.final_data["wpm_data"]
-            analysis.filler_word_analysis = res["filler"]
-            analysis.loudness_analysis = res["loudness"]
-            analysis.head_direction_analysis = context.final_data["head_direction_analysis"]
-            analysis.facial_expression_analysis = context.final_data["facial_expression_analysis"]
-            analysis.posture_analysis = context.final_data["posture_analysis"]
-            analysis.gesture_analysis = res["gesture"]
-            analysis.intonation_analysis = res["intonation"]
-            analysis.topic_coverage = res["topic"]
-            analysis.clarity_analysis = res["clarity"]
-            
-            db.commit()
-            self.progress_service.update_progress(tracking_id, 100, "complete")
-            self.progress_service.remove_progress(tracking_id)
-
-            # Prepare return data
-            return_data = {**context.final_data, "analysis_id": analysis.id, "created_at": analysis.created_at.isoformat()}
             return ResponseBuilder.success(data=return_data, message="Analysis completed successfully")
 
         except Exception as e:
             logging.exception(f"Critical failure in analysis pipeline for {tracking_id}")
-            analysis.status = "failed"
-            analysis.error_message = str(e)
-            db.commit()
+            self._mark_failed(analysis, db, e)
             return ResponseBuilder.error(f"Analysis failed: {str(e)}", 500)
             
         finally:
             if temp_dir and os.path.exists(temp_dir):
                 shutil.rmtree(temp_dir, ignore_errors=True)
 
+    async def submit_analysis(
+        self,
+        file: UploadFile,
+        user: User,
+        db: Session,
+        topic: str = None,
+        audience_position: str = "front",
+        progress_id: str = None,
+    ):
+        """
+        Job mode: persists the upload, creates the Analysis row and enqueues it.
+        Returns 202 immediately; clients poll GET /analysis/{id} or the SSE endpoint.
+        """
+        is_valid, message = self.file_service.validate_file(file)
+        if not is_valid:
+            return ResponseBuilder.error(message, 400)
+
+        analysis = self._create_record(file, user, db, status="queued")
+        tracking_id = progress_id or str(analysis.id)
+        self.progress_service.update_progress(tracking_id, 5, "uploading")
+
+        try:
+            # Upload goes to job storage (process_file removes the workspace on failure)
+            _, _, file_type, audio_path, content_hash = await self.file_service.process_file(
+                file, workspace=self.job_queue.create_workspace()
+            )
+            file_ext = os.path.splitext(file.filename)[1]
+            input_path = os.path.join(os.path.dirname(audio_path), f"input{file_ext}")
+
+            analysis.file_type = file_type
+            job = self.job_queue.enqueue(
+                db, analysis, input_path, file_type, content_hash, topic, audience_position, tracking_id
+            )
+        except Exception as e:
+            logging.exception(f"Failed to queue analysis {analysis.id}")
+            self._mark_failed(analysis, db, e)
+            return ResponseBuilder.error(f"Analysis failed: {str(e)}", 500)
+
+        self.progress_service.update_progress(tracking_id, 5, "queued")
+        return ResponseBuilder.success(
+            data={
+                "analysis_id": analysis.id,
+                "job_id": job.id,
+                "status": "queued",
+                "progress_id": tracking_id,
+            },
+            message="Analysis queued",
+            status_code=202,
+        )
+
+    async def process_job(self, job: AnalysisJob, db: Session):
+        """Runs a claimed job (called by AnalysisJobWorker)."""
+        analysis = db.get(Analysis, job.analysis_id)
+        if analysis is None:
+            self.job_queue.fail(db, job, "Analysis record no longer exists")
+            self.job_queue.remove_workspace(job)
+            return
+
+        analysis.status = "processing"
+        db.commit()
+        try:
+            await self._run_and_store(
+                analysis, db, job.tracking_id, job.file_type, job.input_path,
+                job.content_hash, job.topic, job.audience_position
+            )
+            self.job_queue.complete(db, job)
+        except Exception as e:
+            logging.exception(f"Critical failure in analysis job {job.id} for {job.tracking_id}")
+            db.rollback()
+            self._mark_failed(analysis, db, e)
+            self.job_queue.fail(db, job, str(e))
+        finally:
+            self.job_queue.remove_workspace(job)
+
+    @staticmethod
+    def _create_record(file: UploadFile, user: User, db: Session, status: str) -> Analysis:
+        analysis = Analysis(
+            user_id=user.id,
+            file_name=file.filename,
+            file_type="pending",
+            status=status,
+        )
+        db.add(analysis)
+        db.commit()
+        db.refresh(analysis)
+        return analysis
+
     @staticmethod
-    def get_analysis(analysis_id: int, user: User, db: Session):
-        """Get analysis by ID"""
+    def _mark_failed(analysis: Analysis, db: Session, error: Exception):
+        analysis.status = "failed"
+        analysis.error_message = str(error)
+        db.commit()
+
+    async def _run_and_store(self, analysis: Analysis, db: Session, tracking_id: str, file_type: str,
+                             input_path: str, content_hash: str, topic: str, audience_position: str) -> dict:
+        """Runs the pipeline on an uploaded file and maps the results onto the Analysis row."""
+        temp_dir = os.path.dirname(input_path)
+
+        # Create context for the orchestrator
+        context = AnalysisContext(
+            tracking_id=tracking_id,
+            file_type=file_type,
+            audio_path=os.path.join(temp_dir, "audio.wav"),
+            input_path=input_path,
+            temp_dir=temp_dir,
+            content_hash=content_hash,
+            start_time=time.perf_counter()
+        )
+
+        # Run the heavy lifting
+        await self.orchestrator.run_pipeline(context, topic, audience_position)
+
+        # 4. Finalize Results
+        analysis.status = "completed"
+        analysis.file_type = file_type
+        analysis.transcript = context.transcript
+        analysis.captions = context.captions
+        analysis.llm_judge_feedback = context.final_data["llm_judge_feedback"].model_dump_json()
+        
+        # Map module results back to entity
+        res = context.results
+        analysis.wpm_data = context.final_data["wpm_data"]
+        analysis.filler_word_analysis = res["filler"]
+        analysis.loudness_analysis = res["loudness"]
+        analysis.head_direction_analysis = context.final_data["head_direction_analysis"]
+        analysis.facial_expression_analysis = context.final_data["facial_expression_analysis"]
+        analysis.posture_analysis = context.final_data["posture_analysis"]
+        analysis.gesture_analysis = res["gesture"]
+        analysis.intonation_analysis = res["intonation"]
+        analysis.topic_coverage = res["topic"]
+        analysis.clarity_analysis = res["clarity"]
+        
+        db.commit()
+        self.progress_service.update_progress(tracking_id, 100, "complete")
+        self.progress_service.remove_progress(tracking_id)
+
+        # Prepare return data
+        return {**context.final_data, "analysis_id": analysis.id, "created_at": analysis.created_at.isoformat()}
+
+    @staticmethod
+    def _intonation_with_word_scores(intonation: dict, word_scores: str):
+        """Stored word_scores are records; re-shape them for columnar clients."""
+        if not intonation or word_scores == "records" or not isinstance(intonation.get("word_scores"), list):
+            return intonation
+        return {**intonation, "word_scores": WordProsody.from_records(intonation["word_scores"]).to_columns()}
+
+    @staticmethod
+    def get_analysis(analysis_id: int, user: User, db: Session, word_scores: str = "records"):
+        """Get analysis by ID (word_scores: "records" or "columns" for intonation word scores)"""
+        if word_scores not in WordProsody.FORMATS:
+            return ResponseBuilder.error(
+                f"Invalid word_scores format: {word_scores}. Allowed: {', '.join(WordProsody.FORMATS)}", 400
+            )
+
         analysis = (
             db.query(Analysis)
             .filter(Analysis.id == analysis_id, Analysis.user_id == user.id)
@@ -185,9 +290,14 @@ class AnalysisController:
                     if analysis.clarity_analysis
                     else None
                 ),
-                "intonation_analysis": analysis.intonation_analysis,
-                "llm_judge_feedback": FinalFeedback.model_validate_json(
-                    analysis.llm_judge_feedback
+                "intonation_analysis": AnalysisController._intonation_with_word_scores(
+                    analysis.intonation_analysis, word_scores
+                ),
+                # Not set until the analysis completes (queued/processing/failed)
+                "llm_judge_feedback": (
+                    FinalFeedback.model_validate_json(analysis.llm_judge_feedback)
+                    if analysis.llm_judge_feedback
+                    else None
                 ),
                 "topic_coverage": analysis.topic_coverage,
                 "error_message": analysis.error_message,
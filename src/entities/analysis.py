@@ -13,7 +13,7 @@ class Analysis(Base):
     file_type = Column(String(50), nullable=False)  # 'video' or 'audio'
     status = Column(
         String(50), default="processing"
-    )  # 'processing', 'completed', 'failed'
+    )  # 'queued', 'processing', 'completed', 'failed'
     transcript = Column(Text, nullable=True)
     captions = Column(JSON, nullable=True)  # JSON array of word-level captions
     wpm_data = Column(JSON, nullable=True)  # JSON array of WPM analysis
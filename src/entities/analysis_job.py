@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from sqlalchemy.sql import func
+from ..config.db import Base
+
+
+class AnalysisJob(Base):
+    """Durable queue entry for an analysis submitted in job mode"""
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_id = Column(Integer, ForeignKey("analyses.id"), nullable=False, index=True)
+    status = Column(
+        String(20), default="queued", nullable=False, index=True
+    )  # 'queued', 'running', 'completed', 'failed'
+    input_path = Column(String(1024), nullable=False)  # Persisted upload (shared job storage)
+    file_type = Column(String(50), nullable=False)  # 'video' or 'audio'
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the upload (result cache key)
+    topic = Column(Text, nullable=True)
+    audience_position = Column(String(20), default="front")
+    tracking_id = Column(String(255), nullable=False, index=True)  # Progress/SSE id
+    # Last progress update, so SSE works when the job runs in another process
+    progress = Column(Float, default=0, nullable=False)
+    stage = Column(String(50), nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    worker_id = Column(String(255), nullable=True)
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
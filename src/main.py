@@ -1,4 +1,6 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from .config.db import engine, Base
@@ -12,7 +14,22 @@ import logging
 logging.info("Backend application starting up...")
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Job-mode workers inside the API process (set ANALYSIS_INPROCESS_WORKERS=0
+    # when dedicated workers consume the queue)
+    from .routes.analysis import controller
+    from .services.job_worker import AnalysisJobWorker, start_workers, stop_workers
+    from .utils.executors import prestart_cpu_executor
+    workers = start_workers(controller, AnalysisJobWorker.INPROCESS_WORKERS)
+    if workers:
+        # Warm the CPU pool in the background; startup isn't delayed
+        asyncio.get_running_loop().run_in_executor(None, prestart_cpu_executor)
+    yield
+    await stop_workers(workers)
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 origins = [
@@ -1,6 +1,8 @@
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 from datetime import datetime
+from .audio_buffer import AudioBuffer
+from .text_annotations import TextAnnotations
 
 @dataclass
 class AnalysisContext:
@@ -10,8 +12,14 @@ class AnalysisContext:
     audio_path: str
     input_path: str
     temp_dir: str
+    # SHA-256 of the uploaded bytes; keys the result cache
+    content_hash: Optional[str] = None
+    # Decoded once per request and shared by all audio analyzers
+    audio: Optional[AudioBuffer] = None
     transcript: Optional[str] = None
     captions: List[Dict] = field(default_factory=list)
+    # spaCy tags/lemmas of the transcript (not set when the results came from the cache)
+    annotations: Optional[TextAnnotations] = None
     results: Dict[str, Any] = field(default_factory=dict)
     start_time: float = field(default_factory=lambda: 0.0)
     
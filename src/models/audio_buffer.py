@@ -0,0 +1,145 @@
+import hashlib
+import os
+import struct
+import threading
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# WAVE_FORMAT_IEEE_FLOAT / WAVE_FORMAT_EXTENSIBLE (sub-format in the first 2 bytes of the GUID)
+_WAVE_FORMAT_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# Samples hashed per step when fingerprinting (keeps memory-mapped buffers from being copied whole)
+_FINGERPRINT_CHUNK = 1 << 20
+
+
+def wav_data_layout(path: str) -> Tuple[int, int, int]:
+    """
+    Locates the sample data of a canonical WAV (mono, 32-bit IEEE float).
+    Walks the RIFF chunks, so extra chunks written by FFmpeg/libsndfile
+    (LIST, fact, PEAK, ...) before the data are fine.
+
+    Returns: (data_offset_bytes, n_samples, sample_rate)
+    Raises ValueError for any other layout.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError(f"{path} is not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                body = f.read(size)
+                audio_format, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if audio_format == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    audio_format = struct.unpack("<H", body[24:26])[0]
+                fmt = (audio_format, channels, sample_rate, bits)
+                if size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path} has data before its fmt chunk")
+                audio_format, channels, sample_rate, bits = fmt
+                if (audio_format, channels, bits) != (_WAVE_FORMAT_FLOAT, 1, 32):
+                    raise ValueError(f"{path} is not mono float32 (format={audio_format}, channels={channels}, bits={bits})")
+                offset = f.tell()
+                # Streamed writers may leave the size unset; the file length is authoritative
+                size = min(size, file_size - offset)
+                return offset, size // 4, sample_rate
+            else:
+                f.seek(size + size % 2, os.SEEK_CUR)
+
+
+class AudioBuffer:
+    """
+    Decoded mono signal shared by every audio analyzer of a single request.
+    The upload is decoded once; resampled copies are computed on first use
+    and cached per sample rate so concurrent analyzers never repeat the work.
+    """
+
+    def __init__(self, samples: np.ndarray, sample_rate: int, path: Optional[str] = None):
+        self.samples = samples
+        self.sample_rate = int(sample_rate)
+        # Canonical WAV backing a memory-mapped buffer (None for in-memory signals)
+        self.path = path
+        self._resampled: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+
+    @classmethod
+    def from_file(cls, audio_path: str) -> "AudioBuffer":
+        """Decodes the file at its native sample rate (mono, float32)."""
+        import librosa
+        y, sr = librosa.load(audio_path, sr=None)
+        return cls(y, sr)
+
+    @classmethod
+    def from_memmap(cls, path: str) -> "AudioBuffer":
+        """
+        Maps a canonical WAV (mono float32, see wav_data_layout) read-only.
+        Nothing is decoded: pages are read on access and shared through the
+        OS page cache by every process that maps the same file.
+        """
+        offset, n_samples, sample_rate = wav_data_layout(path)
+        if n_samples == 0:
+            return cls(np.zeros(0, dtype=np.float32), sample_rate, path)
+        samples = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(n_samples,))
+        return cls(samples, sample_rate, path)
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate if self.sample_rate else 0.0
+
+    @property
+    def fingerprint(self) -> str:
+        """SHA-256 of the decoded PCM and its rate; identical audio maps to the same key."""
+        if self._fingerprint is None:
+            digest = hashlib.sha256(str(self.sample_rate).encode("ascii"))
+            for start in range(0, len(self.samples), _FINGERPRINT_CHUNK):
+                chunk = self.samples[start:start + _FINGERPRINT_CHUNK]
+                digest.update(np.ascontiguousarray(chunk, dtype=np.float32).tobytes())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def at_rate(self, sample_rate: Optional[int] = None) -> np.ndarray:
+        """
+        Returns the signal at the requested rate (None = native).
+        Each rate is resampled at most once per buffer.
+        """
+        if sample_rate is None or int(sample_rate) == self.sample_rate:
+            return self.samples
+
+        sample_rate = int(sample_rate)
+        with self._lock:
+            if sample_rate not in self._resampled:
+                import librosa
+                self._resampled[sample_rate] = librosa.resample(
+                    self.samples, orig_sr=self.sample_rate, target_sr=sample_rate
+                )
+            return self._resampled[sample_rate]
+
+    def resampled(self, sample_rate: int) -> "AudioBuffer":
+        """
+        A buffer whose native rate is sample_rate (reuses the cached resample).
+        Lets process-pool tasks that work at that rate receive only those samples.
+        """
+        return AudioBuffer(self.at_rate(sample_rate), sample_rate)
+
+    # Process-pool workers receive only the native signal; locks cannot be
+    # pickled and shipping every cached rate would multiply the IPC payload.
+    # A memory-mapped buffer sends just its path and is re-mapped on arrival.
+    def __getstate__(self):
+        if self.path is not None:
+            return {"path": self.path}
+        return {"samples": self.samples, "sample_rate": self.sample_rate}
+
+    def __setstate__(self, state):
+        if "path" in state:
+            mapped = AudioBuffer.from_memmap(state["path"])
+            self.__init__(mapped.samples, mapped.sample_rate, mapped.path)
+        else:
+            self.__init__(state["samples"], state["sample_rate"])
@@ -0,0 +1,37 @@
+from dataclasses import dataclass, field
+from typing import ClassVar, List
+
+
+@dataclass
+class TextAnnotations:
+    """
+    One spaCy pass over a transcript, as parallel lists (one entry per token).
+    Produced by the "annotations" pipeline stage and shared by the text analyzers,
+    so the transcript is tagged once per request. Tokens are aligned to the
+    caption words they fall in (word_index), which places them on the timeline.
+    """
+
+    # Coarse POS tags of content-bearing words (candidates for emphasis)
+    CONTENT_POS: ClassVar[tuple] = ("NOUN", "VERB", "ADJ", "ADV")
+
+    text: List[str]
+    # Character offset of each token in the transcript
+    idx: List[int]
+    lemma: List[str]
+    # Universal POS (token.pos_) and fine-grained Penn Treebank tag (token.tag_)
+    pos: List[str]
+    tag: List[str]
+    is_stop: List[bool]
+    # Index of the caption word containing each token (-1: not in any caption)
+    word_index: List[int] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def content_word_mask(self, n_words: int) -> List[bool]:
+        """Per caption word: True when one of its tokens is a content word."""
+        mask = [False] * n_words
+        for i, pos, is_stop in zip(self.word_index, self.pos, self.is_stop):
+            if 0 <= i < n_words and pos in self.CONTENT_POS and not is_stop:
+                mask[i] = True
+        return mask
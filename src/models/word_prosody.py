@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, List
+import numpy as np
+
+
+def round_values(values: np.ndarray, digits: int) -> np.ndarray:
+    """
+    Python's round() applied element-wise. np.round scales by 10**digits before
+    rounding, which can land on the other side of a tie; the serialized values
+    must stay exactly what round() produced per word.
+    """
+    return np.array([round(v, digits) for v in np.asarray(values, dtype=np.float64).tolist()], dtype=np.float64)
+
+
+@dataclass
+class WordProsody:
+    """
+    Word-level prosody as parallel arrays, one entry per caption word.
+    IntonationAnalyzer computes and scores these columns directly; per-word
+    dicts are only built at the serialization boundary (to_records), and
+    clients that ask for the columnar form never pay for them (to_columns).
+    Values are stored already rounded, exactly as they are serialized.
+    """
+
+    # Serialized forms of word_scores
+    FORMATS: ClassVar[tuple] = ("records", "columns")
+
+    words: List[str]
+    start: np.ndarray
+    end: np.ndarray
+    energy: np.ndarray
+    pitch: np.ndarray
+    pitch_delta: np.ndarray
+    score: np.ndarray
+    emphasized: np.ndarray
+    is_content_word: np.ndarray
+    # False when no prosody frame falls inside the word: its values are 0
+    # and its record carries no pitch_delta
+    has_frames: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """The classic word_scores: one dict per word."""
+        columns = zip(
+            self.words, self.start.tolist(), self.end.tolist(), self.energy.tolist(), self.pitch.tolist(),
+            self.pitch_delta.tolist(), self.score.tolist(), self.emphasized.tolist(),
+            self.is_content_word.tolist(), self.has_frames.tolist(),
+        )
+        records = []
+        for word, start, end, energy, pitch, delta, score, emphasized, is_content, has_frames in columns:
+            record = {"word": word, "start": start, "end": end, "energy": energy, "pitch": pitch}
+            if has_frames:
+                record["pitch_delta"] = delta  # Relative movement in word
+            record.update({"score": score, "emphasized": emphasized, "is_content_word": is_content})
+            records.append(record)
+        return records
+
+    def to_columns(self) -> Dict[str, list]:
+        """Column-wise word_scores (pitch_delta is null for words without frames)."""
+        return {
+            "word": list(self.words),
+            "start": self.start.tolist(),
+            "end": self.end.tolist(),
+            "energy": self.energy.tolist(),
+            "pitch": self.pitch.tolist(),
+            "pitch_delta": [d if f else None for d, f in zip(self.pitch_delta.tolist(), self.has_frames.tolist())],
+            "score": self.score.tolist(),
+            "emphasized": self.emphasized.tolist(),
+            "is_content_word": self.is_content_word.tolist(),
+        }
+
+    def serialize(self, fmt: str = "records"):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown word_scores format: {fmt} (expected one of {self.FORMATS})")
+        return self.to_columns() if fmt == "columns" else self.to_records()
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "WordProsody":
+        """Rebuilds the columns from stored records (e.g. analyses saved as records)."""
+        def column(key, default=0.0, dtype=np.float64):
+            return np.array([r.get(key, default) for r in records], dtype=dtype)
+
+        return cls(
+            words=[r["word"] for r in records],
+            start=column("start"),
+            end=column("end"),
+            energy=column("energy"),
+            pitch=column("pitch"),
+            pitch_delta=column("pitch_delta"),
+            score=column("score"),
+            emphasized=column("emphasized", False, bool),
+            is_content_word=column("is_content_word", False, bool),
+            has_frames=np.array(["pitch_delta" in r for r in records], dtype=bool),
+        )
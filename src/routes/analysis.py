@@ -1,15 +1,19 @@
-from fastapi import APIRouter, UploadFile, File, Form, Query
+from fastapi import APIRouter, UploadFile, File, Form, Query, Response
 from typing import Optional
 from ..middleware.auth import CurrentUser
-from ..config.db import DbSession
+from ..config.db import DbSession, SessionLocal
 from ..controllers.analysis import AnalysisController
 from ..services.progress_service import ProgressService
 from sse_starlette.sse import EventSourceResponse
 import json
+import os
 
 router = APIRouter()
 controller = AnalysisController()
 
+# "sync" keeps the connection open until the analysis is done; "async" queues a job and returns 202
+DEFAULT_SUBMIT_MODE = os.getenv("ANALYSIS_SUBMIT_MODE", "sync").lower()
+
 import logging
 
 
@@ -17,17 +21,25 @@ import logging
 async def analyze_file(
     current_user: CurrentUser,
     db: DbSession,
+    response: Response,
     file: UploadFile = File(..., description="Audio or video file (mp3, mp4, wav, avi) - Max 20MB"),
     topic: Optional[str] = Form(None, description="The topic to analyze coverage for"),
     audience_position: Optional[str] = Form("front", description="Audience position: front, left, right, both"),
-    progress_id: Optional[str] = Query(None)
+    progress_id: Optional[str] = Query(None),
+    mode: Optional[str] = Query(None, description="sync (wait for results) or async (202 + job id)")
 ):
     logging.info(f"Received analysis request from user {current_user.id} (file: {file.filename}, progress_id: {progress_id})")
     """
     Upload and analyze audio/video file.
     Extracts audio, transcribes, calculates WPM, and semantic similarity to topic.
-    Returns analysis results immediately (synchronous processing).
+    Returns analysis results immediately (synchronous processing), or in
+    async mode a 202 with the analysis/job id to poll.
     """
+    if (mode or DEFAULT_SUBMIT_MODE).lower() == "async":
+        result = await controller.submit_analysis(file, current_user, db, topic, audience_position, progress_id)
+        if result["success"]:
+            response.status_code = 202
+        return result
     return await controller.create_analysis(file, current_user, db, topic, audience_position, progress_id)
 
 
@@ -39,6 +51,15 @@ async def get_analysis_progress(progress_id: str):
     progress_service = ProgressService()
     
     async def event_generator():
+        # Queued jobs may run in a separate worker process; follow their persisted progress.
+        # Sync-mode ids never get a job row, so they go straight to the in-memory stream.
+        if await controller.job_queue.has_job(SessionLocal, progress_id):
+            async for data in controller.job_queue.watch_progress(SessionLocal, progress_id):
+                yield {
+                    "data": json.dumps(data)
+                }
+            return
+
         async for data in progress_service.subscribe(progress_id):
             yield {
                 "data": json.dumps(data)
@@ -51,13 +72,14 @@ async def get_analysis_progress(progress_id: str):
 def get_analysis(
     analysis_id: int,
     current_user: CurrentUser,
-    db: DbSession
+    db: DbSession,
+    word_scores: str = Query("records", description="Intonation word_scores layout: records (one object per word) or columns (parallel arrays)")
 ):
     """
     Get analysis results by ID.
     Only returns analyses belonging to the authenticated user.
     """
-    return controller.get_analysis(analysis_id, current_user, db)
+    return controller.get_analysis(analysis_id, current_user, db, word_scores)
 
 
 @router.get("")
@@ -4,14 +4,27 @@ Exposes all primary analysis and file-processing engines as an unified API.
 Includes signal processing (Loudness, Intonation) and NLP-driven (Filler Words, Topic Coverage) metrics.
 """
 
-from .file_processing import FileProcessingService
-from .filler_word_analyzer import FillerWordAnalyzer
-from .loudness_analyzer import LoudnessAnalyzer
-from .wpm_analyzer import WPMAnalyzer
-from .intonation_analyzer import IntonationAnalyzer
-from .topic_coverage_analyzer import TopicCoverageAnalyzer
-from .head_direction_analyzer import HeadDirectionAnalyzer
-from .conclusion_generator import ConclusionGenerator
+import importlib
+
+# Imported on first attribute access: the analyzers pull in spaCy, MediaPipe,
+# librosa and SentenceTransformer, which the API tier (auth, listing, job
+# submission) never needs.
+_EXPORTS = {
+    "FileProcessingService": ".file_processing",
+    "FillerWordAnalyzer": ".filler_word_analyzer",
+    "LoudnessAnalyzer": ".loudness_analyzer",
+    "WPMAnalyzer": ".wpm_analyzer",
+    "IntonationAnalyzer": ".intonation_analyzer",
+    "TopicCoverageAnalyzer": ".topic_coverage_analyzer",
+    "HeadDirectionAnalyzer": ".head_direction_analyzer",
+    "ConclusionGenerator": ".conclusion_generator",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     "FileProcessingService",
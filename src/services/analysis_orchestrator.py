@@ -4,7 +4,12 @@ import time
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from .progress_service import ProgressService
-from ..utils.executors import get_cpu_executor
+from . import analysis_tasks
+from .visual_pipeline import VisualPipeline
+from .stage_scheduler import StageScheduler
+from .pipeline_stages import default_stages, VIDEO_SAMPLE_EVERY_N_FRAMES
+from .video_analyzer import VideoAnalysisState
+from ..utils.executors import get_cpu_executor, get_cpu_worker_count
 from ..models.analysis_context import AnalysisContext
 
 class AnalysisOrchestrator:
@@ -24,7 +29,9 @@ class AnalysisOrchestrator:
                  topic_analyzer,
                  conclusion_generator,
                  clarity_analyzer,
-                 feedback_service):
+                 feedback_service,
+                 result_cache=None,
+                 stages=None):
         self.file_service = file_service
         self.filler_analyzer = filler_analyzer
         self.loudness_analyzer = loudness_analyzer
@@ -36,145 +43,123 @@ class AnalysisOrchestrator:
         self.conclusion_generator = conclusion_generator
         self.clarity_analyzer = clarity_analyzer
         self.feedback_service = feedback_service
+        self.visual_pipeline = VisualPipeline(video_analyzer, gesture_analyzer)
+        self.result_cache = result_cache
         self.progress_service = ProgressService()
 
-    async def run_pipeline(self, context: AnalysisContext, topic: Optional[str], audience_position: str):
-        """Runs the full analysis pipeline from transcription to final feedback"""
+        # Declarative stage graph; see pipeline_stages.default_stages
+        self.scheduler = StageScheduler(stages if stages is not None else default_stages(self))
+        self.result_keys = [o for s in self.scheduler.stages if s.result for o in s.outputs]
+
+    # Results recomputed even on a cache hit (they depend on request parameters, not the media)
+    AUDIENCE_DEPENDENT_RESULTS = ("video", "topic")
+
+    # Bump when pipeline parameters (sampling stride, WPM interval, weights) change
+    PIPELINE_VERSION = "1"
+
+    def _cache_versions(self) -> Dict[str, str]:
+        """Everything that determines the cached results besides the media itself"""
+        return {
+            "pipeline": self.PIPELINE_VERSION,
+            "transcription": getattr(self.file_service, "VERSION", "1"),
+            "loudness": getattr(self.loudness_analyzer, "VERSION", "1"),
+            "clarity": getattr(self.clarity_analyzer, "VERSION", "1"),
+            "wpm": getattr(self.wpm_analyzer, "VERSION", "1"),
+            "filler": getattr(self.filler_analyzer, "VERSION", "1"),
+            "intonation": getattr(self.intonation_analyzer, "VERSION", "1"),
+            "video": getattr(self.video_analyzer, "VERSION", "1"),
+            "gesture": getattr(self.gesture_analyzer, "VERSION", "1"),
+        }
+
+    async def run_visual_analysis(self, input_path: str):
+        """
+        One decode + Pose pass feeds head/expression/posture and gestures;
+        long videos are split into time shards across the process pool.
+        Returns the merged raw (video_state, gesture_state).
+        """
         loop = asyncio.get_running_loop()
         cpu_executor = get_cpu_executor()
+        stride = VIDEO_SAMPLE_EVERY_N_FRAMES
+        shards = await asyncio.to_thread(self.visual_pipeline.plan_shards, input_path, stride, get_cpu_worker_count())
+        shard_states = await asyncio.gather(*[
+            loop.run_in_executor(cpu_executor, analysis_tasks.analyze_video_frames, input_path, stride, s, e)
+            for s, e in shards
+        ])
+        logging.info(f"    -> Visual Analysis split into {len(shards)} shard(s)")
+        return self.visual_pipeline.merge(shard_states)
 
-        # Helper to measure and log task execution
-        async def measure_task(name, executor, func, *args):
-            start = time.perf_counter()
-            res = await loop.run_in_executor(executor, func, *args)
-            logging.info(f"    -> {name} took {time.perf_counter() - start:.2f}s")
-            return res
-
-        all_tasks = []
-        try:
-            # --- PHASE 1: TRANSCRIPTION & INITIAL LOCAL TASKS ---
-            self.progress_service.update_progress(context.tracking_id, 10, "extracting-audio")
-            
-            # Start transcription and heavy local tasks in parallel
-            transcription_task = asyncio.create_task(
-                asyncio.to_thread(self.file_service.transcribe_audio, context.audio_path)
-            )
-            prosody_task = asyncio.create_task(
-                measure_task("Prosody Extraction", cpu_executor, self.intonation_analyzer.get_prosody_only, context.audio_path)
-            )
-            loudness_task = asyncio.create_task(
-                measure_task("Loudness", None, self.loudness_analyzer.analyze_loudness, context.audio_path)
-            )
-            
-            all_tasks.extend([transcription_task, prosody_task, loudness_task])
-
-            video_task = None
-            gesture_task = None
-            if context.file_type == "video":
-                video_task = asyncio.create_task(
-                    measure_task("Video Analysis", cpu_executor, self.video_analyzer.analyze_video, context.input_path, 30, audience_position)
-                )
-                gesture_task = asyncio.create_task(
-                    measure_task("Gesture Analysis", cpu_executor, self.gesture_analyzer.analyze_gestures, context.input_path)
-                )
-                all_tasks.extend([video_task, gesture_task])
-
-            # --- PHASE 2: WAIT FOR TRANSCRIPT & START DEPENDENT TASKS ---
-            transcript_obj = await transcription_task
-            if not transcript_obj:
-                raise ValueError("Transcription failed")
-                
-            context.transcript = transcript_obj.text
-            context.captions = self.file_service.extract_captions(transcript_obj)
-            self.progress_service.update_progress(context.tracking_id, 30, "analyzing-speech")
-
-            prosody_result = await prosody_task
-            
-            # Start modules that depend on transcript
-            wpm_task = asyncio.create_task(measure_task("WPM", None, self.wpm_analyzer.calculate_wpm, context.captions, 2))
-            filler_task = asyncio.create_task(measure_task("Filler", None, self.filler_analyzer.identify_fillers, context.transcript))
-            intonation_task = asyncio.create_task(
-                measure_task("Intonation Scoring", None, self.intonation_analyzer.analyze_intonation, 
-                             context.audio_path, context.transcript, context.captions, 0.5, 0.5, prosody_result)
-            )
-            clarity_task = asyncio.create_task(measure_task("Clarity Analysis", None, self.clarity_analyzer.analyze_clarity, context.audio_path))
-            
-            all_tasks.extend([wpm_task, filler_task, intonation_task, clarity_task])
-
-            topic_task = None
-            if topic:
-                topic_task = asyncio.create_task(measure_task("Topic Coverage", None, self.topic_analyzer.compute_coverage, topic, context.transcript))
-                all_tasks.append(topic_task)
-
-            # --- PHASE 3: INCREMENTAL COMPLETION ---
-            remaining_tasks = {
-                loudness_task: "Loudness",
-                clarity_task: "Clarity Analysis",
-                wpm_task: "WPM",
-                filler_task: "Filler",
-                intonation_task: "Intonation",
-            }
-            if video_task: remaining_tasks[video_task] = "Video Analysis"
-            if gesture_task: remaining_tasks[gesture_task] = "Gesture Analysis"
-            if topic_task: remaining_tasks[topic_task] = "Topic Coverage"
-
-            total = len(remaining_tasks)
-            finished = 0
-            for future in asyncio.as_completed(remaining_tasks.keys()):
-                await future
-                finished += 1
-                progress = 35 + (45 * (finished / total))
-                stage = "analyzing-speech"
-                if progress > 50: stage = "detecting-visuals"
-                if progress > 70: stage = "assessing-engagement"
-                self.progress_service.update_progress(context.tracking_id, progress, stage)
-
-            # --- PHASE 4: AGGREGATE RESULTS ---
-            def get_res(t, name):
-                try:
-                    res = t.result()
-                    if isinstance(res, Exception):
-                        logging.error(f"Task {name} failed: {res}")
-                        return None
-                    return res
-                except Exception as e:
-                    logging.error(f"Task {name} raised error: {e}")
-                    return None
-
-            context.results = {
-                "loudness": get_res(loudness_task, "Loudness"),
-                "video": get_res(video_task, "Video Analysis") if video_task else None,
-                "wpm": get_res(wpm_task, "WPM"),
-                "filler": get_res(filler_task, "Filler"),
-                "intonation": get_res(intonation_task, "Intonation"),
-                "clarity": get_res(clarity_task, "Clarity Analysis"),
-                "topic": get_res(topic_task, "Topic Coverage") if topic_task else None,
-                "gesture": get_res(gesture_task, "Gesture Analysis") if gesture_task else None
-            }
-
-            # --- PHASE 5: GENERATE CONCLUSIONS & SCORES ---
-            self.progress_service.update_progress(context.tracking_id, 85, "calculating-scores")
-            self._generate_conclusions(context, audience_position)
-            
-            # --- PHASE 6: FINAL AI FEEDBACK ---
-            self.progress_service.update_progress(context.tracking_id, 90, "generating-insights")
-            from ..utils.LLM_judge import prepare_gemini_input
-            
-            context.final_data = self._build_final_data(context)
-            prepared_input = prepare_gemini_input(context.final_data)
-            context.final_data["llm_judge_feedback"] = self.feedback_service.generate_feedback(prepared_input)
-            
-            return context
-
-        finally:
-            # Atomic cleanup: ensure NO background tasks are left hanging
-            # This prevents FileNotFoundError when the controller deletes the temp dir
-            pending = [t for t in all_tasks if not t.done()]
-            if pending:
-                logging.info(f"Cleaning up {len(pending)} pending tasks in orchestrator...")
-                for t in pending:
-                    t.cancel()
-                await asyncio.gather(*pending, return_exceptions=True)
+    async def run_pipeline(self, context: AnalysisContext, topic: Optional[str], audience_position: str):
+        """Runs the full analysis pipeline from transcription to final feedback"""
+        self.progress_service.update_progress(context.tracking_id, 10, "extracting-audio")
+
+        artifacts = {
+            "input_path": context.input_path,
+            "audio_path": context.audio_path,
+            "file_type": context.file_type,
+            "topic_query": topic,
+            "audience_position": audience_position,
+        }
+        if context.audio is not None:
+            artifacts["audio"] = context.audio
+
+        # Same bytes + same analyzer versions: cached artifacts prefill the DAG, so
+        # only topic/audience-dependent stages run
+        cached = self.result_cache.load(context.content_hash, self._cache_versions()) if self.result_cache else None
+        if cached is not None:
+            logging.info(f"Result cache hit for {context.tracking_id}; skipping media analysis")
+            video_state = VideoAnalysisState.from_cache(cached["video_state"]) if cached["video_state"] else None
+            artifacts.update(cached["results"])
+            artifacts.update({
+                "transcript": cached["transcript"],
+                "captions": cached["captions"],
+                "visual": (video_state, None) if video_state else None,
+            })
+
+        def on_stage_done(stage, finished, total):
+            progress = 10 + (75 * (finished / total))
+            stage_name = "extracting-audio"
+            if progress > 30: stage_name = "analyzing-speech"
+            if progress > 50: stage_name = "detecting-visuals"
+            if progress > 70: stage_name = "assessing-engagement"
+            self.progress_service.update_progress(context.tracking_id, progress, stage_name)
+
+        artifacts, failed = await self.scheduler.run(
+            artifacts, get_cpu_executor(), targets=("transcript", "captions"), on_stage_done=on_stage_done
+        )
+
+        context.audio = artifacts.get("audio")
+        context.transcript = artifacts["transcript"]
+        context.captions = artifacts["captions"]
+        context.annotations = artifacts.get("annotations")
+        context.results = {key: artifacts[key] for key in self.result_keys}
+
+        # Cache the media-dependent results (before conclusions are attached);
+        # partial results are not cached so a transient failure isn't replayed
+        if self.result_cache and cached is None and not failed:
+            visual = artifacts.get("visual")
+            await asyncio.to_thread(self.result_cache.save, context.content_hash, self._cache_versions(), {
+                "transcript": context.transcript,
+                "captions": context.captions,
+                "results": {k: v for k, v in context.results.items() if k not in self.AUDIENCE_DEPENDENT_RESULTS},
+                "video_state": visual[0].to_cache() if visual else None,
+            })
+
+        return await self._finalize(context, audience_position)
+
+    async def _finalize(self, context: AnalysisContext, audience_position: str) -> AnalysisContext:
+        # --- PHASE 5: GENERATE CONCLUSIONS & SCORES ---
+        self.progress_service.update_progress(context.tracking_id, 85, "calculating-scores")
+        self._generate_conclusions(context, audience_position)
+        
+        # --- PHASE 6: FINAL AI FEEDBACK ---
+        self.progress_service.update_progress(context.tracking_id, 90, "generating-insights")
+        from ..utils.LLM_judge import prepare_gemini_input
+        
+        context.final_data = self._build_final_data(context)
+        prepared_input = prepare_gemini_input(context.final_data)
+        context.final_data["llm_judge_feedback"] = await self.feedback_service.generate_feedback_async(prepared_input)
+        
+        return context
 
     def _generate_conclusions(self, context: AnalysisContext, audience_position: str):
         res = context.results
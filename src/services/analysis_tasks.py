@@ -0,0 +1,85 @@
+"""
+Module-level entry points for the CPU process pool.
+
+Tasks take plain arguments (paths, frame ranges, the shared AudioBuffer)
+rather than bound analyzer methods, so only the arguments are pickled per
+call. Each worker process builds its analyzers once and reuses them.
+"""
+import os
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+_visual_pipeline = None
+_intonation_analyzer = None
+_clarity_analyzer = None
+
+
+def _get_visual_pipeline():
+    global _visual_pipeline
+    if _visual_pipeline is None:
+        from .video_analyzer import VideoAnalyzer
+        from .gesture_analyzer import GestureAnalyzer
+        from .visual_pipeline import VisualPipeline
+        _visual_pipeline = VisualPipeline(VideoAnalyzer(), GestureAnalyzer())
+    return _visual_pipeline
+
+
+def _get_intonation_analyzer():
+    global _intonation_analyzer
+    if _intonation_analyzer is None:
+        # Importing the module loads librosa and Praat (spaCy is loaded on first use)
+        from .intonation_analyzer import IntonationAnalyzer
+        _intonation_analyzer = IntonationAnalyzer()
+    return _intonation_analyzer
+
+
+def _get_clarity_analyzer():
+    global _clarity_analyzer
+    if _clarity_analyzer is None:
+        from .clarity_analyzer import ClarityAnalyzer
+        _clarity_analyzer = ClarityAnalyzer()
+    return _clarity_analyzer
+
+
+def warm_up_worker():
+    """
+    Pool initializer: pays the import and model-loading cost once per worker
+    process instead of inside the first request's tasks.
+    """
+    start = time.perf_counter()
+    try:
+        _get_intonation_analyzer()
+        _get_clarity_analyzer()
+        pipeline = _get_visual_pipeline()
+        # Constructing the graphs loads the TFLite models from disk
+        with pipeline.video_analyzer.create_face_mesh(), \
+                pipeline.video_analyzer.create_pose(), \
+                pipeline.gesture_analyzer.create_hands():
+            pass
+    except Exception as e:
+        # A failing initializer would break the whole pool; tasks load lazily instead
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] [Worker {os.getpid()}] Warm-up failed: {e}")
+        return
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] [Worker {os.getpid()}] Models loaded in {time.perf_counter() - start:.2f}s")
+
+
+def worker_pid() -> int:
+    """No-op task used to start pool workers ahead of time."""
+    return os.getpid()
+
+
+def analyze_video_frames(video_path: str, sample_every_n_frames: int = 30,
+                         start_frame: int = 0, end_frame: Optional[int] = None) -> Tuple:
+    """Raw (video_state, gesture_state) for one time shard, see VisualPipeline.analyze_frames."""
+    return _get_visual_pipeline().analyze_frames(video_path, sample_every_n_frames, start_frame, end_frame)
+
+
+def extract_prosody(audio_path: str, audio=None) -> Tuple:
+    """Pitch/intensity features, see IntonationAnalyzer.get_prosody_only."""
+    return _get_intonation_analyzer().get_prosody_only(audio_path, audio)
+
+
+def analyze_clarity(audio_path: str, audio=None) -> dict:
+    """Clarity report, see ClarityAnalyzer.analyze_clarity (pass the 16kHz buffer)."""
+    return _get_clarity_analyzer().analyze_clarity(audio_path, audio)
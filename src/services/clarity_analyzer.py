@@ -1,26 +1,99 @@
 # filepath: /home/huzaifa-rizwan/Kalaam/kalaam-ai-backend/src/services/clarity_analyzer.py
+import os
 import librosa
 import numpy as np
 from scipy.stats import variation
+from typing import Optional
+from ..models.audio_buffer import AudioBuffer
+from ..utils.audio_stream import iter_blocks, should_stream
 
 
 class ClarityAnalyzer:
     """Service for analyzing clarity of audio files"""
 
-    def analyze_clarity(self, audio_path: str) -> dict:
+    # SNR engine: "hpss" (harmonic/percussive residual) or "percentile"
+    # (VAD-gated frame energy percentiles; reuses the STFT magnitude, no HPSS)
+    SNR_ESTIMATOR = os.getenv("CLARITY_SNR_ESTIMATOR", "hpss").lower()
+    SNR_ESTIMATORS = ("hpss", "percentile")
+
+    # Bump when the output for the same input changes (invalidates cached results).
+    # The estimator is part of it: the two engines report different snr_db values.
+    VERSION = "1" if SNR_ESTIMATOR == "hpss" else f"1-{SNR_ESTIMATOR}"
+
+    # Working sample rate for all clarity features
+    SAMPLE_RATE = 16000
+    # STFT geometry shared by every spectral feature (librosa defaults)
+    N_FFT = 2048
+    HOP_LENGTH = 512
+
+    # Percentile estimator: noise floor = mean power of the quietest frames,
+    # speech = frames at least VAD_THRESHOLD_DB above that floor
+    NOISE_PERCENTILE = 10
+    VAD_THRESHOLD_DB = 6
+
+    def __init__(self, snr_estimator: Optional[str] = None):
+        self.snr_estimator = (snr_estimator or self.SNR_ESTIMATOR).lower()
+        if self.snr_estimator not in self.SNR_ESTIMATORS:
+            raise ValueError(f"Unknown SNR estimator: {self.snr_estimator} (expected one of {self.SNR_ESTIMATORS})")
+
+    def analyze_clarity(self, audio_path: str, audio: Optional[AudioBuffer] = None) -> dict:
         """
         Analyze the clarity of the audio file.
         :param audio_path: Path to the audio file
+        :param audio: Shared decoded signal (skips re-decoding the file)
         :return: Dictionary containing clarity metrics
         """
-        return self.compute_clarity(audio_path)
+        return self.compute_clarity(audio_path, audio)
 
-    def estimate_snr(self, y):
+    def estimate_snr(self, y, stft: Optional[np.ndarray] = None, magnitude: Optional[np.ndarray] = None):
+        """
+        SNR estimate with the configured engine
+        stft / magnitude: precomputed STFT of y (N_FFT/HOP_LENGTH) and its magnitude
+        """
+        if self.snr_estimator == "percentile":
+            if magnitude is None:
+                if stft is None:
+                    stft = librosa.stft(y, n_fft=self.N_FFT, hop_length=self.HOP_LENGTH)
+                magnitude = np.abs(stft)
+            return self.estimate_snr_percentile(magnitude)
+        return self.estimate_snr_hpss(y, stft)
+
+    def estimate_snr_percentile(self, magnitude: np.ndarray):
+        """
+        SNR estimate from per-frame energy: the quietest frames give the noise
+        floor, frames clearly above it are treated as speech (energy VAD).
+        Costs one reduction over the magnitude frames instead of an HPSS.
+        """
+        return self._percentile_snr(np.mean(magnitude**2, axis=0))
+
+    def _percentile_snr(self, frame_power: np.ndarray):
+        if frame_power.size == 0:
+            return 0
+        floor = np.percentile(frame_power, self.NOISE_PERCENTILE)
+        noise_power = np.mean(frame_power[frame_power <= floor])
+        if noise_power == 0:
+            return 50
+        speech = frame_power[frame_power > noise_power * 10 ** (self.VAD_THRESHOLD_DB / 10)]
+        if speech.size == 0:
+            # Nothing stands out from the floor: noise-only (or stationary) signal
+            return 0
+        return 10 * np.log10(max(np.mean(speech) - noise_power, noise_power * 1e-3) / noise_power)
+
+    def estimate_snr_hpss(self, y, stft: Optional[np.ndarray] = None):
         """
         Rough SNR estimate using signal vs residual noise
+        stft: precomputed STFT of y (N_FFT/HOP_LENGTH); skips recomputing it for HPSS
         """
         signal_power = np.mean(y**2)
-        noise_power = np.mean((y - librosa.effects.harmonic(y)) ** 2)
+        if stft is None:
+            harmonic = librosa.effects.harmonic(y, n_fft=self.N_FFT, hop_length=self.HOP_LENGTH)
+        else:
+            # Same as librosa.effects.harmonic, minus the forward STFT
+            harmonic = librosa.istft(
+                librosa.decompose.hpss(stft)[0],
+                dtype=y.dtype, n_fft=self.N_FFT, hop_length=self.HOP_LENGTH, length=len(y),
+            )
+        noise_power = np.mean((y - harmonic) ** 2)
         if noise_power == 0:
             return 50
         return 10 * np.log10(signal_power / noise_power)
@@ -43,22 +116,128 @@ class ClarityAnalyzer:
     # Main clarity function
     # -----------------------------
 
-    def compute_clarity(self, audio_path):
-        y, sr = librosa.load(audio_path, sr=16000)
+    def compute_clarity(self, audio_path, audio: Optional[AudioBuffer] = None):
+        # Long recordings are analyzed block by block (bounded memory). In the
+        # pipeline they arrive as the memory-mapped native buffer (see
+        # pipeline_stages.speech_front_end) and are resampled per block;
+        # standalone calls without a buffer stream the file instead.
+        if should_stream(audio_path, audio):
+            features = self._stream_features(audio_path, audio)
+        else:
+            features = self._features(audio_path, audio)
+        return self._score(**features)
+
+    def _features(self, audio_path, audio: Optional[AudioBuffer] = None) -> dict:
+        if audio is not None:
+            y, sr = audio.at_rate(self.SAMPLE_RATE), self.SAMPLE_RATE
+        else:
+            y, sr = librosa.load(audio_path, sr=self.SAMPLE_RATE)
+
+        # One STFT feeds every feature below (each librosa call would otherwise
+        # compute its own): magnitude for centroid/bandwidth, log-mel power for
+        # MFCC and onset strength, the frames for the SNR estimate
+        stft = librosa.stft(y, n_fft=self.N_FFT, hop_length=self.HOP_LENGTH)
+        magnitude = np.abs(stft)
+        log_mel = librosa.power_to_db(librosa.feature.melspectrogram(S=magnitude**2, sr=sr))
 
         # --- MFCC (articulation stability)
-        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+        mfcc = librosa.feature.mfcc(S=log_mel, n_mfcc=13)
         mfcc_variation = np.mean([variation(m) for m in mfcc])
 
         # --- Spectral features
-        centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
-        bandwidth = np.mean(librosa.feature.spectral_bandwidth(y=y, sr=sr))
-        flux = np.mean(librosa.onset.onset_strength(y=y, sr=sr))
+        centroid_frames = librosa.feature.spectral_centroid(S=magnitude, sr=sr, n_fft=self.N_FFT)
+        centroid = np.mean(centroid_frames)
+        bandwidth = np.mean(librosa.feature.spectral_bandwidth(S=magnitude, sr=sr, n_fft=self.N_FFT, centroid=centroid_frames))
+        flux = np.mean(librosa.onset.onset_strength(S=log_mel, sr=sr, n_fft=self.N_FFT, hop_length=self.HOP_LENGTH))
 
         # --- Noise & distortion
-        snr = self.estimate_snr(y)
+        snr = self.estimate_snr(y, stft, magnitude)
         clip_ratio = self.clipping_ratio(y)
 
+        return {
+            "mfcc_variation": mfcc_variation, "centroid": centroid, "bandwidth": bandwidth,
+            "flux": flux, "snr": snr, "clip_ratio": clip_ratio,
+        }
+
+    def _stream_features(self, audio_path, audio: Optional[AudioBuffer] = None) -> dict:
+        """
+        Same features as _features from fixed-size 16kHz blocks and running
+        accumulators, so memory does not grow with the duration.
+        STFT frames are carried across blocks (with the same zero padding as
+        stft(center=True)), so MFCC/centroid/bandwidth/flux see the same frames.
+        Two approximations: the 80dB log-mel floor follows the running maximum
+        instead of the global one (only affects frames >80dB below the loudest),
+        and the HPSS SNR engine decomposes each block on its own.
+        """
+        sr, n_fft, hop = self.SAMPLE_RATE, self.N_FFT, self.HOP_LENGTH
+        # onset_strength(center=True) shifts by this many frames and trims the end
+        onset_delay = n_fft // (2 * hop)
+        state = {
+            "carry": np.zeros(n_fft // 2, dtype=np.float32), "frames": 0, "mel_max": 0.0,
+            "mfcc_sum": 0.0, "mfcc_sq": 0.0, "centroid": 0.0, "bandwidth": 0.0,
+            "flux": 0.0, "flux_tail": np.zeros(0), "prev_log_mel": None, "frame_power": [],
+        }
+
+        def consume_frames(samples):
+            buffer = np.concatenate([state["carry"], samples])
+            count = 1 + (len(buffer) - n_fft) // hop if len(buffer) >= n_fft else 0
+            state["carry"] = buffer[count * hop:]
+            if count == 0:
+                return
+            magnitude = np.abs(librosa.stft(buffer[:(count - 1) * hop + n_fft], n_fft=n_fft, hop_length=hop, center=False))
+            mel = librosa.feature.melspectrogram(S=magnitude**2, sr=sr)
+            state["mel_max"] = max(state["mel_max"], float(mel.max()))
+            log_mel = librosa.power_to_db(mel, top_db=None)
+            log_mel = np.maximum(log_mel, 10.0 * np.log10(max(1e-10, state["mel_max"])) - 80.0)
+
+            mfcc = librosa.feature.mfcc(S=log_mel, n_mfcc=13).astype(np.float64)
+            state["mfcc_sum"] = state["mfcc_sum"] + mfcc.sum(axis=1)
+            state["mfcc_sq"] = state["mfcc_sq"] + (mfcc**2).sum(axis=1)
+            centroid = librosa.feature.spectral_centroid(S=magnitude, sr=sr, n_fft=n_fft)
+            state["centroid"] += float(centroid.sum())
+            state["bandwidth"] += float(librosa.feature.spectral_bandwidth(S=magnitude, sr=sr, n_fft=n_fft, centroid=centroid).sum())
+
+            # Onset strength: positive log-mel increase over the previous frame, band mean
+            if state["prev_log_mel"] is not None:
+                log_mel = np.concatenate([state["prev_log_mel"], log_mel], axis=1)
+            onset = np.mean(np.maximum(0.0, log_mel[:, 1:] - log_mel[:, :-1]), axis=0)
+            state["flux"] += float(onset.sum())
+            state["flux_tail"] = np.concatenate([state["flux_tail"], onset])[-onset_delay:]
+            state["prev_log_mel"] = log_mel[:, -1:]
+
+            state["frame_power"].append(np.mean(magnitude**2, axis=0))
+            state["frames"] += count
+
+        n_samples = clipped = 0
+        signal_energy = noise_energy = 0.0
+        for block in _merge_short_tail(iter_blocks(audio_path, audio, sample_rate=sr), n_fft):
+            n_samples += len(block)
+            clipped += int(np.sum(np.abs(block) >= 0.99))
+            if self.snr_estimator == "hpss":
+                signal_energy += float(np.sum(block.astype(np.float64) ** 2))
+                harmonic = librosa.effects.harmonic(block, n_fft=n_fft, hop_length=hop)
+                noise_energy += float(np.sum((block - harmonic).astype(np.float64) ** 2))
+            consume_frames(block)
+        consume_frames(np.zeros(n_fft // 2, dtype=np.float32))
+
+        frames = state["frames"]
+        mean = state["mfcc_sum"] / frames
+        std = np.sqrt(np.maximum(state["mfcc_sq"] / frames - mean**2, 0.0))
+        if self.snr_estimator == "hpss":
+            snr = 50 if noise_energy == 0 else 10 * np.log10(signal_energy / noise_energy)
+        else:
+            snr = self._percentile_snr(np.concatenate(state["frame_power"]))
+
+        return {
+            "mfcc_variation": float(np.mean(std / mean)),
+            "centroid": state["centroid"] / frames,
+            "bandwidth": state["bandwidth"] / frames,
+            "flux": (state["flux"] - float(state["flux_tail"].sum())) / frames,
+            "snr": snr,
+            "clip_ratio": clipped / n_samples,
+        }
+
+    def _score(self, mfcc_variation, centroid, bandwidth, flux, snr, clip_ratio) -> dict:
         # -----------------------------
         # Normalization (empirical ranges)
         # -----------------------------
@@ -105,3 +284,17 @@ class ClarityAnalyzer:
             "clipping_ratio": round(clip_ratio, 4),
             "reasons": reasons,
         }
+
+
+def _merge_short_tail(blocks, min_samples: int):
+    """Yields the blocks, folding a final block shorter than min_samples into the previous one."""
+    previous = None
+    for block in blocks:
+        if previous is not None:
+            if len(block) < min_samples:
+                block = np.concatenate([previous, block])
+            else:
+                yield previous
+        previous = block
+    if previous is not None:
+        yield previous
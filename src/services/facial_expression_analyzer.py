@@ -1,8 +1,8 @@
-import cv2
 import mediapipe as mp
 import numpy as np
 from typing import Dict, List, Optional
 from datetime import datetime
+from .frame_source import FrameSource
 
 class FacialExpressionAnalyzer:
     """
@@ -72,20 +72,8 @@ class FacialExpressionAnalyzer:
         """
         Processes a video file to generate a facial expression report.
         """
-        import time
-        cap = cv2.VideoCapture(video_path)
-        
-        if not cap.isOpened():
-            time.sleep(0.5)
-            cap = cv2.VideoCapture(video_path)
-
-        if not cap.isOpened():
-            raise ValueError(f"Cannot open video file: {video_path}")
-
-        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Total frames in video: {total_frames} (sampling every {sample_every_n_frames})")
-        frame_duration = 1.0 / fps
+        source = FrameSource(video_path, sample_every_n_frames)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Total frames in video: {source.total_frames} (sampling every {sample_every_n_frames}, {source.strategy})")
 
         expression_counts: Dict[str, float] = {
             "Smiling": 0.0,
@@ -100,38 +88,19 @@ class FacialExpressionAnalyzer:
         expression_timeline: List[Dict] = []
         movement_history = []
         prev_landmarks = None
-        frame_index = 0
 
-        with self.mp_face_mesh.FaceMesh(
+        with source, self.mp_face_mesh.FaceMesh(
             static_image_mode=False,
             max_num_faces=1,
             refine_landmarks=True,
             min_detection_confidence=0.5
         ) as face_mesh:
 
-            while frame_index < total_frames:
-                # Seek to the target frame directly
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                elapsed = frame_index * frame_duration
-                frame_index += sample_every_n_frames
-
-                if frame_index % 100 == 0:
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] [Facial] Processing frame {frame_index}...")
-
-                h, w = frame.shape[:2]
-                # Optimization: Resize for faster inference
-                max_dim = 640
-                if w > max_dim or h > max_dim:
-                    scale = max_dim / max(w, h)
-                    frame = cv2.resize(frame, (int(w * scale), int(h * scale)))
-                    h, w = frame.shape[:2]
-
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = face_mesh.process(rgb)
+            # Frames arrive decoded, resized to <=640px and converted to RGB
+            for frame in source:
+                elapsed = frame.time
+                h, w = frame.height, frame.width
+                results = face_mesh.process(frame.rgb)
 
                 expression = "NoFaceDetected"
                 avg_movement = 0.0
@@ -152,7 +121,7 @@ class FacialExpressionAnalyzer:
                     prev_landmarks = points
 
                 # Accumulate time
-                segment_duration = sample_every_n_frames * frame_duration
+                segment_duration = source.segment_duration
                 expression_counts[expression] = expression_counts.get(expression, 0.0) + segment_duration
 
                 expression_timeline.append({
@@ -161,8 +130,6 @@ class FacialExpressionAnalyzer:
                     "movement": round(float(avg_movement), 3)
                 })
 
-        cap.release()
-
         total_time = sum(expression_counts.values())
         
         # Percentual breakdown
@@ -1,12 +1,18 @@
 import asyncio
+import hashlib
+import json
 import os
 import subprocess
 import mimetypes
 import tempfile
+import time
+import numpy as np
 import assemblyai as aai
 from datetime import datetime
 from typing import Tuple, List, Dict, Optional
 from fastapi import UploadFile, HTTPException
+from ..models.audio_buffer import AudioBuffer
+from .transcript_cache import TranscriptCache
 
 
 class FileProcessingService:
@@ -15,15 +21,30 @@ class FileProcessingService:
     and transcription. Serves as the primary data ingestion layer.
     """
 
+    # Bump when the transcription request/caption format changes (invalidates cached results)
+    VERSION = "1"
+
     # Supported audio/video formats for the analyzer
     ALLOWED_EXTENSIONS = {"mp4", "mp3", "wav", "avi", "webm", "mpeg"}
-    # Cap to protect the backend from OOM or disk-full attacks (100MB)
+    # Cap to protect the backend from OOM or disk-full attacks
     MAX_FILE_SIZE = 100 * 1024 * 1024 
+    # Upload copy granularity: peak memory per upload stays at one chunk
+    UPLOAD_CHUNK_SIZE = 1024 * 1024
+    # "memmap": FFmpeg writes a canonical mono float32 audio.wav that every analyzer
+    #           (and every pool worker) maps read-only instead of holding a private copy
+    # "pipe": decode PCM from FFmpeg's stdout straight into memory (WAV written only on demand)
+    # "file": legacy behaviour, FFmpeg writes a full-quality audio.wav that analyzers re-read
+    AUDIO_EXTRACTION_MODE = os.getenv("AUDIO_EXTRACTION_MODE", "memmap").lower()
+    # Container sent to AssemblyAI: "flac" (lossless), "opus" (smallest) or "wav" (legacy full-rate PCM)
+    TRANSCRIPTION_AUDIO_FORMAT = os.getenv("TRANSCRIPTION_AUDIO_FORMAT", "flac").lower()
+    # ASR models work on 16kHz mono; anything above is upload overhead
+    TRANSCRIPTION_SAMPLE_RATE = 16000
 
-    def __init__(self, assemblyai_api_key: str):
+    def __init__(self, assemblyai_api_key: str, transcript_cache: Optional[TranscriptCache] = None):
         """Initializes the AssemblyAI client for transcription."""
         aai.settings.api_key = assemblyai_api_key
         self.transcriber = aai.Transcriber()
+        self.transcript_cache = transcript_cache
 
     @staticmethod
     def validate_file(file: UploadFile) -> Tuple[bool, str]:
@@ -51,7 +72,57 @@ class FileProcessingService:
         return mime_type and mime_type.startswith("video")
 
     @staticmethod
-    def extract_audio(input_path: str, output_path: str) -> bool:
+    def size_limit_message(max_bytes: int) -> str:
+        """413 detail for the byte budget actually enforced."""
+        return f"File size exceeds the {max_bytes / (1024 * 1024):g}MB threshold"
+
+    @staticmethod
+    async def stream_upload(
+        file: UploadFile,
+        output_path: str,
+        max_bytes: int,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        hash_algorithm: Optional[str] = None,
+    ) -> Tuple[int, Optional[str]]:
+        """
+        Copies the upload to disk in fixed-size chunks instead of buffering the
+        whole body. Aborts as soon as the byte budget is exceeded and removes
+        the partial file.
+        
+        Args:
+            file: Incoming upload stream.
+            output_path: Target path on disk.
+            max_bytes: Size budget; exceeding it raises HTTP 413.
+            chunk_size: Bytes read per iteration.
+            hash_algorithm: Optional hashlib name (e.g. "sha256") computed while copying.
+        
+        Returns: (bytes_written, hex_digest or None)
+        """
+        hasher = hashlib.new(hash_algorithm) if hash_algorithm else None
+        total = 0
+        try:
+            with open(output_path, "wb") as f:
+                while True:
+                    chunk = await file.read(chunk_size)
+                    if not chunk:
+                        break
+                    total += len(chunk)
+                    if total > max_bytes:
+                        raise HTTPException(
+                            status_code=413, detail=FileProcessingService.size_limit_message(max_bytes)
+                        )
+                    if hasher:
+                        hasher.update(chunk)
+                    f.write(chunk)
+        except Exception:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+
+        return total, (hasher.hexdigest() if hasher else None)
+
+    @staticmethod
+    def extract_audio(input_path: str, output_path: str, canonical: bool = False) -> bool:
         """
         Uses FFmpeg to extract high-quality audio (WAV) from an input file.
         FFmpeg is the industry standard for media conversion, handling 
@@ -60,7 +131,11 @@ class FileProcessingService:
         Args:
             input_path: Path to the original video/audio.
             output_path: Target path for the extracted audio.
+            canonical: Write the memory-mappable layout (mono, 32-bit float PCM,
+                native rate) that AudioBuffer.from_memmap expects.
         """
+        # -ac 1 = mono downmix, pcm_f32le = raw float32 samples (mappable as-is)
+        layout = ["-ac", "1", "-c:a", "pcm_f32le"] if canonical else []
         try:
             # -q:a 0 = best quality
             # -map a = extract audio track only
@@ -74,6 +149,7 @@ class FileProcessingService:
                     "0",
                     "-map",
                     "a",
+                    *layout,
                     "-y",
                     output_path,
                 ],
@@ -86,6 +162,195 @@ class FileProcessingService:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] FFmpeg CLI Exception: {e.stderr.decode()}")
             return False
 
+    @staticmethod
+    def probe_audio(input_path: str) -> Tuple[int, int, float]:
+        """
+        Reads the first audio stream's layout with ffprobe.
+        
+        Returns: (sample_rate, channels, duration_seconds)
+        """
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v", "error",
+                "-select_streams", "a:0",
+                "-show_entries", "stream=sample_rate,channels:format=duration",
+                "-of", "json",
+                input_path,
+            ],
+            check=True,
+            capture_output=True,
+        )
+        info = json.loads(result.stdout or b"{}")
+        streams = info.get("streams") or []
+        if not streams:
+            raise ValueError(f"No audio stream found in {input_path}")
+        stream = streams[0]
+        duration = float(info.get("format", {}).get("duration") or 0.0)
+        return int(stream["sample_rate"]), int(stream.get("channels") or 1), duration
+
+    @staticmethod
+    def decode_audio_array(input_path: str, sample_rate: Optional[int] = None, channels: int = 1) -> Tuple[np.ndarray, int]:
+        """
+        Streams float32 PCM from FFmpeg's stdout into a preallocated NumPy buffer,
+        skipping the intermediate WAV file entirely.
+        
+        Args:
+            input_path: Path to the original video/audio.
+            sample_rate: Target rate (None keeps the source rate).
+            channels: Output channel count (1 = mono downmix).
+        
+        Returns: (samples, sample_rate); samples are shaped (n,) for mono or (n, channels).
+        """
+        native_rate, _, duration = FileProcessingService.probe_audio(input_path)
+        sample_rate = int(sample_rate or native_rate)
+
+        # Size from the container duration (+1s slack); grows if the estimate is short
+        capacity = max(int((duration + 1.0) * sample_rate) * channels, sample_rate * channels)
+        buffer = np.empty(capacity, dtype=np.float32)
+        filled = 0  # in bytes
+
+        proc = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-loglevel", "error",
+                "-i", input_path,
+                "-map", "a:0",
+                "-vn",
+                "-ac", str(channels),
+                "-ar", str(sample_rate),
+                "-f", "f32le",
+                "pipe:1",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        try:
+            while True:
+                if filled == buffer.nbytes:
+                    grown = np.empty(int(buffer.size * 1.5) + sample_rate * channels, dtype=np.float32)
+                    grown[: buffer.size] = buffer
+                    buffer = grown
+                view = memoryview(buffer).cast("B")[filled:]
+                n = proc.stdout.readinto(view)
+                if not n:
+                    break
+                filled += n
+            stderr = proc.stderr.read()
+            if proc.wait() != 0:
+                raise RuntimeError(f"FFmpeg PCM decode failed: {stderr.decode(errors='ignore')}")
+        finally:
+            proc.stdout.close()
+            proc.stderr.close()
+            if proc.poll() is None:
+                proc.kill()
+
+        samples = buffer[: filled // 4]
+        # Release the unused tail of the estimate (only when it is a meaningful amount)
+        if samples.size < buffer.size * 0.9:
+            samples = samples.copy()
+        if channels > 1:
+            samples = samples[: samples.size - samples.size % channels].reshape(-1, channels)
+        return samples, sample_rate
+
+    def load_audio(self, input_path: str, audio_path: str) -> AudioBuffer:
+        """
+        Produces the shared decoded signal for the analyzers.
+        In "memmap" mode FFmpeg writes the canonical WAV and the buffer maps
+        it (pool workers re-map the same file instead of receiving a copy);
+        in "pipe" mode it is decoded straight from the upload; otherwise
+        the extracted WAV is read back.
+        """
+        if self.AUDIO_EXTRACTION_MODE == "memmap":
+            if not os.path.exists(audio_path) and not self.extract_audio(input_path, audio_path, canonical=True):
+                raise RuntimeError("FFmpeg extraction failure")
+            return AudioBuffer.from_memmap(audio_path)
+        if self.AUDIO_EXTRACTION_MODE == "pipe":
+            samples, sr = self.decode_audio_array(input_path, sample_rate=None, channels=1)
+            return AudioBuffer(samples, sr)
+        return AudioBuffer.from_file(audio_path)
+
+    @staticmethod
+    def ensure_audio_file(audio: AudioBuffer, audio_path: str) -> str:
+        """
+        Materializes the WAV only for consumers that still need a path
+        (e.g. the transcription upload). No-op when it already exists.
+        """
+        if not os.path.exists(audio_path):
+            import soundfile as sf
+            sf.write(audio_path, audio.at_rate(None), audio.sample_rate, subtype="PCM_16")
+        return audio_path
+
+    @classmethod
+    def transcription_encoding(cls, audio: AudioBuffer) -> Tuple[str, int]:
+        """
+        (format, sample_rate) actually sent to AssemblyAI for this buffer:
+        TRANSCRIPTION_AUDIO_FORMAT, except that Opus falls back to FLAC when
+        libsndfile cannot encode it; "wav" keeps the native rate.
+        """
+        fmt = cls.TRANSCRIPTION_AUDIO_FORMAT
+        if fmt == "wav":
+            return fmt, audio.sample_rate
+
+        import soundfile as sf
+        if fmt == "opus" and "OPUS" not in sf.available_subtypes("OGG"):
+            # libsndfile < 1.0.29 has no Opus encoder
+            fmt = "flac"
+        return fmt, cls.TRANSCRIPTION_SAMPLE_RATE
+
+    @classmethod
+    def encode_transcription_audio(cls, audio: AudioBuffer, audio_path: str, input_path: Optional[str] = None) -> str:
+        """
+        Writes the transcription upload next to audio_path: mono, 16kHz,
+        compressed with TRANSCRIPTION_AUDIO_FORMAT. Reuses the 16kHz copy
+        the Clarity analyzer also reads. With input_path, the log compares
+        the upload with the WAV that used to be sent.
+        
+        Returns: Path of the encoded file.
+        """
+        fmt, _ = cls.transcription_encoding(audio)
+        if fmt == "wav":
+            return cls.ensure_audio_file(audio, audio_path)
+
+        import soundfile as sf
+        start = time.perf_counter()
+        samples = audio.at_rate(cls.TRANSCRIPTION_SAMPLE_RATE)
+        base_path = os.path.join(os.path.dirname(audio_path), "transcription")
+        if fmt == "opus":
+            output_path = f"{base_path}.ogg"
+            sf.write(output_path, samples, cls.TRANSCRIPTION_SAMPLE_RATE, format="OGG", subtype="OPUS")
+        else:
+            output_path = f"{base_path}.flac"
+            sf.write(output_path, samples, cls.TRANSCRIPTION_SAMPLE_RATE, format="FLAC", subtype="PCM_16")
+
+        encoded_bytes = os.path.getsize(output_path)
+        elapsed = time.perf_counter() - start
+        wav_bytes = cls.legacy_wav_size(audio, input_path) if input_path else None
+        if wav_bytes is None:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Transcription input ({fmt}): {encoded_bytes / 1e6:.1f}MB in {elapsed:.2f}s")
+        else:
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Transcription input ({fmt}): "
+                f"{encoded_bytes / 1e6:.1f}MB vs {wav_bytes / 1e6:.1f}MB WAV "
+                f"(saved {(wav_bytes - encoded_bytes) / 1e6:.1f}MB) in {elapsed:.2f}s"
+            )
+        return output_path
+
+    @classmethod
+    def legacy_wav_size(cls, audio: AudioBuffer, input_path: str) -> Optional[int]:
+        """
+        Size of the upload this encoding replaced: the 16-bit PCM WAV that
+        extract_audio wrote at the source rate and channel count (44-byte header).
+        None if the source layout cannot be probed.
+        """
+        try:
+            _, channels, _ = cls.probe_audio(input_path)
+        except (subprocess.CalledProcessError, ValueError, KeyError, OSError):
+            return None
+        # The buffer is the mono downmix at the source rate: one sample per frame
+        return len(audio.samples) * channels * 2 + 44
+
     def transcribe_audio(self, audio_path: str) -> Optional[aai.Transcript]:
         """
         Dispatches the audio to AssemblyAI's neural transcription servers.
@@ -104,8 +369,16 @@ class FileProcessingService:
                 format_text=True,
                 disfluencies=True,
             )
+            # Upload separately so its share of the latency is visible
+            start = time.perf_counter()
+            upload_url = self.transcriber.upload_file(audio_path)
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Uploaded {os.path.getsize(audio_path) / 1e6:.1f}MB "
+                f"for transcription in {time.perf_counter() - start:.2f}s"
+            )
+
             # Synchronous wait for transcript response (handled by wrapper)
-            transcript = self.transcriber.transcribe(audio_path, config)
+            transcript = self.transcriber.transcribe(upload_url, config)
 
             if transcript.status == aai.TranscriptStatus.error:
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] AssemblyAI Cloud Error: {transcript.error}")
@@ -133,7 +406,34 @@ class FileProcessingService:
             for word in transcript.words
         ]
 
-    async def process_file(self, file: UploadFile) -> Tuple[str, List[Dict], str, str]:
+    def transcribe_with_cache(self, audio: AudioBuffer, audio_path: str, input_path: Optional[str] = None) -> Optional[Tuple[str, List[Dict]]]:
+        """
+        Transcript lookup keyed by the decoded audio's fingerprint and the
+        upload encoding; only a miss encodes the upload file and sends it to AssemblyAI.
+        
+        Returns: (transcript_text, captions) or None if transcription failed.
+        """
+        # VERSION covers the TranscriptionConfig; the upload format and rate are keyed
+        # too, since a lossy or resampled upload can transcribe differently
+        fmt, sample_rate = self.transcription_encoding(audio)
+        key = f"{self.VERSION}-{fmt}-{sample_rate}-{audio.fingerprint}"
+        if self.transcript_cache:
+            cached = self.transcript_cache.load(key)
+            if cached is not None:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Transcript cache hit ({len(cached[1])} words)")
+                return cached
+
+        upload_path = self.encode_transcription_audio(audio, audio_path, input_path)
+        transcript = self.transcribe_audio(upload_path)
+        if not transcript:
+            return None
+
+        text, captions = transcript.text, self.extract_captions(transcript)
+        if self.transcript_cache:
+            self.transcript_cache.save(key, text, captions)
+        return text, captions
+
+    async def process_file(self, file: UploadFile, workspace: Optional[str] = None) -> Tuple[str, List[Dict], str, str, str]:
         """
         Full Pipeline (Orchestrator):
         1. Create isolated temporary workspace.
@@ -142,10 +442,12 @@ class FileProcessingService:
         4. Dispatch for transcription (AssemblyAI).
         5. Structure word-level timestamps.
         
-        Returns: (transcript_text, captions, file_type, audio_path)
+        Returns: (transcript_text, captions, file_type, audio_path, content_hash)
+        content_hash is the SHA-256 of the uploaded bytes (result cache key).
+        workspace: existing directory to use instead of a fresh temp dir (job storage).
         """
         # Step A: Workspace setup (Temporary)
-        temp_dir = tempfile.mkdtemp()  # Persistent path during this session
+        temp_dir = workspace or tempfile.mkdtemp()  # Persistent path during this session
 
         try:
             # Step B: Secure Upload and I/O writing
@@ -153,14 +455,14 @@ class FileProcessingService:
             input_path = os.path.join(temp_dir, f"input{file_ext}")
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Ingesting file into: {input_path}")
 
-            with open(input_path, "wb") as f:
-                content = await file.read()
-                # Secondary size check per-session
-                if len(content) > self.MAX_FILE_SIZE:
-                    raise HTTPException(
-                        status_code=413, detail="File size exceeds the 100MB threshold"
-                    )
-                f.write(content)
+            # Fast reject when the client declared the size up front
+            if file.size is not None and file.size > self.MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=413, detail=self.size_limit_message(self.MAX_FILE_SIZE)
+                )
+            # Chunked copy with an enforced byte budget (the declared size can lie)
+            # The hash is computed on the same pass, for the result cache
+            _, content_hash = await self.stream_upload(file, input_path, self.MAX_FILE_SIZE, hash_algorithm="sha256")
 
             # Step C: Metadata analysis
             is_video = self.is_video_file(file.filename)
@@ -168,17 +470,21 @@ class FileProcessingService:
 
             # Step D: Media Conversion
             # Required for uniformity in analysis (Loudness, Intonation)
+            # In "memmap"/"pipe" mode the audio is extracted later by load_audio
+            # (a pipeline stage, so it overlaps with the rest of the graph); in
+            # "pipe" mode this path is only written if a consumer needs a file.
             audio_path = os.path.join(temp_dir, "audio.wav")
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Processing media conversion (FFmpeg)...")
-            # Thread isolation: Media conversion is CPU bound; we wrap it in to_thread to keep API responsive.
-            if not await asyncio.to_thread(self.extract_audio, input_path, audio_path):
-                raise HTTPException(status_code=500, detail="FFmpeg extraction failure")
+            if self.AUDIO_EXTRACTION_MODE == "file":
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Processing media conversion (FFmpeg)...")
+                # Thread isolation: Media conversion is CPU bound; we wrap it in to_thread to keep API responsive.
+                if not await asyncio.to_thread(self.extract_audio, input_path, audio_path):
+                    raise HTTPException(status_code=500, detail="FFmpeg extraction failure")
 
             # Step E: Transcription Dispatch (Skipped here to avoid double-processing)
             # We only extract audio and return it for the async parallel pipeline
             
             # Step F: Structuring results (Skipped)
-            return None, None, file_type, audio_path
+            return None, None, file_type, audio_path, content_hash
         except Exception as e:
             # Cleanup Hook: Ensure disk space is cleared on failure.
             import shutil
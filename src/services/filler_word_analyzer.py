@@ -1,26 +1,6 @@
-import nltk
-from nltk import word_tokenize, pos_tag, ngrams
-from typing import List, Dict
-
-# -----------------------------
-# Static NLTK Resource Management
-# -----------------------------
-# These resources are required for tokenization (punkt) and Part-of-Speech tagging (averaged_perceptron_tagger).
-# We ensure they are present at the start of the service lifecycle.
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download("punkt", quiet=True)
-    
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download("punkt_tab", quiet=True)
-    
-try:
-    nltk.data.find('taggers/averaged_perceptron_tagger_eng')
-except LookupError:
-    nltk.download("averaged_perceptron_tagger_eng", quiet=True)
+from typing import List, Dict, Optional, Tuple
+from ..models.text_annotations import TextAnnotations
+from . import transcript_annotator
 
 
 # -----------------------------
@@ -45,15 +25,91 @@ MULTI_WORD_FILLERS = {
     "basically speaking", "just saying"
 }
 
+# Key marking the end of a phrase in the trie (tokens are never None)
+_PHRASE_END = None
+
+
+def _build_phrase_trie(phrases, tokenize=str.split) -> Dict:
+    """Nested token -> dict map; the node of a phrase's last token holds the phrase under _PHRASE_END."""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for token in tokenize(phrase):
+            node = node.setdefault(token, {})
+        node[_PHRASE_END] = phrase
+    return trie
+
+
+def _tokenize_phrase(phrase: str) -> List[str]:
+    """Lower-cased tokens as the annotation pass produces them ("i'm" -> "i", "'m")."""
+    return [token.text.lower() for token in transcript_annotator.get_nlp().tokenizer(phrase) if not token.is_space]
+
+
+def unmatchable_phrases(phrases, trie: Dict, tokenize=_tokenize_phrase) -> List[str]:
+    """Phrases the trie would not find in a tokenized sentence that contains them."""
+    missing = []
+    for phrase in phrases:
+        tokens = tokenize(f"and {phrase}, so")
+        if not any(found == phrase for _, _, found in match_phrases(tokens, trie)):
+            missing.append(phrase)
+    return sorted(missing)
+
+
+_phrase_trie = None
+
+
+def get_phrase_trie() -> Dict:
+    """
+    MULTI_WORD_FILLERS compiled with the spaCy tokenizer, so phrases split
+    exactly like the transcript tokens. Built on first use (spaCy loads lazily);
+    raises ValueError if a configured phrase could never match.
+    """
+    global _phrase_trie
+    if _phrase_trie is None:
+        trie = _build_phrase_trie(MULTI_WORD_FILLERS, _tokenize_phrase)
+        missing = unmatchable_phrases(MULTI_WORD_FILLERS, trie)
+        if missing:
+            raise ValueError(f"Filler phrases that can never match the transcript tokens: {missing}")
+        _phrase_trie = trie
+    return _phrase_trie
+
+
+def match_phrases(tokens: List[str], trie: Optional[Dict] = None) -> List[Tuple[int, int, str]]:
+    """
+    All (start, end, phrase) occurrences of the trie's phrases (default: the
+    multi-word fillers) in the lower-cased tokens, end exclusive, ordered by
+    position. Overlapping matches are all reported ("you know" inside
+    "you know what i mean").
+    """
+    if trie is None:
+        trie = get_phrase_trie()
+    matches = []
+    for start in range(len(tokens)):
+        node = trie.get(tokens[start])
+        end = start + 1
+        while node is not None:
+            phrase = node.get(_PHRASE_END)
+            if phrase is not None:
+                matches.append((start, end, phrase))
+            if end == len(tokens):
+                break
+            node = node.get(tokens[end])
+            end += 1
+    return matches
+
 
 class FillerWordAnalyzer:
     """
     Identifies and quantifies the use of filler words in a speech transcript.
     Uses hybrid logic:
     1. Lexicon lookup for unambiguous fillers (um, uh).
-    2. POS Tagging for ambiguous terms (like, so, well) to filter semantic uses.
-    3. N-gram analysis for multi-word phrases (you know, i mean).
+    2. POS tags (Penn Treebank, from the shared spaCy annotations) for ambiguous
+       terms (like, so, well) to filter semantic uses.
+    3. Token-trie matching for multi-word phrases (you know, i mean).
     """
+
+    # Bump when the output for the same input changes (invalidates cached results)
+    VERSION = "4"
     
     @staticmethod
     def is_filler(word: str, tag: str, prev_tag: str = None, next_tag: str = None) -> bool:
@@ -107,35 +163,44 @@ class FillerWordAnalyzer:
         return False
 
     @staticmethod
-    def identify_fillers(text: str) -> Dict:
+    def identify_fillers(text: str, annotations: Optional[TextAnnotations] = None,
+                         captions: Optional[List[Dict]] = None) -> Dict:
         """
         Full analysis pass on a transcript text.
-        1. Tokenizes and tags parts of speech.
+        1. Reads tokens and POS tags from the transcript annotations (tags the text if not given).
         2. Scans for 1-word fillers with ambiguity resolution.
-        3. Scans for 2/3/4-word filler phrases.
+        3. Scans for multi-word filler phrases.
         4. Calculates density percentages.
+        Every filler is also listed in order of appearance under "occurrences",
+        with its token position and, when the annotations are aligned to the
+        captions, its caption word index and start/end time (ms).
         """
-        tokens = word_tokenize(text)
-        tags = pos_tag(tokens)
+        if annotations is None:
+            annotations = transcript_annotator.annotate(text, captions)
+        tokens = annotations.text
+        tags = annotations.tag
 
-        fillers_found = []
+        # (start token, end token, filler) spans
+        spans = []
 
         # Step A: 1-word Filler Scan
-        for i, (word, tag) in enumerate(tags):
-            prev_tag = tags[i-1][1] if i > 0 else None
-            next_tag = tags[i+1][1] if i < len(tags)-1 else None
+        for i, (word, tag) in enumerate(zip(tokens, tags)):
+            prev_tag = tags[i-1] if i > 0 else None
+            next_tag = tags[i+1] if i < len(tags)-1 else None
 
             if FillerWordAnalyzer.is_filler(word, tag, prev_tag, next_tag):
-                fillers_found.append(word)
+                spans.append((i, i + 1, word))
 
-        # Step B: Multi-word Phrase Scan (sliding window N-grams)
-        # Higher N captures longer colloquialisms like 'you know what i mean'.
-        lowered_tokens = [t.lower() for t in tokens]
-        for n in [2, 3, 4]:
-            for gram in ngrams(lowered_tokens, n):
-                phrase = " ".join(gram)
-                if phrase in MULTI_WORD_FILLERS:
-                    fillers_found.append(phrase)
+        # Step B: Multi-word Phrase Scan (one pass over the token trie)
+        # Captures longer colloquialisms like 'you know what i mean'.
+        spans.extend(match_phrases([t.lower() for t in tokens]))
+        spans.sort(key=lambda span: (span[0], span[1]))
+
+        fillers_found = [filler for _, _, filler in spans]
+        occurrences = [
+            FillerWordAnalyzer._occurrence(start, end, filler, annotations.word_index, captions)
+            for start, end, filler in spans
+        ]
 
         # Aggregation of counts and unique instances
         filler_counts = {}
@@ -152,5 +217,20 @@ class FillerWordAnalyzer:
             "filler_counts": filler_counts,
             "total_fillers": total_fillers,
             "total_words": total_words,
-            "filler_percentage": round(filler_percentage, 2)
+            "filler_percentage": round(filler_percentage, 2),
+            "occurrences": occurrences
         }
+
+    @staticmethod
+    def _occurrence(start: int, end: int, filler: str, word_index: List[int],
+                    captions: Optional[List[Dict]]) -> Dict:
+        """Places a filler's token span on the caption timeline."""
+        occurrence = {"filler": filler, "token_start": start, "token_end": end,
+                      "word_start": None, "word_end": None, "start": None, "end": None}
+        words = [w for w in word_index[start:end] if w >= 0]
+        if words:
+            occurrence["word_start"], occurrence["word_end"] = words[0], words[-1]
+            if captions:
+                occurrence["start"] = captions[words[0]]["start"]
+                occurrence["end"] = captions[words[-1]]["end"]
+        return occurrence
@@ -0,0 +1,333 @@
+import bisect
+import os
+import re
+import shutil
+import subprocess
+import cv2
+import time
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+
+
+@dataclass
+class SampledFrame:
+    """A decoded, resized RGB frame handed to every visual consumer"""
+    index: int          # Frame number in the source video
+    time: float         # Seconds from the start of the video
+    rgb: np.ndarray     # HxWx3 uint8, RGB order (MediaPipe input format)
+    width: int
+    height: int
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_version() -> Optional[Tuple[int, int]]:
+    """(major, minor) of the ffmpeg on PATH; None if missing or a git build (N-xxxxx)."""
+    if not shutil.which("ffmpeg"):
+        return None
+    try:
+        result = subprocess.run(["ffmpeg", "-version"], check=True, capture_output=True)
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    match = re.search(r"ffmpeg version n?(\d+)\.(\d+)", result.stdout.decode(errors="ignore"))
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def parse_packets(lines: List[str]) -> Tuple[List[int], Optional[bool]]:
+    """
+    Keyframe frame numbers and a constant-frame-rate flag from ffprobe
+    "pts,flags" packet lines. Packets are listed in decode order, which differs
+    from presentation order when the stream has B-frames, so a frame's number
+    is the rank of its pts among all pts. Without usable pts, falls back to the
+    packet order and the frame rate is unknown (None).
+    """
+    packets = []
+    for line in lines:
+        pts, _, flags = line.partition(",")
+        try:
+            packets.append((int(pts), "K" in flags))
+        except ValueError:
+            # pts N/A
+            continue
+    if not packets:
+        return [i for i, line in enumerate(lines) if "K" in line.partition(",")[2]], None
+
+    presentation = sorted(pts for pts, _ in packets)
+    keyframes = sorted(bisect.bisect_left(presentation, pts) for pts, key in packets if key)
+    steps = np.diff(presentation)
+    # One tick of slack: e.g. 29.97fps in a 1/1000 time base alternates 33/34
+    constant = bool(len(steps) == 0 or steps.max() - steps.min() <= 1)
+    return keyframes, constant
+
+
+class FrameSource:
+    """
+    Decodes a video once and yields every n-th frame as RGB.
+    All visual analyzers consume the same frames, so the video is never
+    opened, decoded or colour-converted more than once per analysis.
+
+    Sampling strategies:
+    - "seek": CAP_PROP_POS_FRAMES before every sample. Each seek re-decodes
+      from the previous keyframe, so it only pays off when samples are
+      further apart than the GOP.
+    - "grab": sequential decoding; skipped frames are grab()-ed and never
+      retrieved or colour-converted.
+    - "keyframe": sequential grab() inside a GOP, seek only when a keyframe
+      lies between the current position and the next sample.
+    - "ffmpeg": FFmpeg's select + scale filters emit only the sampled frames,
+      already resized and in RGB, over a pipe. Frame times are derived from
+      the frame rate, so variable-frame-rate streams (and hosts without
+      ffmpeg) fall back to "seek".
+    - "auto": picks one of the above from the GOP structure, stride and
+      source size (thresholds measured with benchmark_frame_sampling.py).
+    """
+
+    # MediaPipe doesn't need high resolution for face/body silhouette tracking
+    MAX_DIM = 640
+    STRATEGIES = {"auto", "seek", "grab", "keyframe", "ffmpeg"}
+    DEFAULT_STRATEGY = os.getenv("FRAME_SAMPLING_STRATEGY", "auto").lower()
+    # "auto" thresholds (see benchmark_frame_sampling.py for the measurements):
+    # FFmpeg's decode + scale only beats grab for very dense sampling of large sources
+    FFMPEG_MAX_STRIDE = 2
+    FFMPEG_MIN_DIM = 1920
+
+    def __init__(self, video_path: str, sample_every_n_frames: int = 30, max_dim: int = MAX_DIM,
+                 strategy: Optional[str] = None, start_frame: int = 0, end_frame: Optional[int] = None):
+        """
+        start_frame/end_frame restrict sampling to [start_frame, end_frame) so
+        time shards of one video can be decoded by separate workers.
+        """
+        self.video_path = video_path
+        self.sample_every_n_frames = sample_every_n_frames
+        self.max_dim = max_dim
+        self.start_frame = start_frame
+
+        self.cap = cv2.VideoCapture(video_path)
+        # Windows-specific retry logic for I/O locks/race conditions
+        if not self.cap.isOpened():
+            time.sleep(0.5)
+            self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Cannot open video file: {video_path}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.frame_duration = 1.0 / self.fps
+        self.end_frame = min(end_frame, self.total_frames) if end_frame is not None else self.total_frames
+
+        strategy = (strategy or self.DEFAULT_STRATEGY).lower()
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown frame sampling strategy: {strategy}")
+        self._keyframes: Optional[List[int]] = None
+        self._constant_frame_rate: Optional[bool] = None
+        self.strategy = self._choose_strategy() if strategy == "auto" else strategy
+        if self.strategy == "ffmpeg" and not self._ffmpeg_usable():
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] [Frames] ffmpeg sampling unavailable for {video_path} "
+                  f"(missing ffmpeg or variable frame rate); using seek")
+            self.strategy = "seek"
+
+    @property
+    def segment_duration(self) -> float:
+        """Seconds of video represented by one sampled frame"""
+        return self.sample_every_n_frames * self.frame_duration
+
+    # ---------------------------
+    # GOP inspection
+    # ---------------------------
+    def _probe_packets(self):
+        """
+        Reads packet pts and flags with ffprobe (demux only, nothing is decoded).
+        Leaves no keyframes and an unknown frame rate if ffprobe is unavailable.
+        """
+        self._keyframes = []
+        if not shutil.which("ffprobe"):
+            return
+        try:
+            result = subprocess.run(
+                [
+                    "ffprobe",
+                    "-v", "error",
+                    "-select_streams", "v:0",
+                    "-show_entries", "packet=pts,flags",
+                    "-of", "csv=p=0",
+                    self.video_path,
+                ],
+                check=True,
+                capture_output=True,
+            )
+        except subprocess.CalledProcessError:
+            return
+        lines = result.stdout.decode(errors="ignore").split()
+        self._keyframes, self._constant_frame_rate = parse_packets(lines)
+
+    @property
+    def keyframes(self) -> List[int]:
+        """Frame numbers (presentation order) of keyframes. Empty if ffprobe is unavailable."""
+        if self._keyframes is None:
+            self._probe_packets()
+        return self._keyframes
+
+    @property
+    def constant_frame_rate(self) -> Optional[bool]:
+        """Whether all frames are equally spaced (None if unknown)."""
+        if self._keyframes is None:
+            self._probe_packets()
+        return self._constant_frame_rate
+
+    def _ffmpeg_usable(self) -> bool:
+        # Unknown frame rate (no ffprobe) keeps the CFR assumption
+        return shutil.which("ffmpeg") is not None and self.constant_frame_rate is not False
+
+    @property
+    def average_gop(self) -> Optional[float]:
+        kf = self.keyframes
+        if len(kf) < 2:
+            return None
+        return (kf[-1] - kf[0]) / (len(kf) - 1)
+
+    def _choose_strategy(self) -> str:
+        gop = self.average_gop
+        # Samples further apart than a GOP: seeking skips whole GOPs without decoding them.
+        # Seek and keyframe measure the same there, and seek needs no keyframe lookups.
+        # At exactly one GOP every seek re-decodes a whole GOP, and grab still wins.
+        if gop is not None and self.sample_every_n_frames > gop:
+            return "seek"
+        # Within a GOP everything gets decoded anyway; only for very dense sampling
+        # of large sources does FFmpeg's downscale + RGB conversion pay for the pipe
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if (self.sample_every_n_frames <= self.FFMPEG_MAX_STRIDE and max(width, height) >= self.FFMPEG_MIN_DIM
+                and self._ffmpeg_usable()):
+            return "ffmpeg"
+        return "grab"
+
+    # ---------------------------
+    # Decoding
+    # ---------------------------
+    def _target_size(self, width: int, height: int):
+        if width > self.max_dim or height > self.max_dim:
+            scale = self.max_dim / max(width, height)
+            return int(width * scale), int(height * scale)
+        return width, height
+
+    def _to_rgb(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        if w > self.max_dim or h > self.max_dim:
+            frame = cv2.resize(frame, self._target_size(w, h))
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def _sample(self, frame_index: int, frame: np.ndarray) -> SampledFrame:
+        if frame_index % 100 == 0:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] [Frames] Decoding frame {frame_index}/{self.total_frames} ({self.strategy})...")
+        rgb = self._to_rgb(frame)
+        h, w = rgb.shape[:2]
+        return SampledFrame(index=frame_index, time=frame_index * self.frame_duration, rgb=rgb, width=w, height=h)
+
+    def _frames_seek(self) -> Iterator[SampledFrame]:
+        frame_index = self.start_frame
+        while frame_index < self.end_frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            yield self._sample(frame_index, frame)
+            frame_index += self.sample_every_n_frames
+
+    def _frames_sequential(self, keyframe_aware: bool) -> Iterator[SampledFrame]:
+        keyframes = self.keyframes if keyframe_aware else []
+        position = 0  # Frame number the next read()/grab() returns
+        target = self.start_frame
+        if target > 0:
+            # Shards start with one seek instead of decoding everything before them
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            position = target
+        while target < self.end_frame:
+            # Seek only if a keyframe sits between here and the target;
+            # otherwise decoding forward is cheaper than restarting from a keyframe.
+            k = bisect.bisect_right(keyframes, target) - 1
+            if keyframe_aware and k >= 0 and keyframes[k] > position:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                position = target
+            while position < target:
+                if not self.cap.grab():
+                    return
+                position += 1
+
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            position += 1
+            yield self._sample(target, frame)
+            target += self.sample_every_n_frames
+
+    def _frames_ffmpeg(self) -> Iterator[SampledFrame]:
+        # Output geometry must match what OpenCV would produce; read one frame to learn it
+        ret, first = self.cap.read()
+        if not ret:
+            return
+        width, height = self._target_size(first.shape[1], first.shape[0])
+        frame_bytes = width * height * 3
+        n_samples = -(-(self.end_frame - self.start_frame) // self.sample_every_n_frames)
+        if n_samples <= 0:
+            return
+
+        # One output frame per selected frame; -fps_mode replaced -vsync in ffmpeg 5.1
+        version = ffmpeg_version()
+        sync_option = "-vsync" if version is not None and version < (5, 1) else "-fps_mode"
+
+        proc = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-loglevel", "error",
+                # Input seeking: jumps to the keyframe, then decodes accurately to the shard start
+                "-ss", f"{self.start_frame * self.frame_duration:.6f}",
+                "-i", self.video_path,
+                "-map", "0:v:0",
+                "-vf", f"select='not(mod(n\\,{self.sample_every_n_frames}))',scale={width}:{height}:flags=bilinear",
+                sync_option, "passthrough",
+                "-frames:v", str(n_samples),
+                "-f", "rawvideo",
+                "-pix_fmt", "rgb24",
+                "pipe:1",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            frame_index = self.start_frame
+            while frame_index < self.end_frame:
+                buf = proc.stdout.read(frame_bytes)
+                if len(buf) < frame_bytes:
+                    break
+                if frame_index % 100 == 0:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] [Frames] Decoding frame {frame_index}/{self.total_frames} ({self.strategy})...")
+                rgb = np.frombuffer(buf, dtype=np.uint8).reshape(height, width, 3)
+                yield SampledFrame(index=frame_index, time=frame_index * self.frame_duration, rgb=rgb, width=width, height=height)
+                frame_index += self.sample_every_n_frames
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+
+    def frames(self) -> Iterator[SampledFrame]:
+        if self.strategy == "seek":
+            return self._frames_seek()
+        if self.strategy == "ffmpeg":
+            return self._frames_ffmpeg()
+        return self._frames_sequential(keyframe_aware=self.strategy == "keyframe")
+
+    def __iter__(self) -> Iterator[SampledFrame]:
+        return self.frames()
+
+    def close(self):
+        self.cap.release()
+
+    def __enter__(self) -> "FrameSource":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,6 +1,9 @@
+import asyncio
+import os
 from google import genai
+from google.genai import types
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 from ..utils.LLM_judge import build_prompt
 
 
@@ -20,34 +23,83 @@ class FinalFeedback(BaseModel):
 
 class GeminiFeedbackService:
 
-    def __init__(self, api_key: str):
-        self.client = genai.Client(api_key=api_key)
+    MODEL = "gemini-2.5-flash" # Use a stable model name
+    # Upper bound the pipeline waits for Gemini before falling back to the default feedback
+    TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        base_url (or GEMINI_BASE_URL) points the client at another endpoint,
+        e.g. a local fake LLM server for tests.
+        """
+        self.timeout = timeout if timeout is not None else self.TIMEOUT_SECONDS
+        base_url = base_url or os.getenv("GEMINI_BASE_URL")
+        http_options = types.HttpOptions(
+            base_url=base_url,
+            timeout=int(self.timeout * 1000),  # milliseconds
+        )
+        self.client = genai.Client(api_key=api_key, http_options=http_options)
+
+    def _request_config(self) -> Dict:
+        return {
+            "response_mime_type": "application/json",
+            "response_schema": FinalFeedback
+        }
+
+    @staticmethod
+    def _parse_response(response) -> FinalFeedback:
+        if not response or not response.parsed:
+            raise ValueError("Empty or invalid response from Gemini")
+        return response.parsed
+
+    @staticmethod
+    def default_feedback(error: str) -> FinalFeedback:
+        """Default object returned instead of crashing the pipeline"""
+        return FinalFeedback(
+            overall_score=0,
+            summary="Feedback generation failed. Please try again later.",
+            strengths=["Data processing completed."],
+            key_issues=["AI Feedback service unavailable."],
+            detailed_feedback=[
+                FeedbackItem(category="System", feedback_text=f"The feedback generator encountered an error: {error}")
+            ],
+            actionable_improvements=["Review the raw metrics above for insights."]
+        )
 
     def generate_feedback(self, prepared_data: dict) -> FinalFeedback:
         prompt = build_prompt(prepared_data)
-    
+
         try:
             response = self.client.models.generate_content(
-                model="gemini-2.5-flash", # Use a stable model name
+                model=self.MODEL,
                 contents=prompt,
-                config={
-                    "response_mime_type": "application/json",
-                    "response_schema": FinalFeedback
-                }
+                config=self._request_config()
+            )
+            return self._parse_response(response)
+        except Exception as e:
+            print(f"Error generating feedback: {str(e)}")
+            return self.default_feedback(str(e))
+
+    async def generate_feedback_async(self, prepared_data: dict) -> FinalFeedback:
+        """
+        Non-blocking variant for the event loop (uses the client's aio API).
+        Falls back to the default feedback on error or after `timeout` seconds.
+        """
+        prompt = build_prompt(prepared_data)
+
+        try:
+            response = await asyncio.wait_for(
+                self.client.aio.models.generate_content(
+                    model=self.MODEL,
+                    contents=prompt,
+                    config=self._request_config()
+                ),
+                timeout=self.timeout,
             )
-            if not response or not response.parsed:
-                raise ValueError("Empty or invalid response from Gemini")
-            return response.parsed
+            return self._parse_response(response)
+        except asyncio.TimeoutError:
+            print(f"Error generating feedback: timed out after {self.timeout:.0f}s")
+            return self.default_feedback(f"Request timed out after {self.timeout:.0f} seconds")
         except Exception as e:
             print(f"Error generating feedback: {str(e)}")
-            # Return a default object to avoid crashing the pipeline
-            return FinalFeedback(
-                overall_score=0,
-                summary="Feedback generation failed. Please try again later.",
-                strengths=["Data processing completed."],
-                key_issues=["AI Feedback service unavailable."],
-                detailed_feedback=[
-                    FeedbackItem(category="System", feedback_text=f"The feedback generator encountered an error: {str(e)}")
-                ],
-                actionable_improvements=["Review the raw metrics above for insights."]
-            )
\ No newline at end of file
+            return self.default_feedback(str(e))
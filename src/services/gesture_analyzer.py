@@ -1,9 +1,25 @@
-import cv2
 import mediapipe as mp
 import math
-from datetime import datetime
 from collections import defaultdict
-from typing import Dict, List
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from .frame_source import FrameSource, SampledFrame
+from .video_analyzer import VideoAnalyzer
+
+
+@dataclass
+class GestureAnalysisState:
+    """Running gesture counters for a stream of sampled frames"""
+    gesture_counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    gesture_frames: int = 0
+    processed_frames: int = 0
+    total_motion: float = 0.0
+    previous_left_wrist: Optional[object] = None
+    previous_right_wrist: Optional[object] = None
+
+    def carry_over(self) -> "GestureAnalysisState":
+        """Fresh counters that keep the previous wrist positions (used after a shard's warm-up)"""
+        return GestureAnalysisState(previous_left_wrist=self.previous_left_wrist, previous_right_wrist=self.previous_right_wrist)
 
 
 class GestureAnalyzer:
@@ -18,6 +34,9 @@ class GestureAnalyzer:
     - Low gesture usage
     """
 
+    # Bump when the output for the same input changes (invalidates cached results)
+    VERSION = "1"
+
     def __init__(self):
         pass
 
@@ -98,109 +117,95 @@ class GestureAnalyzer:
 
         return left_cross < 0.15 and right_cross < 0.15
 
-    def analyze_gestures(self, video_path: str, sample_every_n_frames: int = 30) -> Dict:
-        if not video_path:
-            raise ValueError("Video path is required")
-
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise Exception("Could not open video")
-
-        gesture_counts = defaultdict(int)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        gesture_frames = 0
-        frame_index = 0
-        processed_frames = 0
-
-        previous_left_wrist = None
-        previous_right_wrist = None
-        total_motion = 0
-
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] [Gestures] Starting analysis of {total_frames} frames (every {sample_every_n_frames})")
-
-        with mp.solutions.pose.Pose(
-            min_detection_confidence=0.5, min_tracking_confidence=0.5
-        ) as pose, mp.solutions.hands.Hands(
+    @staticmethod
+    def create_hands():
+        return mp.solutions.hands.Hands(
             min_detection_confidence=0.5, min_tracking_confidence=0.5, max_num_hands=2
-        ) as hands:
-
-            while frame_index < total_frames:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                if frame_index % 100 == 0:
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] [Gestures] Processing frame {frame_index}/{total_frames}...")
-
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        )
 
-                pose_results = pose.process(rgb_frame)
-                hand_results = hands.process(rgb_frame)
+    def process_frame(self, state: GestureAnalysisState, frame: SampledFrame, pose_results, hand_results):
+        """
+        Accumulates gesture metrics for one sampled frame.
+        Pose results are shared with VideoAnalyzer when run through VisualPipeline.
+        """
+        frame_has_gesture = False
 
-                frame_has_gesture = False
+        # -----------------------------
+        # HAND GESTURE ANALYSIS
+        # -----------------------------
+        if hand_results.multi_hand_landmarks:
 
-                # -----------------------------
-                # HAND GESTURE ANALYSIS
-                # -----------------------------
-                if hand_results.multi_hand_landmarks:
+            for hand_landmarks in hand_results.multi_hand_landmarks:
 
-                    for hand_landmarks in hand_results.multi_hand_landmarks:
+                if self.hand_is_open(hand_landmarks):
+                    state.gesture_counts["open_palm"] += 1
+                    frame_has_gesture = True
 
-                        if self.hand_is_open(hand_landmarks):
-                            gesture_counts["open_palm"] += 1
-                            frame_has_gesture = True
+                if self.is_pointing(hand_landmarks):
+                    state.gesture_counts["pointing"] += 1
+                    frame_has_gesture = True
 
-                        if self.is_pointing(hand_landmarks):
-                            gesture_counts["pointing"] += 1
-                            frame_has_gesture = True
+        # -----------------------------
+        # POSE ANALYSIS
+        # -----------------------------
+        if pose_results.pose_landmarks:
 
-                # -----------------------------
-                # POSE ANALYSIS
-                # -----------------------------
-                if pose_results.pose_landmarks:
+            pose_landmarks = pose_results.pose_landmarks
 
-                    pose_landmarks = pose_results.pose_landmarks
+            if self.arms_crossed(pose_landmarks):
+                state.gesture_counts["arms_crossed"] += 1
 
-                    if self.arms_crossed(pose_landmarks):
-                        gesture_counts["arms_crossed"] += 1
+            left_wrist = pose_landmarks.landmark[
+                mp.solutions.pose.PoseLandmark.LEFT_WRIST
+            ]
 
-                    left_wrist = pose_landmarks.landmark[
-                        mp.solutions.pose.PoseLandmark.LEFT_WRIST
-                    ]
+            right_wrist = pose_landmarks.landmark[
+                mp.solutions.pose.PoseLandmark.RIGHT_WRIST
+            ]
 
-                    right_wrist = pose_landmarks.landmark[
-                        mp.solutions.pose.PoseLandmark.RIGHT_WRIST
-                    ]
+            if state.previous_left_wrist and state.previous_right_wrist:
 
-                    if previous_left_wrist and previous_right_wrist:
+                left_motion = self.calculate_distance(
+                    left_wrist, state.previous_left_wrist
+                )
 
-                        left_motion = self.calculate_distance(
-                            left_wrist, previous_left_wrist
-                        )
+                right_motion = self.calculate_distance(
+                    right_wrist, state.previous_right_wrist
+                )
 
-                        right_motion = self.calculate_distance(
-                            right_wrist, previous_right_wrist
-                        )
+                state.total_motion += left_motion + right_motion
 
-                        total_motion += left_motion + right_motion
+            state.previous_left_wrist = left_wrist
+        if frame_has_gesture:
+            state.gesture_frames += 1
+        
+        state.processed_frames += 1
 
-                    previous_left_wrist = left_wrist
-                if frame_has_gesture:
-                    gesture_frames += 1
-                
-                processed_frames += 1
-                frame_index += sample_every_n_frames
+    @staticmethod
+    def merge_states(states: List[GestureAnalysisState]) -> GestureAnalysisState:
+        """Combines consecutive time shards, in order, into one state."""
+        merged = GestureAnalysisState()
+        for state in states:
+            for k, v in state.gesture_counts.items():
+                merged.gesture_counts[k] += v
+            merged.gesture_frames += state.gesture_frames
+            merged.processed_frames += state.processed_frames
+            merged.total_motion += state.total_motion
+            merged.previous_left_wrist = state.previous_left_wrist
+            merged.previous_right_wrist = state.previous_right_wrist
+        return merged
 
-        cap.release()
+    def summarize(self, state: GestureAnalysisState) -> Dict:
+        gesture_counts = state.gesture_counts
+        processed_frames = state.processed_frames
 
         # -----------------------------
         # FINAL ANALYSIS
         # -----------------------------
 
-        gesture_usage_ratio = gesture_frames / processed_frames if processed_frames > 0 else 0
+        gesture_usage_ratio = state.gesture_frames / processed_frames if processed_frames > 0 else 0
 
-        average_motion = total_motion / processed_frames if processed_frames > 0 else 0
+        average_motion = state.total_motion / processed_frames if processed_frames > 0 else 0
 
         feedback: List[str] = []
 
@@ -239,3 +244,19 @@ class GestureAnalyzer:
             "presentation_gesture_score": score,
             "feedback": feedback,
         }
+
+    def analyze_gestures(self, video_path: str, sample_every_n_frames: int = 30) -> Dict:
+        """
+        Standalone run over a video. When head/expression/posture are analyzed
+        as well, use VisualPipeline so both share a single decode and Pose pass.
+        """
+        if not video_path:
+            raise ValueError("Video path is required")
+
+        state = GestureAnalysisState()
+        with FrameSource(video_path, sample_every_n_frames) as source, \
+                VideoAnalyzer.create_pose() as pose, self.create_hands() as hands:
+            for frame in source:
+                self.process_frame(state, frame, pose.process(frame.rgb), hands.process(frame.rgb))
+
+        return self.summarize(state)
@@ -3,6 +3,7 @@ import mediapipe as mp
 import numpy as np
 from typing import Dict, List
 from datetime import datetime
+from .frame_source import FrameSource
 
 # ---------------------------
 # Configurable Thresholds for Head Orientation
@@ -89,22 +90,8 @@ class HeadDirectionAnalyzer:
         - sample_every_n_frames: Analysis density (default 30 = 1 check per second at 30fps).
         - audience_position: "front", "left", "right", or "both" (where the audience is).
         """
-        import time
-        cap = cv2.VideoCapture(video_path)
-        
-        # Windows-specific retry logic for I/O locks/race conditions
-        if not cap.isOpened():
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] DEBUG: Initial OpenCV open failed for {video_path}. Retrying in 0.5s...")
-            time.sleep(0.5)
-            cap = cv2.VideoCapture(video_path)
-
-        if not cap.isOpened():
-            raise ValueError(f"Cannot open video file: {video_path}")
-
-        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Total frames in video: {total_frames} (sampling every {sample_every_n_frames})")
-        frame_duration = 1.0 / fps
+        source = FrameSource(video_path, sample_every_n_frames)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Total frames in video: {source.total_frames} (sampling every {sample_every_n_frames}, {source.strategy})")
 
         good_contact_time = 0.0
         not_looking_time = 0.0
@@ -122,40 +109,19 @@ class HeadDirectionAnalyzer:
             good_statuses.add("LookingLeft")
             good_statuses.add("LookingRight")
 
-        frame_index = 0
-
         # High-Performance Face Mesh context
-        with mp_face_mesh.FaceMesh(
+        with source, mp_face_mesh.FaceMesh(
             static_image_mode=False,   # Optimized for video (tracks between frames)
             max_num_faces=1,           # Analyze only the primary speaker
             refine_landmarks=True,      # High precision iris/lips tracking
             min_detection_confidence=0.5
         ) as face_mesh:
 
-            while frame_index < total_frames:
-                # Seek to the target frame directly to avoid decoding intermediate frames
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                elapsed = frame_index * frame_duration
-                frame_index += sample_every_n_frames
-
-                if frame_index % 100 == 0:
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] [Head] Processing frame {frame_index}...")
-
-                # Optimization: Resize large 4K/1080p frames to 640px to speed up inference
-                # MediaPipe doesn't need high resolution for face silhouette tracking.
-                h, w = frame.shape[:2]
-                max_dim = 640
-                if w > max_dim or h > max_dim:
-                    scale = max_dim / max(w, h)
-                    frame = cv2.resize(frame, (int(w * scale), int(h * scale)))
-                    h, w = frame.shape[:2]
-
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = face_mesh.process(rgb)
+            # Frames arrive decoded, resized to <=640px and converted to RGB
+            for frame in source:
+                elapsed = frame.time
+                h, w = frame.height, frame.width
+                results = face_mesh.process(frame.rgb)
 
                 status = "NoFaceDetected"
                 yaw = pitch = roll = 0.0
@@ -190,7 +156,7 @@ class HeadDirectionAnalyzer:
                         status = _classify_direction(yaw, pitch, roll)
 
                 # Segment Accumulation: Total time per status
-                segment_duration = sample_every_n_frames * frame_duration
+                segment_duration = source.segment_duration
                 if status in good_statuses:
                     good_contact_time += segment_duration
                 else:
@@ -206,8 +172,6 @@ class HeadDirectionAnalyzer:
                     "roll": round(roll, 2)
                 })
 
-        cap.release()
-
         # Final aggregate metrics
         total_time = good_contact_time + not_looking_time
         percentage_looking = (good_contact_time / total_time * 100) if total_time > 0 else 0.0
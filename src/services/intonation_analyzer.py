@@ -1,27 +1,25 @@
-import spacy
 import librosa
 import numpy as np
 import parselmouth
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
-
-# Load SpaCy model for NLP tasks (Stopwords, Lemmatization, POS tagging)
-nlp = spacy.load("en_core_web_sm")
+from ..models.audio_buffer import AudioBuffer
+from ..models.word_prosody import WordProsody, round_values
+from ..models.text_annotations import TextAnnotations
+from . import transcript_annotator
 
 # ---------------------------
 # NLP: Content words
 # ---------------------------
-def _get_content_words(text: str) -> List[str]:
+def _content_word_mask(text: str, captions: List[Dict], annotations: Optional[TextAnnotations] = None) -> List[bool]:
     """
-    Extracts content-bearing words (nouns, verbs, adjectives, adverbs) from text.
+    Flags the caption words that are content-bearing (nouns, verbs, adjectives, adverbs).
     These are the words most likely to be intentionally emphasized by a speaker.
+    Uses the shared transcript annotations when given, otherwise tags the text.
     """
-    doc = nlp(text)
-    return [
-        token.lemma_.lower()
-        for token in doc
-        if token.pos_ in ["NOUN", "VERB", "ADJ", "ADV"] and not token.is_stop
-    ]
+    if annotations is None:
+        annotations = transcript_annotator.annotate(text, captions)
+    return annotations.content_word_mask(len(captions))
 
 # ---------------------------
 # Helpers
@@ -47,16 +45,109 @@ def _robust_threshold(scores):
     mad = np.median(np.abs(scores - median)) + 1e-6
     return median + 1.0 * mad
 
+def _intensity_at(intensity, times: np.ndarray) -> np.ndarray:
+    """
+    Vectorized intensity.get_value(t) for every t (0.0 where Praat has no value).
+    Replicates Praat's default CUBIC value interpolation (NUMinterpolate_sinc
+    with depth 2): the frame value at exact frame times, linear interpolation
+    between the first/last two frames, the clamped edge value between the
+    edge frame centre and the domain edge, undefined outside the frames.
+    """
+    values = intensity.values[0].astype(np.float64)
+    nx = len(values)
+    times = np.asarray(times, dtype=np.float64)
+    energy = np.zeros(len(times))
+    if nx == 0 or len(times) == 0:
+        return energy
+
+    # Praat's 1-based fractional frame index
+    x = (times - intensity.x1) / intensity.dx + 1.0
+    left_edge = intensity.x1 - 0.5 * intensity.dx
+    inside = (times >= left_edge) & (times <= left_edge + nx * intensity.dx)
+
+    # 0-based neighbours; clipping keeps the gathers in range (masked below)
+    midleft = np.clip(np.floor(x).astype(np.int64), 1, max(nx - 1, 1)) - 1
+    midright = np.minimum(midleft + 1, nx - 1)
+    yl, yr = values[midleft], values[midright]
+    fil = x - (midleft + 1)
+    fir = 1.0 - fil
+    result = yl * fir + yr * fil  # Linear (depth limited to 1 next to the edges)
+
+    cubic = (midleft >= 1) & (midright <= nx - 2)
+    if np.any(cubic):
+        ylm1 = values[np.maximum(midleft - 1, 0)]
+        yrp1 = values[np.minimum(midright + 1, nx - 1)]
+        dyl = 0.5 * (yr - ylm1)
+        dyr = 0.5 * (yrp1 - yl)
+        cubic_value = yl * fir + yr * fil - fil * fir * (0.5 * (dyr - dyl) + (fil - 0.5) * (dyl + dyr - 2 * (yr - yl)))
+        result = np.where(cubic, cubic_value, result)
+
+    # Exact frame times and the half-frame margins take the frame value as-is
+    result = np.where(x == np.floor(x), values[np.clip(np.floor(x).astype(np.int64), 1, nx) - 1], result)
+    result = np.where(x < 1.0, values[0], result)
+    result = np.where(x > nx, values[-1], result)
+
+    valid = inside & ~np.isnan(result)
+    energy[valid] = result[valid]
+    return energy
+
+def _word_frame_stats(times: np.ndarray, start_secs: np.ndarray, end_secs: np.ndarray,
+                      energy: np.ndarray, pitch: np.ndarray, voiced_prob: np.ndarray) -> Tuple:
+    """
+    Per-word mean energy, mean pitch, mean voicing and pitch standard deviation
+    over the frames with start <= t <= end (times must be ascending).
+
+    Word boundaries are found with np.searchsorted and every statistic comes
+    from prefix sums, so the cost is O(frames + words) instead of one mask
+    over all frames per word. Values are centered before accumulating so the
+    sum-of-squares variance keeps its precision on long recordings.
+
+    Returns: (energy, pitch, voicing, pitch_std, frame_count) arrays; words
+    without frames get 0.0 and a count of 0.
+    """
+    lo = np.searchsorted(times, start_secs, side="left")
+    hi = np.searchsorted(times, end_secs, side="right")
+    counts = np.maximum(hi - lo, 0)
+    lo = np.minimum(lo, hi)
+    safe_counts = np.maximum(counts, 1)
+
+    def prefix(values):
+        out = np.zeros(len(values) + 1, dtype=np.float64)
+        np.cumsum(values, out=out[1:])
+        return out
+
+    def window_mean(values, center=0.0):
+        sums = prefix(np.asarray(values, dtype=np.float64) - center)
+        return (sums[hi] - sums[lo]) / safe_counts + center
+
+    pitch = np.asarray(pitch, dtype=np.float64)
+    center = float(np.mean(pitch)) if len(pitch) else 0.0
+    centered = pitch - center
+    mean_centered = window_mean(centered)
+    square_sums = prefix(centered**2)
+    variance = (square_sums[hi] - square_sums[lo]) / safe_counts - mean_centered**2
+
+    empty = counts == 0
+    word_energy = np.where(empty, 0.0, window_mean(energy))
+    word_pitch = np.where(empty, 0.0, mean_centered + center)
+    word_voicing = np.where(empty, 0.0, window_mean(voiced_prob))
+    pitch_std = np.where(empty, 0.0, np.sqrt(np.maximum(variance, 0.0)))
+    return word_energy, word_pitch, word_voicing, pitch_std, counts
+
 # ---------------------------
 # Prosody extraction using Praat (Parselmouth)
 # ---------------------------
-def _get_prosody_features(audio_path: str):
+def _get_prosody_features(audio_path: str, audio: Optional[AudioBuffer] = None):
     """
     Extracts fundamental frequency (F0/Pitch) and Intensity (Energy) 
     using the Praat (Boersma-CC) algorithm via Parselmouth.
     
     This is the core signal processing step. Praat is the industry standard
     for speech analysis, offering higher precision than librosa/yin for F0.
+    When the shared decoded signal is given, Praat reads it from memory
+    instead of re-opening the file; a memory-mapped buffer is read by Praat
+    straight from its canonical WAV, so no float64 copy of the whole signal
+    is made on the Python side.
     
     Returns:
         energy_norm: Normalized intensity array (0-1)
@@ -65,7 +156,13 @@ def _get_prosody_features(audio_path: str):
         voiced_prob: Binary mask (1.0 = voiced/speech, 0.0 = unvoiced/silence)
     """
     try:
-        snd = parselmouth.Sound(audio_path)
+        if audio is not None and audio.path is not None:
+            # Praat decodes the float32 samples itself (same values as a float64 cast)
+            snd = parselmouth.Sound(audio.path)
+        elif audio is not None:
+            snd = parselmouth.Sound(audio.at_rate(None).astype(np.float64), sampling_frequency=audio.sample_rate)
+        else:
+            snd = parselmouth.Sound(audio_path)
     except Exception as e:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Error loading sound in Praat: {e}")
         return np.array([]), np.array([]), np.array([]), np.array([])
@@ -85,15 +182,7 @@ def _get_prosody_features(audio_path: str):
     times = pitch.xs()
     
     # Align intensity values to the exact pitch timestamps
-    energy = []
-    for t in times:
-        try:
-            val = intensity.get_value(t)
-            energy.append(val if not np.isnan(val) else 0.0)
-        except Exception:
-            energy.append(0.0)
-    
-    energy = np.array(energy)
+    energy = _intensity_at(intensity, times)
     
     # Identification of voiced segments: Praat sets F0 to 0 in unvoiced regions.
     voiced_prob = np.where(f0 > 0, 1.0, 0.0)
@@ -131,12 +220,15 @@ class IntonationAnalyzer:
     determine how expressive a person's speech is.
     """
 
-    def get_prosody_only(self, audio_path: str) -> Tuple:
+    # Bump when the output for the same input changes (invalidates cached results)
+    VERSION = "3"
+
+    def get_prosody_only(self, audio_path: str, audio: Optional[AudioBuffer] = None) -> Tuple:
         """
         Runs only the heavy signal processing part. 
         Intended for parallel execution during transcription.
         """
-        return _get_prosody_features(audio_path)
+        return _get_prosody_features(audio_path, audio)
 
     def analyze_intonation(
         self,
@@ -145,7 +237,10 @@ class IntonationAnalyzer:
         captions: List[Dict],
         energy_weight: float = 0.5,
         pitch_weight: float = 0.5,
-        precomputed_prosody: Tuple = None
+        precomputed_prosody: Tuple = None,
+        audio: Optional[AudioBuffer] = None,
+        word_scores_format: str = "records",
+        annotations: Optional[TextAnnotations] = None
     ) -> Dict:
         """
         The main analysis entry point.
@@ -153,16 +248,19 @@ class IntonationAnalyzer:
         2. Calculates per-word prosody scores.
         3. Detects specific words that were emphasized.
         4. Computes a global 'Intonation Score' (0-1) representing vocal variety.
+        word_scores_format: "records" (one dict per word) or "columns"
+        (parallel lists, see WordProsody.to_columns).
+        annotations: the transcript's spaCy annotations when already computed.
         """
 
         # Identify content words for targeted emphasis analysis
-        content_words = set(_get_content_words(transcript_text))
+        content_mask = _content_word_mask(transcript_text, captions, annotations)
         
         # Load signal features (either from cache/parallel task or recompute)
         if precomputed_prosody:
             energy, pitch, times, voiced_prob = precomputed_prosody
         else:
-            energy, pitch, times, voiced_prob = _get_prosody_features(audio_path)
+            energy, pitch, times, voiced_prob = _get_prosody_features(audio_path, audio)
 
         # Handle empty/invalid audio
         if len(times) == 0:
@@ -175,10 +273,9 @@ class IntonationAnalyzer:
                 "average_prosody_score": 0.0,
                 "intonation_score": 0.0,
                 "intonation_label": "monotone",
-                "word_scores": []
+                "word_scores": WordProsody.from_records([]).serialize(word_scores_format)
             }
 
-        word_scores = []
         # Calculate baseline duration to normalize 'long' vs 'short' words
         durations = [(c["end"] - c["start"]) / 1000.0 for c in captions]
         avg_duration = np.mean(durations) + 1e-6
@@ -195,111 +292,73 @@ class IntonationAnalyzer:
         # ---------------------------
         # Compute word-level scores
         # ---------------------------
-        for i, cap in enumerate(captions):
-            word = cap["text"]
-            start_sec = cap["start"] / 1000.0
-            end_sec = cap["end"] / 1000.0
-            duration = end_sec - start_sec
-
-            lemma = word.lower()
-            is_content = lemma in content_words
-
-            # Map signal indices to the word's time range
-            idx = np.where((times >= start_sec) & (times <= end_sec))[0]
-
-            if len(idx) == 0:
-                word_scores.append({
-                    "word": word,
-                    "start": round(start_sec, 3),
-                    "end": round(end_sec, 3),
-                    "energy": 0.0,
-                    "pitch": 0.0,
-                    "score": 0.0,
-                    "emphasized": False,
-                    "is_content_word": is_content
-                })
-                continue
-
-            # Average metrics for the word duration
-            word_energy = float(np.mean(energy[idx]))
-            word_pitch = float(np.mean(pitch[idx]))
-            pitch_conf = float(np.mean(voiced_prob[idx]))
-
-            # Intra-word pitch movement (Standard Deviation)
-            # High movement indicates a dynamic exclamation or questioning tone.
-            pitch_std = float(np.std(pitch[idx]))
-            
-            # Duration normalization (speakers often elongate important words)
-            duration_norm = duration / avg_duration
-            
-            # Weighted scoring formula for Word Emphasis
-            score = (
-                energy_weight * word_energy +
-                pitch_weight * word_pitch * pitch_conf +
-                0.1 * duration_norm
-            )
-            
-            # Penalty: Extremely flat pitch inside a single word indicates lack of inflection.
-            if pitch_std < 0.02:
-                score *= 0.8
-                
-            # Penalty: Absolute silences or whispers are not considered emphasis.
-            if word_energy < 0.05:
-                score *= 0.5
-                
-            # Bonus: Words following a pause are often primary sentence stress points.
-            if gaps[i] > 0.2:
-                score += 0.05
-            
-            word_scores.append({
-                "word": word,
-                "start": round(start_sec, 3),
-                "end": round(end_sec, 3),
-                "energy": round(word_energy, 4),
-                "pitch": round(word_pitch, 4),
-                "pitch_delta": round(pitch_std, 4), # Relative movement in word
-                "score": round(score, 4),
-                "emphasized": False,
-                "is_content_word": is_content
-            })
+        start_secs = np.array([c["start"] / 1000.0 for c in captions], dtype=np.float64)
+        end_secs = np.array([c["end"] / 1000.0 for c in captions], dtype=np.float64)
+        stats = _word_frame_stats(times, start_secs, end_secs, energy, pitch, voiced_prob)
+        word_energy, word_pitch, pitch_conf, pitch_std, frame_counts = stats
+
+        # Weighted scoring formula for Word Emphasis, for all words at once
+        # (duration normalization: speakers often elongate important words)
+        duration_norm = (end_secs - start_secs) / avg_duration
+        scores = (
+            energy_weight * word_energy +
+            pitch_weight * word_pitch * pitch_conf +
+            0.1 * duration_norm
+        )
+        # Penalty: Extremely flat pitch inside a single word indicates lack of inflection.
+        scores = np.where(pitch_std < 0.02, scores * 0.8, scores)
+        # Penalty: Absolute silences or whispers are not considered emphasis.
+        scores = np.where(word_energy < 0.05, scores * 0.5, scores)
+        # Bonus: Words following a pause are often primary sentence stress points.
+        scores = np.where(np.array(gaps, dtype=np.float64) > 0.2, scores + 0.05, scores)
+
+        # Columnar word scores; values rounded exactly as they are serialized
+        has_frames = frame_counts > 0
+        words = [cap["text"] for cap in captions]
+        word_scores = WordProsody(
+            words=words,
+            start=round_values(start_secs, 3),
+            end=round_values(end_secs, 3),
+            energy=np.where(has_frames, round_values(word_energy, 4), 0.0),
+            pitch=np.where(has_frames, round_values(word_pitch, 4), 0.0),
+            pitch_delta=np.where(has_frames, round_values(pitch_std, 4), 0.0),
+            score=np.where(has_frames, round_values(scores, 4), 0.0),
+            emphasized=np.zeros(len(words), dtype=bool),
+            is_content_word=np.array(content_mask, dtype=bool),
+            has_frames=has_frames,
+        )
+        is_content = word_scores.is_content_word
+        score = word_scores.score
 
         # ---------------------------
         # Emphasis detection (Dynamic Thresholding)
         # ---------------------------
-        content_scores = [w["score"] for w in word_scores if w["is_content_word"]]
+        content_positions = np.flatnonzero(is_content)
+        content_scores = score[content_positions]
 
         # Handle short clips with fixed top-K percentage
         if len(content_scores) < 10:
             k = max(1, int(0.2 * len(content_scores)))
             sorted_idx = np.argsort(content_scores)[-k:]
-            threshold_indices = set(sorted_idx)
-
-            content_idx = 0
-            for w in word_scores:
-                if w["is_content_word"]:
-                    if content_idx in threshold_indices:
-                        w["emphasized"] = True
-                    content_idx += 1
+            word_scores.emphasized[content_positions[sorted_idx]] = True
         # Use robust statistical threshold for longer speech
         else:
             dynamic_threshold = _robust_threshold(content_scores)
             mean_score = np.mean(content_scores)
-            for w in word_scores:
-                if w["is_content_word"]:
-                    relative = w["score"] - mean_score
-                    # Mark as emphasized if significantly above threshold or mean
-                    if w["score"] > dynamic_threshold or relative > 0.1:
-                        w["emphasized"] = True
+            relative = score - mean_score
+            # Mark as emphasized if significantly above threshold or mean
+            word_scores.emphasized[:] = is_content & ((score > dynamic_threshold) | (relative > 0.1))
 
-        emphasized_words = [w["word"] for w in word_scores if w["emphasized"]]
+        emphasized_words = [words[i] for i in np.flatnonzero(word_scores.emphasized)]
 
         # ---------------------------
         # Global Intonation Score (Expression level)
         # ---------------------------
+        voiced = word_scores.pitch > 0
         # Metric 1: Deviation in word-level pitches (Global Variance)
-        voiced_word_pitches = [w["pitch"] for w in word_scores if w["pitch"] > 0]
+        voiced_word_pitches = word_scores.pitch[voiced]
         # Metric 2: Movement within words (Local Jitter)
-        voiced_deltas = [w["pitch_delta"] for w in word_scores if w["pitch"] > 0]
+        voiced_deltas = word_scores.pitch_delta[voiced]
         
         if len(voiced_word_pitches) < 5:
             intonation_score = 0.0
@@ -307,11 +366,10 @@ class IntonationAnalyzer:
             # Objective variance metrics
             p_std = float(np.std(voiced_word_pitches)) # Main indicator of expressive range
             p_range = float(np.max(voiced_word_pitches) - np.min(voiced_word_pitches))
-            p_avg_delta = float(np.mean(voiced_deltas)) if voiced_deltas else 0.0
+            p_avg_delta = float(np.mean(voiced_deltas)) if len(voiced_deltas) else 0.0
             
             # Energy variance (Volume dynamics)
-            e_vals = [w["energy"] for w in word_scores]
-            e_std = float(np.std(e_vals))
+            e_std = float(np.std(word_scores.energy))
             
             # Weighted Global Intonation Formula
             # Prioritizes pitch range and volume variety.
@@ -330,8 +388,8 @@ class IntonationAnalyzer:
                 base_score *= 0.8
                 
             # Refinement: Penalty for robotic speech (high unvoiced ratio in content words)
-            content_voiced_count = sum(1 for w in word_scores if w["is_content_word"] and w["pitch"] > 0)
-            total_content = sum(1 for w in word_scores if w["is_content_word"])
+            content_voiced_count = int(np.count_nonzero(is_content & voiced))
+            total_content = len(content_positions)
             voiced_ratio = (content_voiced_count / total_content) if total_content > 0 else 1.0
             
             if voiced_ratio < 0.5:
@@ -353,7 +411,7 @@ class IntonationAnalyzer:
         # ---------------------------
         # Summary metrics
         # ---------------------------
-        total_content = sum(1 for w in word_scores if w["is_content_word"])
+        total_content = len(content_positions)
         total_emphasized = len(emphasized_words)
         emphasis_ratio = (total_emphasized / total_content * 100) if total_content > 0 else 0.0
 
@@ -364,8 +422,8 @@ class IntonationAnalyzer:
         emphasis_ratio = round(emphasis_ratio, 2)
 
         # Average prosody across all valid words
-        valid_scores = [w["score"] for w in word_scores if w["is_content_word"] and w["score"] > 0]
-        avg_score = round(float(np.mean(valid_scores)), 4) if valid_scores else 0.0
+        valid_scores = score[is_content & (score > 0)]
+        avg_score = round(float(np.mean(valid_scores)), 4) if len(valid_scores) else 0.0
 
         return {
             "emphasized_words": emphasized_words,
@@ -376,5 +434,5 @@ class IntonationAnalyzer:
             "average_prosody_score": avg_score,
             "intonation_score": round(float(intonation_score), 4),
             "intonation_label": intonation_label,
-            "word_scores": word_scores
+            "word_scores": word_scores.serialize(word_scores_format)
         }
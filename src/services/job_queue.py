@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from ..entities.analysis import Analysis
+from ..entities.analysis_job import AnalysisJob
+
+
+class SqlJobQueue:
+    """
+    Analysis job queue backed by the `analysis_jobs` table, so job mode needs
+    no broker. Workers claim jobs with a conditional UPDATE (only one worker
+    can move a row out of 'queued'), which works on any SQL backend.
+    Running jobs send heartbeats; a job whose worker died is re-queued until
+    MAX_ATTEMPTS is reached.
+    """
+
+    # Uploads live here between submission and processing. Must be shared
+    # storage when workers run on other machines.
+    STORAGE_DIR = os.getenv("ANALYSIS_JOB_STORAGE_DIR", os.path.join(tempfile.gettempdir(), "kalaam-jobs"))
+    # A running job without a heartbeat for this long is considered orphaned
+    STALE_SECONDS = float(os.getenv("ANALYSIS_JOB_STALE_SECONDS", "300"))
+    MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "2"))
+
+    def create_workspace(self) -> str:
+        """Directory for one job's upload and intermediate files."""
+        os.makedirs(self.STORAGE_DIR, exist_ok=True)
+        return tempfile.mkdtemp(dir=self.STORAGE_DIR)
+
+    @staticmethod
+    def remove_workspace(job: AnalysisJob):
+        shutil.rmtree(os.path.dirname(job.input_path), ignore_errors=True)
+
+    @staticmethod
+    def enqueue(db: Session, analysis: Analysis, input_path: str, file_type: str, content_hash: Optional[str],
+                topic: Optional[str], audience_position: str, tracking_id: str) -> AnalysisJob:
+        job = AnalysisJob(
+            analysis_id=analysis.id,
+            status="queued",
+            input_path=input_path,
+            file_type=file_type,
+            content_hash=content_hash,
+            topic=topic,
+            audience_position=audience_position,
+            tracking_id=tracking_id,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def claim(db: Session, worker_id: str) -> Optional[AnalysisJob]:
+        """Atomically takes the oldest queued job; None if the queue is empty."""
+        candidates = (
+            db.query(AnalysisJob.id)
+            .filter(AnalysisJob.status == "queued")
+            .order_by(AnalysisJob.id)
+            .limit(5)
+            .all()
+        )
+        now = datetime.now(timezone.utc)
+        for (job_id,) in candidates:
+            claimed = (
+                db.query(AnalysisJob)
+                .filter(AnalysisJob.id == job_id, AnalysisJob.status == "queued")
+                .update(
+                    {
+                        AnalysisJob.status: "running",
+                        AnalysisJob.worker_id: worker_id,
+                        AnalysisJob.attempts: AnalysisJob.attempts + 1,
+                        AnalysisJob.started_at: now,
+                        AnalysisJob.heartbeat_at: now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if claimed == 1:
+                return db.get(AnalysisJob, job_id)
+            # Another worker won the race for this row; try the next one
+        return None
+
+    @staticmethod
+    def heartbeat(db: Session, job_id: int):
+        db.query(AnalysisJob).filter(AnalysisJob.id == job_id, AnalysisJob.status == "running").update(
+            {AnalysisJob.heartbeat_at: datetime.now(timezone.utc)}, synchronize_session=False
+        )
+        db.commit()
+
+    @staticmethod
+    def complete(db: Session, job: AnalysisJob):
+        job.status = "completed"
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+
+    @staticmethod
+    def fail(db: Session, job: AnalysisJob, error: str):
+        job.status = "failed"
+        job.error_message = error
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+
+    @staticmethod
+    def set_progress(db: Session, tracking_id: str, progress: float, stage: str):
+        db.query(AnalysisJob).filter(AnalysisJob.tracking_id == tracking_id, AnalysisJob.status == "running").update(
+            {AnalysisJob.progress: progress, AnalysisJob.stage: stage}, synchronize_session=False
+        )
+        db.commit()
+
+    @staticmethod
+    def get_progress(db: Session, tracking_id: str) -> Optional[Dict]:
+        job = (
+            db.query(AnalysisJob)
+            .filter(AnalysisJob.tracking_id == tracking_id)
+            .order_by(AnalysisJob.id.desc())
+            .first()
+        )
+        if job is None:
+            return None
+        return {"progress": job.progress, "stage": job.stage or job.status, "status": job.status}
+
+    @staticmethod
+    async def has_job(session_factory, tracking_id: str) -> bool:
+        """Whether a queued job was submitted under this tracking id (one indexed lookup, off the event loop)."""
+        def read():
+            db = session_factory()
+            try:
+                return db.query(AnalysisJob.id).filter(AnalysisJob.tracking_id == tracking_id).first() is not None
+            finally:
+                db.close()
+
+        return await asyncio.to_thread(read)
+
+    async def watch_progress(self, session_factory, tracking_id: str, interval: float = 1.0) -> AsyncIterator[Dict]:
+        """
+        Polls a job's persisted progress and yields each change until it finishes.
+        Used for SSE when the job runs in a separate worker process.
+        """
+        def read():
+            db = session_factory()
+            try:
+                return self.get_progress(db, tracking_id)
+            finally:
+                db.close()
+
+        last = None
+        while True:
+            state = await asyncio.to_thread(read)
+            if state is None:
+                return
+            if state["status"] == "completed":
+                yield {"progress": 100, "stage": "complete"}
+                return
+            if state["status"] == "failed":
+                yield {"progress": state["progress"], "stage": "failed"}
+                return
+            update = {"progress": state["progress"], "stage": state["stage"]}
+            if update != last:
+                yield update
+                last = update
+            await asyncio.sleep(interval)
+
+    def requeue_stale(self, db: Session) -> int:
+        """
+        Returns orphaned running jobs to the queue, or fails them (and their
+        analysis) once they've used up MAX_ATTEMPTS.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.STALE_SECONDS)
+        stale = (
+            db.query(AnalysisJob)
+            .filter(
+                AnalysisJob.status == "running",
+                or_(AnalysisJob.heartbeat_at.is_(None), AnalysisJob.heartbeat_at < cutoff),
+            )
+            .all()
+        )
+        for job in stale:
+            if job.attempts < self.MAX_ATTEMPTS:
+                logging.warning(f"Re-queueing orphaned analysis job {job.id} (worker {job.worker_id})")
+                job.status = "queued"
+                job.worker_id = None
+            else:
+                logging.error(f"Analysis job {job.id} abandoned after {job.attempts} attempts")
+                job.status = "failed"
+                job.error_message = "Worker stopped responding"
+                job.finished_at = datetime.now(timezone.utc)
+                analysis = db.get(Analysis, job.analysis_id)
+                if analysis:
+                    analysis.status = "failed"
+                    analysis.error_message = job.error_message
+                self.remove_workspace(job)
+        if stale:
+            db.commit()
+        return len(stale)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+import socket
+from typing import List, Optional
+from ..config.db import SessionLocal
+from .job_queue import SqlJobQueue
+from .progress_service import ProgressService
+
+
+class AnalysisJobWorker:
+    """
+    Polls the job queue and runs claimed jobs through the analysis controller.
+    Several workers can poll the same table; each job is claimed once.
+    """
+
+    POLL_INTERVAL_SECONDS = float(os.getenv("ANALYSIS_JOB_POLL_SECONDS", "2"))
+    HEARTBEAT_SECONDS = float(os.getenv("ANALYSIS_JOB_HEARTBEAT_SECONDS", "30"))
+    # Workers started inside the API process (0 = jobs are left to external workers)
+    INPROCESS_WORKERS = int(os.getenv("ANALYSIS_INPROCESS_WORKERS", "1"))
+
+    def __init__(self, controller, queue: Optional[SqlJobQueue] = None, name: str = "0"):
+        self.controller = controller
+        self.queue = queue or controller.job_queue
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{name}"
+        self._stopping = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def stop(self):
+        self._stopping.set()
+
+    async def run(self):
+        logging.info(f"Analysis worker {self.worker_id} started")
+        while not self._stopping.is_set():
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logging.exception(f"Analysis worker {self.worker_id} poll failed")
+                processed = False
+            if not processed:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        logging.info(f"Analysis worker {self.worker_id} stopped")
+
+    async def run_once(self) -> bool:
+        """Claims and processes at most one job. Returns False if the queue was empty."""
+        db = SessionLocal()
+        try:
+            self.queue.requeue_stale(db)
+            job = self.queue.claim(db, self.worker_id)
+            if job is None:
+                return False
+
+            logging.info(f"Worker {self.worker_id} claimed analysis job {job.id} (analysis {job.analysis_id})")
+            heartbeat = asyncio.create_task(self._heartbeat(job.id))
+            progress = ProgressForwarder(self.queue, job.tracking_id)
+            progress.start()
+            try:
+                await self.controller.process_job(job, db)
+            finally:
+                heartbeat.cancel()
+                await progress.stop()
+            return True
+        finally:
+            db.close()
+
+    async def _heartbeat(self, job_id: int):
+        def beat():
+            db = SessionLocal()
+            try:
+                self.queue.heartbeat(db, job_id)
+            finally:
+                db.close()
+
+        while True:
+            await asyncio.sleep(self.HEARTBEAT_SECONDS)
+            try:
+                await asyncio.to_thread(beat)
+            except Exception as e:
+                logging.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+
+class ProgressForwarder:
+    """
+    Persists one job's progress to its row, so SSE clients connected to another
+    process can follow it. Only that job's tracking id is listened to, and the
+    writes run in a thread on a session of their own; ticks that arrive while a
+    write is in flight are coalesced into the latest value.
+    """
+
+    def __init__(self, queue: SqlJobQueue, tracking_id: str):
+        self.queue = queue
+        self.tracking_id = tracking_id
+        self._latest = None
+        self._changed = asyncio.Event()
+        self._stopping = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._db = None
+
+    def _on_progress(self, tracking_id: str, progress: float, stage: str):
+        if tracking_id != self.tracking_id:
+            return
+        self._latest = (progress, stage)
+        # update_progress may be called from a worker thread
+        self._loop.call_soon_threadsafe(self._changed.set)
+
+    def _write(self, progress: float, stage: str):
+        if self._db is None:
+            self._db = SessionLocal()
+        self.queue.set_progress(self._db, self.tracking_id, progress, stage)
+
+    async def _run(self):
+        written = None
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            latest = self._latest
+            if latest is not None and latest != written:
+                try:
+                    await asyncio.to_thread(self._write, *latest)
+                    written = latest
+                except Exception as e:
+                    logging.warning(f"Persisting progress for {self.tracking_id} failed: {e}")
+                    if self._db is not None:
+                        await asyncio.to_thread(self._db.rollback)
+            if self._stopping:
+                return
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        ProgressService().add_listener(self._on_progress)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Writes the last pending update (never interrupts a write) and closes the session."""
+        ProgressService().remove_listener(self._on_progress)
+        self._stopping = True
+        self._changed.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        if self._db is not None:
+            await asyncio.to_thread(self._db.close)
+
+
+def start_workers(controller, count: int) -> List[AnalysisJobWorker]:
+    """Starts `count` polling workers on the running event loop."""
+    workers = [AnalysisJobWorker(controller, name=str(i)) for i in range(count)]
+    for worker in workers:
+        worker.task = asyncio.create_task(worker.run())
+    return workers
+
+
+async def stop_workers(workers: List[AnalysisJobWorker]):
+    # A job interrupted here stays 'running' and is re-queued once its heartbeat goes stale
+    for worker in workers:
+        worker.stop()
+        worker.task.cancel()
+    await asyncio.gather(*(w.task for w in workers), return_exceptions=True)
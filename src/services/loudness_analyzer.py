@@ -1,7 +1,10 @@
 import numpy as np
 import librosa
 import pyloudnorm as pyln
-from typing import List, Dict
+import scipy.signal
+from typing import Dict, Iterable, List, Optional
+from ..models.audio_buffer import AudioBuffer
+from ..utils.audio_stream import audio_info, iter_blocks, should_stream
 
 
 class LoudnessAnalyzer:
@@ -10,8 +13,21 @@ class LoudnessAnalyzer:
     Uses EBU R128 (Integrated Loudness) standards for consistent human-ear perceived loudness.
     """
     
+    # Bump when the output for the same input changes (invalidates cached results)
+    VERSION = "1"
+
+    # BS.1770 gating (pyloudnorm.Meter defaults): 400ms blocks, 75% overlap
+    BLOCK_SIZE = 0.400
+    BLOCK_OVERLAP = 0.75
+    ABSOLUTE_GATE_LUFS = -70.0
+    # Digital silence floors reported for silent / too-short windows
+    SILENCE_RMS_DB = -96.0
+    SILENCE_LUFS = -70.0
+    # Windows K-weighted per batch (bounds the float64 filter output to ~100MB at 48kHz)
+    WINDOWS_PER_BATCH = 256
+
     @staticmethod
-    def analyze_loudness(audio_path: str, interval_duration: int = 1) -> Dict:
+    def analyze_loudness(audio_path: str, interval_duration: int = 1, audio: Optional[AudioBuffer] = None) -> Dict:
         """
         Computes loudness metrics (RMS and LUFS) over the audio file.
         
@@ -21,57 +37,44 @@ class LoudnessAnalyzer:
         Args:
             audio_path: The file path to process.
             interval_duration: Sliding window size (default 1s for localized analysis).
+            audio: Shared decoded signal; when given, the file is not read again.
+
+        Windows are consumed in batches either way. In the pipeline the buffer
+        is the memory-mapped canonical WAV, so batches are views paged in from
+        disk and memory stays bounded; reading the file through soundfile
+        (should_stream) only applies to standalone calls without a buffer.
         """
         try:
-            # 1. Loading the Raw Signal
-            # Uses the file's native sample rate (sr=None) for maximum fidelity.
-            y, sr = librosa.load(audio_path, sr=None) 
+            if audio is None and not should_stream(audio_path):
+                # 1. Loading the Raw Signal
+                # Uses the file's native sample rate (sr=None) for maximum fidelity.
+                y, sr = librosa.load(audio_path, sr=None)
+                audio = AudioBuffer(y, sr)
+            # Standalone calls on long recordings read the file block by block
+            n_samples, sr = audio_info(audio_path, audio)
         except Exception as e:
             raise Exception(f"LoudnessAnalyzer: Audio file load failed: {str(e)}")
         
         # 2. Loudness Normalization Engine (BS.1770 compliant)
-        meter = pyln.Meter(sr)
-        
-        duration = len(y) / sr
+        duration = n_samples / sr
         # Define the temporal intervals (segments)
         intervals = np.arange(0, duration, interval_duration)
         
-        results = []
+        # 3. Per-window RMS and LUFS, a batch of windows at a time
+        window = int(interval_duration * sr)
+        blocks = iter_blocks(audio_path, audio, window * LoudnessAnalyzer.WINDOWS_PER_BATCH)
+        metrics = LoudnessAnalyzer._window_metrics(blocks, sr, len(intervals), window)
         
-        # 3. Processing each window/interval individually
-        for i, start_time in enumerate(intervals):
-            start_sample = int(start_time * sr)
-            end_sample = int(min((start_time + interval_duration) * sr, len(y)))
-            
-            segment = y[start_sample:end_sample]
-            if len(segment) == 0:
-                continue
-            
-            # 3a. RMS Calculation (Root Mean Square - mathematical average energy)
-            # Digital silence floor is capped at -96dB for standard 16-bit audio.
-            rms = np.sqrt(np.mean(segment**2))
-            if rms > 0 and np.isfinite(rms):
-                rms_db = float(20 * np.log10(rms))
-            else:
-                rms_db = -96.0  
-            
-            # 3b. LUFS Calculation (Perceptual Loudness)
-            try:
-                # integrated_loudness uses the K-weighting curve.
-                lufs = meter.integrated_loudness(segment)
-                if not np.isfinite(lufs):
-                    lufs = -70.0
-                else:
-                    lufs = float(lufs)
-            except Exception:
-                lufs = -70.0  # Safe fallback for silent or ultra-short segments
-            
+        results = []
+        for i, (start_time, rms_db, lufs) in enumerate(zip(intervals, *metrics)):
+            if np.isnan(rms_db):
+                continue  # Empty segment
             results.append({
                 "interval": i + 1,
                 "start_time": float(start_time),
                 "end_time": float(min(start_time + interval_duration, duration)),
-                "rms_db": rms_db,
-                "lufs": lufs
+                "rms_db": float(rms_db),
+                "lufs": float(lufs)
             })
         
         # 4. Aggregating Global Metrics
@@ -96,3 +99,91 @@ class LoudnessAnalyzer:
             "sample_rate": int(sr),
             "interval_duration": interval_duration
         }
+
+    @staticmethod
+    def _window_metrics(blocks: Iterable[np.ndarray], sr: int, n_intervals: int, window: int):
+        """
+        (rms_db, lufs) arrays, one entry per interval (NaN for empty segments).
+
+        Equivalent to running pyln.Meter(sr).integrated_loudness on each
+        segment separately (each window is K-weighted from a zero filter state,
+        exactly like the per-segment call), but the equal-length windows are
+        stacked into a matrix: one cascaded K-weighting pass over axis 1,
+        gating-block energies from shared partial sums and vectorized gating.
+        Consumes the signal block by block, so only one batch of windows is
+        ever resident besides the source.
+        """
+        rms_db = np.full(n_intervals, np.nan)
+        lufs = np.full(n_intervals, np.nan)
+        if n_intervals == 0:
+            return rms_db, lufs
+
+        # Same K-weighting stages as the pyloudnorm meter (shelf, then high-pass),
+        # cascaded as second-order sections so both run in one filter pass
+        stages = list(pyln.Meter(sr)._filters.values())
+        sos = np.vstack([scipy.signal.tf2sos(f.b, f.a) for f in stages])
+        sos[0, :3] *= np.prod([f.passband_gain for f in stages])
+
+        done = 0
+        carry = None
+        for block in blocks:
+            carry = block if carry is None or len(carry) == 0 else np.concatenate([carry, block])
+            n_full = min(len(carry) // window, n_intervals - done)
+            for batch in range(0, n_full, LoudnessAnalyzer.WINDOWS_PER_BATCH):
+                stop = min(batch + LoudnessAnalyzer.WINDOWS_PER_BATCH, n_full)
+                rows = carry[batch * window:stop * window].reshape(stop - batch, window)
+                rms_db[done + batch:done + stop], lufs[done + batch:done + stop] = LoudnessAnalyzer._rows_metrics(rows, sr, sos)
+            done += n_full
+            carry = carry[n_full * window:]
+
+        # The last, shorter window goes through the same code as a single row
+        if carry is not None and len(carry) and done < n_intervals:
+            rms, loud = LoudnessAnalyzer._rows_metrics(carry[np.newaxis, :], sr, sos)
+            rms_db[done], lufs[done] = rms[0], loud[0]
+
+        return rms_db, lufs
+
+    @staticmethod
+    def _rows_metrics(rows: np.ndarray, sr: int, sos: np.ndarray) -> tuple:
+        """RMS dB and gated LUFS of each row of an (n_windows, n_samples) matrix."""
+        n_samples = rows.shape[1]
+
+        # 3a. RMS Calculation (Root Mean Square - mathematical average energy)
+        # Digital silence floor is capped at -96dB for standard 16-bit audio.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rms = np.sqrt(np.mean(rows**2, axis=1))
+            rms_db = np.where((rms > 0) & np.isfinite(rms), 20 * np.log10(rms), LoudnessAnalyzer.SILENCE_RMS_DB)
+
+        # 3b. LUFS Calculation (Perceptual Loudness)
+        # Segments shorter than one gating block are rejected by pyloudnorm
+        block = LoudnessAnalyzer.BLOCK_SIZE
+        if n_samples < block * sr:
+            return rms_db, np.full(len(rows), LoudnessAnalyzer.SILENCE_LUFS)
+
+        # K-weighting, each row from a zero filter state like a per-segment meter call
+        weighted = scipy.signal.sosfilt(sos, rows, axis=1)
+
+        # Mean square of every 400ms gating block (same block bounds as pyloudnorm).
+        # Blocks overlap, so sum the squares between consecutive block edges once
+        # and build each block from those partial sums.
+        step = 1.0 - LoudnessAnalyzer.BLOCK_OVERLAP
+        n_blocks = int(np.round(((n_samples / sr - block) / (block * step)))) + 1
+        j = np.arange(n_blocks)
+        lower = np.array([int(block * (k * step) * sr) for k in j])
+        upper = np.minimum([int(block * (k * step + 1) * sr) for k in j], n_samples)
+        edges = np.unique(np.concatenate([lower, upper, [n_samples]]))
+        partial = np.add.reduceat(np.square(weighted, out=weighted), edges[:-1], axis=1)
+        energy = np.zeros((len(rows), len(edges)))
+        np.cumsum(partial, axis=1, out=energy[:, 1:])
+        z = (energy[:, np.searchsorted(edges, upper)] - energy[:, np.searchsorted(edges, lower)]) / (block * sr)
+
+        # Two-stage gating: absolute (-70 LUFS), then relative (-10 LU below the gated mean)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            block_loudness = -0.691 + 10.0 * np.log10(z)
+            gated = block_loudness >= LoudnessAnalyzer.ABSOLUTE_GATE_LUFS
+            relative = -0.691 + 10.0 * np.log10(np.sum(z * gated, axis=1) / np.sum(gated, axis=1)) - 10.0
+            gated = (block_loudness > relative[:, np.newaxis]) & (block_loudness > LoudnessAnalyzer.ABSOLUTE_GATE_LUFS)
+            z_avg = np.nan_to_num(np.sum(z * gated, axis=1) / np.sum(gated, axis=1))
+            lufs = -0.691 + 10.0 * np.log10(z_avg)
+
+        return rms_db, np.where(np.isfinite(lufs), lufs, LoudnessAnalyzer.SILENCE_LUFS)
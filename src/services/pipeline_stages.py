@@ -0,0 +1,125 @@
+from typing import List
+from . import analysis_tasks
+from . import transcript_annotator
+from .stage_scheduler import Stage
+from ..utils.audio_stream import should_stream
+
+# Sampling stride for visual analysis (every n-th frame)
+VIDEO_SAMPLE_EVERY_N_FRAMES = 30
+# WPM bin width in seconds
+WPM_INTERVAL_SECONDS = 2
+# Intonation score weights (pitch, energy)
+INTONATION_WEIGHTS = (0.5, 0.5)
+# Rate of the speech front end (clarity features, transcription upload)
+SPEECH_SAMPLE_RATE = 16000
+
+
+def speech_front_end(audio):
+    """
+    The clarity input: the shared buffer at SPEECH_SAMPLE_RATE. A long
+    memory-mapped recording is passed as is instead, so the pool worker
+    re-maps the file rather than receiving a 16kHz copy, and clarity
+    streams it block by block with on-the-fly resampling.
+    """
+    if audio.path is not None and should_stream(audio.path, audio):
+        return audio
+    return audio.resampled(SPEECH_SAMPLE_RATE)
+
+
+def default_stages(orchestrator) -> List[Stage]:
+    """
+    The analysis DAG. Each analyzer declares what it reads and where it runs;
+    the scheduler starts it as soon as those inputs exist. Adding an analyzer
+    means adding a Stage here (with result=True if it belongs in the report).
+
+    Initial artifacts (provided by the orchestrator):
+        input_path, audio_path, file_type, topic_query, audience_position
+    """
+    o = orchestrator
+    return [
+        # --- Media front end ---
+        Stage(
+            "audio", o.file_service.load_audio,
+            inputs=("input_path", "audio_path"),
+            cost=2, required=True, label="Audio Decode",
+        ),
+        Stage(
+            "visual", o.run_visual_analysis,
+            inputs=("input_path",), executor="async",
+            when=lambda a: a["file_type"] == "video",
+            cost=40, label="Visual Analysis",
+        ),
+        Stage(
+            # 16kHz speech front end: one resample shared by clarity (process pool)
+            # and the transcription encoder (cached on the main buffer)
+            "audio_16k", speech_front_end,
+            inputs=("audio",),
+            cost=1, label="Resample 16kHz",
+        ),
+        Stage(
+            "prosody", analysis_tasks.extract_prosody,
+            inputs=("audio_path", "audio"), executor="process",
+            cost=8, label="Prosody Extraction",
+        ),
+
+        # --- Transcription (cloud; repeat audio comes from the transcript cache) ---
+        Stage(
+            "transcription", o.file_service.transcribe_with_cache,
+            inputs=("audio", "audio_path", "input_path"), outputs=("transcript", "captions"),
+            cost=30, required=True, label="Transcription",
+        ),
+
+        # --- Text front end: one spaCy pass shared by the text analyzers ---
+        Stage(
+            # Tokens/tags/lemmas aligned to the caption words
+            "annotations", transcript_annotator.annotate,
+            inputs=("transcript", "captions"),
+            cost=1, label="Transcript Annotation",
+        ),
+
+        # --- Report sections ---
+        Stage(
+            "loudness", lambda path, audio: o.loudness_analyzer.analyze_loudness(path, 1, audio),
+            inputs=("audio_path", "audio"),
+            cost=1, result=True, label="Loudness",
+        ),
+        Stage(
+            "clarity", analysis_tasks.analyze_clarity,
+            inputs=("audio_path", "audio_16k"), executor="process",
+            cost=6, result=True, label="Clarity Analysis",
+        ),
+        Stage(
+            "wpm", lambda captions: o.wpm_analyzer.calculate_wpm(captions, WPM_INTERVAL_SECONDS),
+            inputs=("captions",),
+            cost=0.1, result=True, label="WPM",
+        ),
+        Stage(
+            "filler", o.filler_analyzer.identify_fillers,
+            inputs=("transcript", "annotations", "captions"),
+            cost=0.5, result=True, label="Filler",
+        ),
+        Stage(
+            "intonation",
+            lambda path, text, captions, prosody, audio, annotations: o.intonation_analyzer.analyze_intonation(
+                path, text, captions, *INTONATION_WEIGHTS, prosody, audio, annotations=annotations
+            ),
+            inputs=("audio_path", "transcript", "captions", "prosody", "audio", "annotations"),
+            cost=2, result=True, label="Intonation Scoring",
+        ),
+        Stage(
+            "topic", o.topic_analyzer.compute_coverage,
+            inputs=("topic_query", "transcript"),
+            when=lambda a: bool(a["topic_query"]),
+            cost=2, result=True, label="Topic Coverage",
+        ),
+        Stage(
+            "video", lambda states, audience: o.video_analyzer.summarize(states[0], audience),
+            inputs=("visual", "audience_position"), executor="inline",
+            cost=0.1, result=True, label="Video Summary",
+        ),
+        Stage(
+            "gesture", lambda states: o.gesture_analyzer.summarize(states[1]),
+            inputs=("visual",), executor="inline",
+            cost=0.1, result=True, label="Gesture Summary",
+        ),
+    ]
@@ -9,6 +9,7 @@ class ProgressService:
             cls._instance = super(ProgressService, cls).__new__(cls)
             cls._instance.progress_data = {}
             cls._instance.queues = {}
+            cls._instance.listeners = []
         return cls._instance
 
     def update_progress(self, tracking_id: str, progress: float, stage: str):
@@ -20,6 +21,21 @@ class ProgressService:
             for queue in self.queues[tracking_id]:
                 queue.put_nowait({"progress": progress, "stage": stage})
 
+        for listener in self.listeners:
+            try:
+                listener(tracking_id, progress, stage)
+            except Exception as e:
+                logging.warning(f"Progress listener failed for {tracking_id}: {e}")
+
+    def add_listener(self, listener):
+        """Registers callback(tracking_id, progress, stage), e.g. to persist progress for other processes"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
     async def subscribe(self, tracking_id: str):
         logging.info(f"New SSE subscription for tracking_id: {tracking_id}")
         if tracking_id not in self.queues:
@@ -0,0 +1,48 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Optional
+from ..utils.disk_cache import DiskCache
+
+
+class ResultCache:
+    """
+    Caches the media-dependent part of an analysis, keyed by the SHA-256 of
+    the uploaded bytes plus the versions of the analyzers that produced it.
+    A re-upload of the same recording then skips transcription, audio and
+    video analysis; only topic- and audience-dependent stages run again.
+    Bump an analyzer's VERSION whenever its output changes.
+    """
+
+    ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    DIRECTORY = os.getenv("RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "kalaam-cache", "results"))
+    MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None, enabled: Optional[bool] = None):
+        self.enabled = self.ENABLED if enabled is None else enabled
+        self.store = DiskCache(directory or self.DIRECTORY, max_bytes or self.MAX_BYTES) if self.enabled else None
+
+    @staticmethod
+    def make_key(content_hash: str, versions: Dict[str, Any]) -> str:
+        fingerprint = json.dumps(versions, sort_keys=True)
+        return hashlib.sha256(f"{content_hash}:{fingerprint}".encode("utf-8")).hexdigest()
+
+    def load(self, content_hash: Optional[str], versions: Dict[str, Any]) -> Optional[Dict]:
+        if not self.enabled or not content_hash:
+            return None
+        try:
+            return self.store.get(self.make_key(content_hash, versions))
+        except Exception as e:
+            logging.warning(f"Result cache read failed: {e}")
+            return None
+
+    def save(self, content_hash: Optional[str], versions: Dict[str, Any], payload: Dict):
+        if not self.enabled or not content_hash:
+            return
+        try:
+            self.store.set(self.make_key(content_hash, versions), payload)
+        except Exception as e:
+            # Caching is an optimization; never fail an analysis over it
+            logging.warning(f"Result cache write failed: {e}")
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+@dataclass
+class Stage:
+    """
+    One node of the analysis DAG.
+    The stage is called with the artifacts named in `inputs` (positionally)
+    and produces the artifacts named in `outputs` (a tuple when there are several).
+    """
+    name: str
+    func: Callable
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()             # Defaults to (name,)
+    executor: str = "thread"                  # "process" | "thread" | "async" | "inline"
+    cost: float = 1.0                         # Expected seconds; drives critical-path-first ordering
+    result: bool = False                      # Outputs go into context.results
+    required: bool = False                    # Failure (or a None result) aborts the pipeline
+    when: Optional[Callable[[Dict[str, Any]], bool]] = None  # Skip (output None) unless true
+    label: Optional[str] = None               # Name in logs
+
+    def __post_init__(self):
+        if not self.outputs:
+            self.outputs = (self.name,)
+        if self.executor not in ("process", "thread", "async", "inline"):
+            raise ValueError(f"Unknown executor type for stage {self.name}: {self.executor}")
+        self.label = self.label or self.name
+
+
+class StageScheduler:
+    """
+    Runs a set of stages as soon as their inputs are available.
+
+    Among stages that become ready together, those with the longest remaining
+    path to the end of the DAG (critical path, by `cost`) are started first,
+    which matters when they queue for the same process pool.
+    A stage whose input is None (skipped or failed upstream) is skipped too.
+    Only stages needed for missing results/targets are run, so prefilled
+    artifacts (e.g. from a cache) short-circuit whole branches.
+    """
+
+    def __init__(self, stages: Iterable[Stage]):
+        self.stages: List[Stage] = list(stages)
+        self.producers: Dict[str, Stage] = {}
+        for stage in self.stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"Artifact '{output}' produced by both {self.producers[output].name} and {stage.name}")
+                self.producers[output] = stage
+        self.priority = self._critical_path_lengths()
+
+    def _critical_path_lengths(self) -> Dict[str, float]:
+        consumers: Dict[str, List[Stage]] = {s.name: [] for s in self.stages}
+        for stage in self.stages:
+            for name in stage.inputs:
+                if name in self.producers:
+                    consumers[self.producers[name].name].append(stage)
+
+        lengths: Dict[str, float] = {}
+        visiting: Set[str] = set()
+
+        def length(stage: Stage) -> float:
+            if stage.name in lengths:
+                return lengths[stage.name]
+            if stage.name in visiting:
+                raise ValueError(f"Stage dependency cycle through {stage.name}")
+            visiting.add(stage.name)
+            downstream = max((length(c) for c in consumers[stage.name]), default=0.0)
+            visiting.discard(stage.name)
+            lengths[stage.name] = stage.cost + downstream
+            return lengths[stage.name]
+
+        for stage in self.stages:
+            length(stage)
+        return lengths
+
+    def needed_stages(self, artifacts: Dict[str, Any], targets: Iterable[str] = ()) -> List[Stage]:
+        """Stages required to produce every missing result and target artifact."""
+        wanted = [o for s in self.stages if s.result for o in s.outputs] + list(targets)
+        needed: Dict[str, Stage] = {}
+        stack = [name for name in wanted if name not in artifacts]
+        while stack:
+            name = stack.pop()
+            stage = self.producers.get(name)
+            if stage is None:
+                raise ValueError(f"No stage produces required artifact '{name}'")
+            if stage.name in needed:
+                continue
+            needed[stage.name] = stage
+            stack.extend(i for i in stage.inputs if i not in artifacts)
+        return [s for s in self.stages if s.name in needed]
+
+    async def run(self, artifacts: Dict[str, Any], cpu_executor=None, targets: Iterable[str] = (),
+                  on_stage_done: Optional[Callable[[Stage, int, int], None]] = None) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Returns (artifacts, failed_stage_names). Optional stages that raise
+        produce None and are reported in failed_stage_names.
+        """
+        loop = asyncio.get_running_loop()
+        artifacts = dict(artifacts)
+        pending = self.needed_stages(artifacts, targets)
+        total = len(pending)
+        finished = 0
+        failed: List[str] = []
+        running: Dict[asyncio.Task, Stage] = {}
+
+        def store(stage: Stage, value):
+            if value is None and stage.required:
+                raise ValueError(f"{stage.label} failed")
+            if len(stage.outputs) == 1:
+                artifacts[stage.outputs[0]] = value
+            else:
+                values = value if value is not None else (None,) * len(stage.outputs)
+                artifacts.update(zip(stage.outputs, values))
+
+        async def execute(stage: Stage, args):
+            start = time.perf_counter()
+            if stage.executor == "async":
+                value = await stage.func(*args)
+            elif stage.executor == "inline":
+                value = stage.func(*args)
+            else:
+                executor = cpu_executor if stage.executor == "process" else None
+                value = await loop.run_in_executor(executor, stage.func, *args)
+            logging.info(f"    -> {stage.label} took {time.perf_counter() - start:.2f}s")
+            return value
+
+        try:
+            while pending or running:
+                # Start (or skip) everything that is ready, longest critical path first
+                started = True
+                while started:
+                    started = False
+                    ready = [s for s in pending if all(i in artifacts for i in s.inputs)]
+                    for stage in sorted(ready, key=lambda s: -self.priority[s.name]):
+                        pending.remove(stage)
+                        args = [artifacts[i] for i in stage.inputs]
+                        if (stage.when and not stage.when(artifacts)) or any(a is None for a in args):
+                            store(stage, None)
+                            finished += 1
+                            if on_stage_done:
+                                on_stage_done(stage, finished, total)
+                            started = True  # Its (None) outputs may make more stages ready
+                            continue
+                        running[asyncio.create_task(execute(stage, args))] = stage
+
+                if not running:
+                    if pending:
+                        raise RuntimeError(f"Unresolvable stage inputs: {[s.name for s in pending]}")
+                    break
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    try:
+                        value = task.result()
+                    except Exception as e:
+                        if stage.required:
+                            raise
+                        logging.error(f"Stage {stage.label} failed: {e}")
+                        failed.append(stage.name)
+                        value = None
+                    store(stage, value)
+                    finished += 1
+                    if on_stage_done:
+                        on_stage_done(stage, finished, total)
+        finally:
+            # Never leave work running when the pipeline aborts (the caller deletes the temp dir)
+            if running:
+                logging.info(f"Cleaning up {len(running)} pending stages...")
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return artifacts, failed
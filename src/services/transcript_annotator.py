@@ -0,0 +1,118 @@
+import os
+import re
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from ..models.text_annotations import TextAnnotations
+
+# spaCy model used for POS tags, lemmas and stop-word flags
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+# Whole sentences are grouped into chunks of at most this many characters for nlp.pipe
+SPACY_CHUNK_CHARS = int(os.getenv("SPACY_CHUNK_CHARS", "1000"))
+# Chunks per nlp.pipe batch
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "64"))
+
+# Components not needed for tags/lemmas; excluded (never loaded), since the parser and NER are most of the pipeline cost
+EXCLUDED_COMPONENTS = ["parser", "ner"]
+
+# End of a sentence: terminal punctuation followed by whitespace
+_SENTENCE_END = re.compile(r"[.!?]+\s+")
+# How far past the previous caption word the next one is looked for in the transcript
+CAPTION_SEARCH_CHARS = 64
+
+_nlp = None
+
+
+def get_nlp():
+    """The trimmed spaCy pipeline, loaded on first use and reused afterwards."""
+    global _nlp
+    if _nlp is None:
+        import spacy
+        start = time.perf_counter()
+        _nlp = spacy.load(SPACY_MODEL, exclude=EXCLUDED_COMPONENTS)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] [Annotator] Loaded {SPACY_MODEL} {_nlp.pipe_names} in {time.perf_counter() - start:.2f}s")
+    return _nlp
+
+
+def _sentence_chunks(text: str, max_chars: int = SPACY_CHUNK_CHARS) -> List[Tuple[int, int]]:
+    """
+    (start, end) character spans covering the text, each made of whole sentences
+    and at most max_chars long. A sentence longer than max_chars (e.g. an
+    unpunctuated transcript) is cut at the last whitespace before the limit.
+    """
+    chunks = []
+    start = 0
+    boundaries = [m.end() for m in _SENTENCE_END.finditer(text)] + [len(text)]
+    end = start
+    for boundary in boundaries:
+        if boundary - start <= max_chars:
+            end = boundary
+            continue
+        if end > start:
+            chunks.append((start, end))
+            start = end
+        # Cut over-long sentences at whitespace
+        while boundary - start > max_chars:
+            cut = text.rfind(" ", start + 1, start + max_chars)
+            cut = cut + 1 if cut > start else start + max_chars
+            chunks.append((start, cut))
+            start = cut
+        end = boundary
+    if end > start:
+        chunks.append((start, end))
+    return chunks
+
+
+def _caption_spans(text: str, captions: List[Dict]) -> Tuple[List[int], List[int], List[int]]:
+    """
+    (starts, ends, caption indexes) of the caption words found in the
+    transcript, searched in order. Words missing from the text are left out.
+    """
+    starts, ends, indexes = [], [], []
+    cursor = 0
+    for i, cap in enumerate(captions):
+        word = cap["text"] or ""
+        pos = text.find(word, cursor, cursor + CAPTION_SEARCH_CHARS + len(word)) if word else -1
+        if pos < 0:
+            continue
+        starts.append(pos)
+        ends.append(pos + len(word))
+        indexes.append(i)
+        cursor = pos + len(word)
+    return starts, ends, indexes
+
+
+def _align_to_captions(token_idx: List[int], text: str, captions: List[Dict]) -> List[int]:
+    """Index of the caption word whose span contains each token offset (-1 if none)."""
+    starts, ends, indexes = _caption_spans(text, captions)
+    word_index = []
+    for idx in token_idx:
+        j = bisect_right(starts, idx) - 1
+        word_index.append(indexes[j] if j >= 0 and idx < ends[j] else -1)
+    return word_index
+
+
+def annotate(text: str, captions: Optional[List[Dict]] = None) -> TextAnnotations:
+    """
+    Tags the transcript in sentence-sized chunks through nlp.pipe.
+    Token offsets refer to the full text; with captions, every token is
+    also mapped to the index of the caption word it belongs to.
+    """
+    nlp = get_nlp()
+    annotations = TextAnnotations(text=[], idx=[], lemma=[], pos=[], tag=[], is_stop=[])
+    spans = _sentence_chunks(text or "")
+    docs = nlp.pipe((text[start:end] for start, end in spans), batch_size=SPACY_BATCH_SIZE)
+    for (start, _), doc in zip(spans, docs):
+        for token in doc:
+            if token.is_space:
+                continue
+            annotations.text.append(token.text)
+            annotations.idx.append(start + token.idx)
+            annotations.lemma.append(token.lemma_)
+            annotations.pos.append(token.pos_)
+            annotations.tag.append(token.tag_)
+            annotations.is_stop.append(token.is_stop)
+    if captions is not None:
+        annotations.word_index = _align_to_captions(annotations.idx, text or "", captions)
+    return annotations
@@ -0,0 +1,62 @@
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+from ..utils.disk_cache import DiskCache
+
+
+class TranscriptCache:
+    """
+    Caches AssemblyAI transcripts keyed by the fingerprint of the decoded
+    audio (see AudioBuffer.fingerprint), so the same speech in a different
+    container or a re-upload never pays for the upload or transcription again.
+    Captions are stored column-wise, which avoids repeating the field names
+    for every word.
+    """
+
+    ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() == "true"
+    DIRECTORY = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "kalaam-cache", "transcripts"))
+    MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    # AssemblyAI output improves over time; don't serve a transcript forever
+    TTL_SECONDS = float(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+    CAPTION_FIELDS = ("text", "start", "end", "confidence")
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, enabled: Optional[bool] = None):
+        self.enabled = self.ENABLED if enabled is None else enabled
+        self.store = DiskCache(
+            directory or self.DIRECTORY,
+            max_bytes or self.MAX_BYTES,
+            ttl_seconds if ttl_seconds is not None else self.TTL_SECONDS,
+        ) if self.enabled else None
+
+    @classmethod
+    def pack_captions(cls, captions: List[Dict]) -> Dict[str, List]:
+        """[{text, start, end, confidence}, ...] -> {text: [...], start: [...], ...}"""
+        return {name: [c[name] for c in captions] for name in cls.CAPTION_FIELDS}
+
+    @classmethod
+    def unpack_captions(cls, columns: Dict[str, List]) -> List[Dict]:
+        return [dict(zip(cls.CAPTION_FIELDS, row)) for row in zip(*(columns[name] for name in cls.CAPTION_FIELDS))]
+
+    def load(self, key: str) -> Optional[Tuple[str, List[Dict]]]:
+        """Returns (transcript_text, captions) or None on a miss."""
+        if not self.enabled:
+            return None
+        try:
+            entry = self.store.get(key)
+        except Exception as e:
+            logging.warning(f"Transcript cache read failed: {e}")
+            return None
+        if entry is None:
+            return None
+        return entry["text"], self.unpack_captions(entry["captions"])
+
+    def save(self, key: str, text: str, captions: List[Dict]):
+        if not self.enabled:
+            return
+        try:
+            self.store.set(key, {"text": text, "captions": self.pack_captions(captions)})
+        except Exception as e:
+            logging.warning(f"Transcript cache write failed: {e}")
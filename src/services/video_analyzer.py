@@ -1,9 +1,9 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-import time
-from datetime import datetime
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional
+from .frame_source import FrameSource, SampledFrame
 
 # ---------------------------
 # Configurable Thresholds for Head Orientation
@@ -30,6 +30,9 @@ def _normalize_angle(angle: float) -> float:
     if angle < -90: angle += 180
     return angle
 
+EXPRESSION_LABELS = ["Smiling", "Laughing", "Angry", "Talking", "Neutral", "Calm", "NoFaceDetected"]
+POSTURE_LABELS = ["Confident", "Slouching", "Leaning", "Closed", "NoBodyDetected"]
+
 def _classify_direction(yaw: float, pitch: float, roll: float) -> str:
     if abs(yaw) < YAW_THRESHOLD and abs(pitch) < PITCH_THRESHOLD_DOWN and abs(roll) < ROLL_THRESHOLD:
         return "LookingAtCamera"
@@ -43,12 +46,46 @@ def _classify_direction(yaw: float, pitch: float, roll: float) -> str:
         return "TiltedLeft" if roll > 0 else "TiltedRight"
     return "NotLookingAtCamera"
 
+@dataclass
+class VideoAnalysisState:
+    """Per-frame accumulators; independent of the audience position"""
+    direction_counts: Dict[str, float] = field(default_factory=dict)
+    direction_timeline: List[Dict] = field(default_factory=list)
+    expression_counts: Dict[str, float] = field(default_factory=lambda: {k: 0.0 for k in EXPRESSION_LABELS})
+    expression_timeline: List[Dict] = field(default_factory=list)
+    posture_counts: Dict[str, float] = field(default_factory=lambda: {k: 0.0 for k in POSTURE_LABELS})
+    posture_timeline: List[Dict] = field(default_factory=list)
+    movement_history: List[float] = field(default_factory=list)
+    prev_landmarks: Optional[List] = None
+
+    def to_cache(self) -> Dict:
+        """JSON-safe accumulators (tracking history is not needed once the video is done)"""
+        return {
+            "direction_counts": self.direction_counts,
+            "direction_timeline": self.direction_timeline,
+            "expression_counts": self.expression_counts,
+            "expression_timeline": self.expression_timeline,
+            "posture_counts": self.posture_counts,
+            "posture_timeline": self.posture_timeline,
+        }
+
+    @classmethod
+    def from_cache(cls, data: Dict) -> "VideoAnalysisState":
+        return cls(**data)
+
+    def carry_over(self) -> "VideoAnalysisState":
+        """Fresh accumulators that keep the tracking history (used after a shard's warm-up)"""
+        return VideoAnalysisState(movement_history=list(self.movement_history), prev_landmarks=self.prev_landmarks)
+
 class VideoAnalyzer:
     """
     Combined analyzer for Head Direction (Eye Contact), Facial Expressions, and Posture.
     Reduces compute by processing both FaceMesh and Pose in the same loop.
     """
 
+    # Bump when the output for the same input changes (invalidates cached results)
+    VERSION = "1"
+
     def __init__(self):
         self.movement_history_window = 30
 
@@ -120,24 +157,93 @@ class VideoAnalyzer:
 
         return "Confident"
 
-    def analyze_video(self, video_path: str, sample_every_n_frames: int = 30, audience_position: str = "front") -> Dict:
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            time.sleep(0.5)
-            cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"Cannot open video file: {video_path}")
-
-        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        frame_duration = 1.0 / fps
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] [Combined] Starting analysis of {total_frames} frames (every {sample_every_n_frames})")
-
-        # Head data
-        good_contact_time = 0.0
-        not_looking_time = 0.0
-        direction_timeline = []
-        direction_counts = {}
+    @staticmethod
+    def create_face_mesh():
+        return mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=False,
+            max_num_faces=1,
+            refine_landmarks=True,
+            min_detection_confidence=0.5
+        )
+
+    @staticmethod
+    def create_pose():
+        # Shared with GestureAnalyzer when both run off the same frame stream
+        return mp.solutions.pose.Pose(
+            static_image_mode=False,
+            model_complexity=0,
+            smooth_landmarks=True,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+
+    def process_frame(self, state: VideoAnalysisState, frame: SampledFrame, face_results, pose_results, segment_duration: float):
+        """Accumulates head direction, expression and posture for one sampled frame."""
+        w, h = frame.width, frame.height
+        elapsed = frame.time
+
+        status = "NoFaceDetected"
+        expression = "NoFaceDetected"
+        yaw = pitch = roll = 0.0
+        avg_movement = 0.0
+        posture = "NoBodyDetected"
+
+        if face_results.multi_face_landmarks:
+            lms = face_results.multi_face_landmarks[0].landmark
+            points = self._get_points(lms, w, h)
+            
+            # 1. Head Direction (PnP)
+            image_points = np.array([(lms[idx].x * w, lms[idx].y * h) for idx in LANDMARK_IDS], dtype=np.float64)
+            focal_length = float(w)
+            cam_matrix = np.array([[focal_length, 0, w / 2], [0, focal_length, h / 2], [0, 0, 1]], dtype=np.float64)
+            success, rvec, tvec = cv2.solvePnP(MODEL_POINTS, image_points, cam_matrix, np.zeros((4, 1)))
+            if success:
+                rmat, _ = cv2.Rodrigues(rvec)
+                _, _, _, _, _, _, euler = cv2.decomposeProjectionMatrix(np.hstack((rmat, tvec)))
+                pitch, yaw, roll = [_normalize_angle(float(x)) for x in euler]
+                status = _classify_direction(yaw, pitch, roll)
+
+            # 2. Expression
+            movement = self._facial_movement(state.prev_landmarks, points)
+            state.movement_history.append(movement)
+            if len(state.movement_history) > self.movement_history_window: state.movement_history.pop(0)
+            avg_movement = np.mean(state.movement_history)
+            expression = self._detect_expression(points, avg_movement)
+            state.prev_landmarks = points
+
+        # 3. Posture (from pose landmarks)
+        if pose_results.pose_landmarks:
+            posture = self._classify_posture(pose_results.pose_landmarks.landmark, w, h)
+
+        # Accumulate segment
+        state.direction_counts[status] = state.direction_counts.get(status, 0.0) + segment_duration
+        state.direction_timeline.append({"time": round(elapsed, 3), "status": status, "yaw": round(yaw, 2), "pitch": round(pitch, 2), "roll": round(roll, 2)})
+
+        state.expression_counts[expression] = state.expression_counts.get(expression, 0.0) + segment_duration
+        state.expression_timeline.append({"time": round(elapsed, 3), "expression": expression, "movement": round(float(avg_movement), 3)})
+
+        state.posture_counts[posture] = state.posture_counts.get(posture, 0.0) + segment_duration
+        state.posture_timeline.append({"time": round(elapsed, 3), "posture": posture})
+
+    @staticmethod
+    def merge_states(states: List[VideoAnalysisState]) -> VideoAnalysisState:
+        """Combines consecutive time shards, in order, into one state."""
+        merged = VideoAnalysisState()
+        for state in states:
+            for target, source in ((merged.direction_counts, state.direction_counts),
+                                   (merged.expression_counts, state.expression_counts),
+                                   (merged.posture_counts, state.posture_counts)):
+                for k, v in source.items():
+                    target[k] = target.get(k, 0.0) + v
+            merged.direction_timeline.extend(state.direction_timeline)
+            merged.expression_timeline.extend(state.expression_timeline)
+            merged.posture_timeline.extend(state.posture_timeline)
+            merged.movement_history = state.movement_history
+            merged.prev_landmarks = state.prev_landmarks
+        return merged
+
+    def summarize(self, state: VideoAnalysisState, audience_position: str = "front") -> Dict:
+        """Builds the head/expression/posture report. Only eye contact depends on the audience position."""
         good_statuses = {"LookingAtCamera"}
         if audience_position == "left": good_statuses.add("LookingLeft")
         elif audience_position == "right": good_statuses.add("LookingRight")
@@ -145,107 +251,14 @@ class VideoAnalyzer:
             good_statuses.add("LookingLeft")
             good_statuses.add("LookingRight")
 
-        # Expression data
-        expression_counts = {k: 0.0 for k in ["Smiling", "Laughing", "Angry", "Talking", "Neutral", "Calm", "NoFaceDetected"]}
-        expression_timeline = []
-        movement_history = []
-        prev_landmarks = None
-        
-        # Posture data
-        posture_counts = {k: 0.0 for k in ["Confident", "Slouching", "Leaning", "Closed", "NoBodyDetected"]}
-        posture_timeline = []
-        
-        frame_index = 0
-
-        with mp.solutions.face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5
-        ) as face_mesh:
-
-            with mp.solutions.pose.Pose(
-                static_image_mode=False,
-                model_complexity=0,
-                smooth_landmarks=True,
-                min_detection_confidence=0.5
-            ) as pose:
-
-                while frame_index < total_frames:
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-                    ret, frame = cap.read()
-                    if not ret: break
-
-                    elapsed = frame_index * frame_duration
-                    if frame_index % 100 == 0:
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] [Combined] Processing frame {frame_index}/{total_frames}...")
-
-                    h, w = frame.shape[:2]
-                    max_dim = 640
-                    if w > max_dim or h > max_dim:
-                        scale = max_dim / max(w, h)
-                        frame = cv2.resize(frame, (int(w * scale), int(h * scale)))
-                        h, w = frame.shape[:2]
-
-                    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    results = face_mesh.process(rgb)
-                    pose_results = pose.process(rgb)
-
-                    status = "NoFaceDetected"
-                    expression = "NoFaceDetected"
-                    yaw = pitch = roll = 0.0
-                    avg_movement = 0.0
-                    posture = "NoBodyDetected"
-
-                    if results.multi_face_landmarks:
-                        lms = results.multi_face_landmarks[0].landmark
-                        points = self._get_points(lms, w, h)
-                        
-                        # 1. Head Direction (PnP)
-                        image_points = np.array([(lms[idx].x * w, lms[idx].y * h) for idx in LANDMARK_IDS], dtype=np.float64)
-                        focal_length = float(w)
-                        cam_matrix = np.array([[focal_length, 0, w / 2], [0, focal_length, h / 2], [0, 0, 1]], dtype=np.float64)
-                        success, rvec, tvec = cv2.solvePnP(MODEL_POINTS, image_points, cam_matrix, np.zeros((4, 1)))
-                        if success:
-                            rmat, _ = cv2.Rodrigues(rvec)
-                            _, _, _, _, _, _, euler = cv2.decomposeProjectionMatrix(np.hstack((rmat, tvec)))
-                            pitch, yaw, roll = [_normalize_angle(float(x)) for x in euler]
-                            status = _classify_direction(yaw, pitch, roll)
-
-                        # 2. Expression
-                        movement = self._facial_movement(prev_landmarks, points)
-                        movement_history.append(movement)
-                        if len(movement_history) > self.movement_history_window: movement_history.pop(0)
-                        avg_movement = np.mean(movement_history)
-                        expression = self._detect_expression(points, avg_movement)
-                        prev_landmarks = points
-
-                    # 3. Posture (from pose landmarks)
-                    if pose_results.pose_landmarks:
-                        posture = self._classify_posture(pose_results.pose_landmarks.landmark, w, h)
-
-                    # Accumulate segment
-                    segment_duration = sample_every_n_frames * frame_duration
-                    if status in good_statuses: good_contact_time += segment_duration
-                    else: not_looking_time += segment_duration
-                    direction_counts[status] = direction_counts.get(status, 0.0) + segment_duration
-                    direction_timeline.append({"time": round(elapsed, 3), "status": status, "yaw": round(yaw, 2), "pitch": round(pitch, 2), "roll": round(roll, 2)})
-
-                    expression_counts[expression] = expression_counts.get(expression, 0.0) + segment_duration
-                    expression_timeline.append({"time": round(elapsed, 3), "expression": expression, "movement": round(float(avg_movement), 3)})
-
-                    posture_counts[posture] = posture_counts.get(posture, 0.0) + segment_duration
-                    posture_timeline.append({"time": round(elapsed, 3), "posture": posture})
-
-                    frame_index += sample_every_n_frames
-
-        cap.release()
+        good_contact_time = sum(s for d, s in state.direction_counts.items() if d in good_statuses)
+        not_looking_time = sum(s for d, s in state.direction_counts.items() if d not in good_statuses)
         total_time_calc = good_contact_time + not_looking_time
         
         # Breakdown calcs
-        head_breakdown = {d: round((s / total_time_calc) * 100, 2) if total_time_calc > 0 else 0.0 for d, s in direction_counts.items()}
-        expr_breakdown = {e: round((s / total_time_calc) * 100, 2) if total_time_calc > 0 else 0.0 for e, s in expression_counts.items()}
-        posture_breakdown = {p: round((s / total_time_calc) * 100, 2) if total_time_calc > 0 else 0.0 for p, s in posture_counts.items()}
+        head_breakdown = {d: round((s / total_time_calc) * 100, 2) if total_time_calc > 0 else 0.0 for d, s in state.direction_counts.items()}
+        expr_breakdown = {e: round((s / total_time_calc) * 100, 2) if total_time_calc > 0 else 0.0 for e, s in state.expression_counts.items()}
+        posture_breakdown = {p: round((s / total_time_calc) * 100, 2) if total_time_calc > 0 else 0.0 for p, s in state.posture_counts.items()}
 
         return {
             "head": {
@@ -255,18 +268,31 @@ class VideoAnalyzer:
                 "total_time": round(total_time_calc, 2),
                 "percentage_looking": round((good_contact_time / total_time_calc * 100) if total_time_calc > 0 else 0.0, 2),
                 "direction_breakdown": head_breakdown,
-                "direction_timeline": direction_timeline
+                "direction_timeline": state.direction_timeline
             },
             "expression": {
                 "expression_breakdown": expr_breakdown,
-                "expression_counts": {k: round(v, 2) for k, v in expression_counts.items()},
-                "expression_timeline": expression_timeline,
+                "expression_counts": {k: round(v, 2) for k, v in state.expression_counts.items()},
+                "expression_timeline": state.expression_timeline,
                 "total_time": round(total_time_calc, 2)
             },
             "posture": {
                 "posture_breakdown": posture_breakdown,
-                "posture_counts": {k: round(v, 2) for k, v in posture_counts.items()},
-                "posture_timeline": posture_timeline,
+                "posture_counts": {k: round(v, 2) for k, v in state.posture_counts.items()},
+                "posture_timeline": state.posture_timeline,
                 "total_time": round(total_time_calc, 2)
             }
         }
+
+    def analyze_video(self, video_path: str, sample_every_n_frames: int = 30, audience_position: str = "front") -> Dict:
+        """
+        Standalone run over a video. When gestures are analyzed as well,
+        use VisualPipeline so both share a single decode and Pose pass.
+        """
+        state = VideoAnalysisState()
+        with FrameSource(video_path, sample_every_n_frames) as source, \
+                self.create_face_mesh() as face_mesh, self.create_pose() as pose:
+            for frame in source:
+                self.process_frame(state, frame, face_mesh.process(frame.rgb), pose.process(frame.rgb), source.segment_duration)
+
+        return self.summarize(state, audience_position)
@@ -0,0 +1,110 @@
+import os
+import cv2
+from typing import Dict, List, Optional, Tuple
+from .frame_source import FrameSource
+from .video_analyzer import VideoAnalyzer, VideoAnalysisState
+from .gesture_analyzer import GestureAnalyzer, GestureAnalysisState
+
+
+class VisualPipeline:
+    """
+    Single-pass visual analysis.
+    Each sampled frame is decoded and colour-converted once, and one Pose
+    inference result is shared between posture (VideoAnalyzer) and
+    gestures (GestureAnalyzer). FaceMesh and Hands run on the same RGB frame.
+
+    Long videos are split into time shards that run in separate worker
+    processes; the raw per-shard states are merged in order before the
+    reports are built.
+    """
+
+    # Shorter videos are not worth the extra warm-up and process overhead
+    MIN_SHARD_SECONDS = float(os.getenv("VIDEO_MIN_SHARD_SECONDS", "120"))
+    # Samples decoded before each shard and discarded, so MediaPipe tracking,
+    # the expression movement history and wrist motion start warm.
+    # Defaults to VideoAnalyzer's movement history window.
+    SHARD_OVERLAP_SAMPLES = int(os.getenv("VIDEO_SHARD_OVERLAP_SAMPLES", "30"))
+
+    def __init__(self, video_analyzer: VideoAnalyzer, gesture_analyzer: GestureAnalyzer):
+        self.video_analyzer = video_analyzer
+        self.gesture_analyzer = gesture_analyzer
+
+    def plan_shards(self, video_path: str, sample_every_n_frames: int = 30, max_shards: int = 1) -> List[Tuple[int, int]]:
+        """
+        Splits the timeline into up to max_shards [start_frame, end_frame) ranges.
+        Boundaries fall on the sampling grid so the merged timeline has
+        exactly the samples a single pass would produce.
+        """
+        cap = cv2.VideoCapture(video_path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        finally:
+            cap.release()
+
+        duration = total_frames / fps
+        n_shards = max(1, min(max_shards, int(duration // self.MIN_SHARD_SECONDS)))
+        total_samples = -(-total_frames // sample_every_n_frames)
+        samples_per_shard = -(-total_samples // n_shards)
+        frames_per_shard = max(1, samples_per_shard) * sample_every_n_frames
+
+        shards = []
+        for start in range(0, total_frames, frames_per_shard):
+            shards.append((start, min(start + frames_per_shard, total_frames)))
+        return shards or [(0, total_frames)]
+
+    def analyze_frames(self, video_path: str, sample_every_n_frames: int = 30,
+                       start_frame: int = 0, end_frame: Optional[int] = None) -> Tuple[VideoAnalysisState, GestureAnalysisState]:
+        """
+        Walks [start_frame, end_frame) once and returns the raw accumulators of both consumers.
+        Shards that don't start at 0 first replay SHARD_OVERLAP_SAMPLES earlier samples
+        to warm up tracking; those samples are not counted.
+        """
+        warmup_start = max(0, start_frame - self.SHARD_OVERLAP_SAMPLES * sample_every_n_frames)
+        warming_up = warmup_start < start_frame
+
+        video_state = VideoAnalysisState()
+        gesture_state = GestureAnalysisState()
+
+        with FrameSource(video_path, sample_every_n_frames, start_frame=warmup_start, end_frame=end_frame) as source, \
+                self.video_analyzer.create_face_mesh() as face_mesh, \
+                self.video_analyzer.create_pose() as pose, \
+                self.gesture_analyzer.create_hands() as hands:
+            for frame in source:
+                if warming_up and frame.index >= start_frame:
+                    video_state = video_state.carry_over()
+                    gesture_state = gesture_state.carry_over()
+                    warming_up = False
+
+                face_results = face_mesh.process(frame.rgb)
+                pose_results = pose.process(frame.rgb)
+                hand_results = hands.process(frame.rgb)
+
+                self.video_analyzer.process_frame(video_state, frame, face_results, pose_results, source.segment_duration)
+                self.gesture_analyzer.process_frame(gesture_state, frame, pose_results, hand_results)
+
+        if warming_up:
+            # Shard produced no frames of its own
+            video_state, gesture_state = VideoAnalysisState(), GestureAnalysisState()
+        return video_state, gesture_state
+
+    def merge(self, shard_states: List[Tuple[VideoAnalysisState, GestureAnalysisState]]) -> Tuple[VideoAnalysisState, GestureAnalysisState]:
+        """Merges shard results; the list must be in timeline order."""
+        return (
+            self.video_analyzer.merge_states([v for v, _ in shard_states]),
+            self.gesture_analyzer.merge_states([g for _, g in shard_states]),
+        )
+
+    def summarize(self, video_state: VideoAnalysisState, gesture_state: GestureAnalysisState, audience_position: str = "front") -> Dict:
+        """
+        Returns: {"video": head/expression/posture report, "gesture": gesture report}
+        """
+        return {
+            "video": self.video_analyzer.summarize(video_state, audience_position),
+            "gesture": self.gesture_analyzer.summarize(gesture_state),
+        }
+
+    def run(self, video_path: str, sample_every_n_frames: int = 30, audience_position: str = "front") -> Dict:
+        """Unsharded run in the calling process."""
+        video_state, gesture_state = self.analyze_frames(video_path, sample_every_n_frames)
+        return self.summarize(video_state, gesture_state, audience_position)
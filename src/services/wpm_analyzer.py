@@ -8,6 +8,9 @@ class WPMAnalyzer:
     just a single global average.
     """
     
+    # Bump when the output for the same input changes (invalidates cached results)
+    VERSION = "1"
+
     @staticmethod
     def calculate_wpm(captions: List[Dict], interval: int = 2) -> List[Dict]:
         """
@@ -0,0 +1,67 @@
+import os
+import numpy as np
+from typing import Iterator, Optional, Tuple
+
+# Recordings at least this long are analyzed block by block (bounded memory)
+AUDIO_STREAMING_MIN_SECONDS = float(os.getenv("AUDIO_STREAMING_MIN_SECONDS", "1800"))
+# Length of one block (at the source rate)
+AUDIO_STREAMING_BLOCK_SECONDS = float(os.getenv("AUDIO_STREAMING_BLOCK_SECONDS", "30"))
+
+
+def audio_info(audio_path: str, audio=None) -> Tuple[int, int]:
+    """(number of samples, sample rate) of the shared buffer or the file, without decoding it"""
+    if audio is not None:
+        return len(audio.samples), audio.sample_rate
+    import soundfile as sf
+    info = sf.info(audio_path)
+    return info.frames, info.samplerate
+
+
+def should_stream(audio_path: str, audio=None) -> bool:
+    """True when the recording is long enough to be analyzed block by block."""
+    try:
+        n_samples, sample_rate = audio_info(audio_path, audio)
+    except Exception:
+        # Not readable by soundfile (e.g. a compressed container): use the full decode
+        return False
+    return n_samples >= AUDIO_STREAMING_MIN_SECONDS * sample_rate
+
+
+def iter_blocks(audio_path: str, audio=None, block_samples: Optional[int] = None,
+                sample_rate: Optional[int] = None) -> Iterator[np.ndarray]:
+    """
+    Yields the signal as consecutive mono float32 blocks.
+
+    Reads views of the shared AudioBuffer when given, otherwise fixed-size
+    blocks of the file through soundfile, so at most one block is decoded
+    at a time. With sample_rate set, blocks are resampled on the fly with a
+    streaming soxr resampler (the same HQ filter librosa.resample uses).
+    block_samples is counted at the source rate.
+    """
+    _, source_rate = audio_info(audio_path, audio)
+    block_samples = block_samples or int(AUDIO_STREAMING_BLOCK_SECONDS * source_rate)
+
+    if audio is not None:
+        samples = audio.samples
+        blocks = (samples[i:i + block_samples] for i in range(0, len(samples), block_samples))
+    else:
+        import soundfile as sf
+        blocks = (
+            # Down-mix like librosa.load(mono=True)
+            np.mean(block, axis=1) if block.shape[1] > 1 else block[:, 0]
+            for block in sf.blocks(audio_path, blocksize=block_samples, dtype="float32", always_2d=True)
+        )
+
+    if sample_rate is None or int(sample_rate) == source_rate:
+        yield from blocks
+        return
+
+    import soxr
+    resampler = soxr.ResampleStream(source_rate, int(sample_rate), 1, dtype="float32", quality="HQ")
+    for block in blocks:
+        out = resampler.resample_chunk(np.ascontiguousarray(block, dtype=np.float32))
+        if len(out):
+            yield out
+    tail = resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+    if len(tail):
+        yield tail
@@ -0,0 +1,124 @@
+import gzip
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+import numpy as np
+from typing import Any, Optional
+
+
+def _json_default(value):
+    """Serializes NumPy scalars/arrays that analyzers may leave in their results"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class DiskCache:
+    """
+    Size-bounded, least-recently-used cache of JSON documents on local disk.
+    Entries are gzip-compressed files named after their key; a file's mtime
+    is its last access time, so eviction removes the oldest-used files first.
+    The creation time (TTL basis) is kept in the envelope and in the gzip
+    header, so eviction can expire entries without decompressing them.
+    Safe to share between processes: writes are atomic renames and a
+    vanished file is simply a miss.
+    """
+
+    SUFFIX = ".json.gz"
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.SUFFIX}")
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                envelope = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self.delete(key)
+            return None
+
+        if self._expired(envelope.get("created_at", 0), time.time()):
+            self.delete(key)
+            return None
+
+        # Touch: mtime doubles as the LRU timestamp
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return envelope.get("value")
+
+    def set(self, key: str, value: Any):
+        # Whole seconds: the gzip header's MTIME field holds the same value
+        created_at = int(time.time())
+        envelope = {"created_at": created_at, "value": value}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=created_at) as f:
+                f.write(json.dumps(envelope, default=_json_default, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    @staticmethod
+    def _created_at(path: str) -> float:
+        """Creation time from the gzip header (0 for an unreadable file, which expires it)."""
+        with open(path, "rb") as f:
+            header = f.read(8)
+        if len(header) < 8 or header[:2] != b"\x1f\x8b":
+            return 0
+        return struct.unpack("<I", header[4:8])[0]
+
+    def evict(self):
+        """Drops expired entries, then least-recently-used ones until under max_bytes."""
+        entries = []
+        now = time.time()
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(self.SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                    # Same basis as get(): creation time, not the LRU mtime
+                    expired = self.ttl_seconds is not None and self._expired(self._created_at(entry.path), now)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path, expired))
+
+        entries.sort()
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, path, expired in entries:
+            if total <= self.max_bytes and not expired:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
@@ -1,12 +1,41 @@
+import multiprocessing
 import os
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, wait
+
+# Pool size; 0 = min(cpu_count, 4)
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", "0"))
+# Replace a worker after this many tasks (0 = never) to cap leaked memory from
+# native libraries; recycling workers requires the "spawn" start method
+CPU_EXECUTOR_MAX_TASKS_PER_CHILD = int(os.getenv("CPU_EXECUTOR_MAX_TASKS_PER_CHILD", "0"))
+# Import librosa/Praat and load the MediaPipe graphs when a worker starts (spaCy is
+# not loaded here: transcript annotation runs in the main process, see transcript_annotator)
+CPU_EXECUTOR_WARMUP = os.getenv("CPU_EXECUTOR_WARMUP", "true").lower() == "true"
 
 # Global ProcessPoolExecutor for CPU-heavy tasks
 # Initialized lazily to avoid issues during module import in some environments
 _cpu_executor = None
 
+def get_cpu_worker_count() -> int:
+    return CPU_EXECUTOR_WORKERS or min(os.cpu_count() or 1, 4)
+
 def get_cpu_executor():
     global _cpu_executor
     if _cpu_executor is None:
-        _cpu_executor = ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, 4))
+        options = {}
+        if CPU_EXECUTOR_WARMUP:
+            from ..services.analysis_tasks import warm_up_worker
+            options["initializer"] = warm_up_worker
+        if CPU_EXECUTOR_MAX_TASKS_PER_CHILD > 0:
+            options["max_tasks_per_child"] = CPU_EXECUTOR_MAX_TASKS_PER_CHILD
+            options["mp_context"] = multiprocessing.get_context("spawn")
+        _cpu_executor = ProcessPoolExecutor(max_workers=get_cpu_worker_count(), **options)
     return _cpu_executor
+
+def prestart_cpu_executor():
+    """
+    Starts every pool worker now (running the warm-up initializer) instead
+    of on the first analysis. Blocks until all workers are up.
+    """
+    from ..services.analysis_tasks import worker_pid
+    executor = get_cpu_executor()
+    wait([executor.submit(worker_pid) for _ in range(get_cpu_worker_count())])
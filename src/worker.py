@@ -0,0 +1,57 @@
+"""
+Standalone analysis worker.
+
+    python -m src.worker
+
+Consumes queued analysis jobs (see services/job_queue.py) and runs them
+through the AnalysisOrchestrator, so the API tier only handles HTTP and
+never loads the ML models. Run any number of these, on any machine that
+shares the database and ANALYSIS_JOB_STORAGE_DIR with the API; set
+ANALYSIS_INPROCESS_WORKERS=0 on the API servers.
+"""
+import asyncio
+import logging
+import os
+import signal
+from .logging import configure_logging, LogLevels
+from .config.db import engine, Base
+from .controllers.analysis import AnalysisController
+from .services.job_worker import start_workers, stop_workers
+from .services.transcript_annotator import get_nlp
+from .utils.executors import prestart_cpu_executor
+
+configure_logging(LogLevels.info)
+
+# Jobs processed concurrently by this process (each one still fans out to the CPU pool)
+CONCURRENCY = int(os.getenv("ANALYSIS_WORKER_CONCURRENCY", "1"))
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    controller = AnalysisController()
+
+    # Load the analyzers and start the CPU pool (warm workers) before taking the first job
+    logging.info("Loading analysis models...")
+    _ = controller.orchestrator
+    await asyncio.to_thread(get_nlp)
+    await asyncio.to_thread(prestart_cpu_executor)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: Ctrl+C raises KeyboardInterrupt instead
+            pass
+
+    workers = start_workers(controller, CONCURRENCY)
+    logging.info(f"Analysis worker running with {CONCURRENCY} concurrent job(s)")
+    try:
+        await stop.wait()
+    finally:
+        await stop_workers(workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
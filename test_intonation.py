@@ -1,8 +1,6 @@
 import os
 import time
-import json
 import numpy as np
-import assemblyai as aai
 from typing import List, Dict, Tuple
 from dotenv import load_dotenv
 import subprocess
@@ -11,9 +9,12 @@ import sys
 # Add project root to path
 sys.path.append(os.getcwd())
 from src.services.intonation_analyzer import IntonationAnalyzer, _get_prosody_features
+from src.services.file_processing import FileProcessingService
+from src.services.transcript_cache import TranscriptCache
+from src.models.audio_buffer import AudioBuffer
 
 load_dotenv()
-aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
+file_service = FileProcessingService(os.getenv("ASSEMBLYAI_API_KEY"), transcript_cache=TranscriptCache())
 
 SAMPLES_DIR = "test_output"
 MEDIA_FILES = ["bad1.mp4", "bad2.mp4", "good1.mp4", "good3.mp4"]
@@ -30,31 +31,9 @@ def extract_audio_tmp(input_path):
     return output_path
 
 def transcribe_cached(wav_path):
-    cache_path = wav_path + ".json"
-    if os.path.exists(cache_path):
-        with open(cache_path, "r") as f:
-            return json.load(f)
-    
-    print(f"Transcribing {wav_path}...")
-    transcriber = aai.Transcriber()
-    # USE THE SAME CONFIG AS THE MAIN APP
-    config = aai.TranscriptionConfig(
-        punctuate=True, 
-        format_text=True, 
-        disfluencies=True,
-        speech_models=["universal-2"]
-    )
-    res = transcriber.transcribe(wav_path, config)
-    
-    data = {"text": res.text, "captions": []}
-    for w in res.words:
-        data["captions"].append({
-            "text": w.text, "start": w.start, "end": w.end, "confidence": w.confidence
-        })
-    
-    with open(cache_path, "w") as f:
-        json.dump(data, f)
-    return data
+    # Same config and transcript cache as the main app
+    text, captions = file_service.transcribe_with_cache(AudioBuffer.from_file(wav_path), wav_path)
+    return {"text": text, "captions": captions}
 
 def run_comparison():
     analyzer = IntonationAnalyzer()
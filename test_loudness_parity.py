@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import subprocess
+import numpy as np
+import pyloudnorm as pyln
+
+# Add project root to path
+sys.path.append(os.getcwd())
+from src.services.loudness_analyzer import LoudnessAnalyzer
+from src.models.audio_buffer import AudioBuffer
+
+SAMPLES_DIR = "test_output"
+MEDIA_FILES = ["bad1.mp4", "bad2.mp4", "good1.mp4", "good3.mp4"]
+# Synthetic fixtures: (name, seconds, sample rate); lengths include a partial last window
+SYNTHETIC = [("synth_short", 0.3, 16000), ("synth_30s", 30.7, 44100), ("synth_5min", 300.25, 48000), ("synth_20min", 1200.5, 48000)]
+# Maximum allowed difference (dB / LU) between the engines
+TOLERANCE = 1e-3
+
+def extract_audio_tmp(input_path):
+    output_path = input_path.replace(".mp4", ".wav")
+    if os.path.exists(output_path):
+        return output_path
+
+    print(f"Extracting {input_path}...")
+    subprocess.run([
+        "ffmpeg", "-i", input_path, "-q:a", "0", "-map", "a", "-y", output_path
+    ], check=True, capture_output=True)
+    return output_path
+
+def synthetic_speech(seconds, sr, seed=0):
+    """
+    Noise bursts with a slow level envelope and quiet gaps (exercises both gates).
+    The gaps keep a -80dB floor like a real microphone: exact digital zeros make
+    the IIR tails subnormal, which slows both engines alike and skews the timing.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    envelope = 0.3 * (1 + np.sin(2 * np.pi * 0.05 * t)) * (np.sin(2 * np.pi * 0.4 * t) > -0.5) + 1e-4
+    return (envelope * rng.standard_normal(len(t))).astype(np.float32)
+
+def reference_loudness(y, sr, interval_duration=1):
+    """The previous per-window engine: pyln.Meter.integrated_loudness on each segment"""
+    meter = pyln.Meter(sr)
+    duration = len(y) / sr
+    results = []
+    for i, start_time in enumerate(np.arange(0, duration, interval_duration)):
+        segment = y[int(start_time * sr):int(min((start_time + interval_duration) * sr, len(y)))]
+        if len(segment) == 0:
+            continue
+        rms = np.sqrt(np.mean(segment**2))
+        rms_db = float(20 * np.log10(rms)) if rms > 0 and np.isfinite(rms) else -96.0
+        try:
+            lufs = meter.integrated_loudness(segment)
+            lufs = float(lufs) if np.isfinite(lufs) else -70.0
+        except Exception:
+            lufs = -70.0
+        results.append({"interval": i + 1, "rms_db": rms_db, "lufs": lufs})
+    return results
+
+def load_fixtures():
+    fixtures = []
+    for media_file in MEDIA_FILES:
+        mp4_path = os.path.join(SAMPLES_DIR, media_file)
+        if not os.path.exists(mp4_path):
+            print(f"Skipping {mp4_path} - not found")
+            continue
+        fixtures.append((media_file, AudioBuffer.from_file(extract_audio_tmp(mp4_path))))
+    for name, seconds, sr in SYNTHETIC:
+        fixtures.append((name, AudioBuffer(synthetic_speech(seconds, sr), sr)))
+    return fixtures
+
+def run_comparison():
+    results = []
+    for name, audio in load_fixtures():
+        y, sr = audio.at_rate(None), audio.sample_rate
+
+        start = time.perf_counter()
+        expected = reference_loudness(y, sr)
+        reference_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = LoudnessAnalyzer.analyze_loudness("", 1, audio)["intervals"]
+        vectorized_time = time.perf_counter() - start
+
+        same_windows = [r["interval"] for r in expected] == [r["interval"] for r in actual]
+        rms_diff = max((abs(e["rms_db"] - a["rms_db"]) for e, a in zip(expected, actual)), default=0.0)
+        lufs_diff = max((abs(e["lufs"] - a["lufs"]) for e, a in zip(expected, actual)), default=0.0)
+        results.append({
+            "media": name,
+            "seconds": len(y) / sr,
+            "windows": len(actual),
+            "reference": reference_time,
+            "vectorized": vectorized_time,
+            "rms_diff": rms_diff,
+            "lufs_diff": lufs_diff,
+            "ok": same_windows and rms_diff <= TOLERANCE and lufs_diff <= TOLERANCE,
+        })
+
+    # Output Table
+    print("\n" + "="*110)
+    print(f"{'Media':<14} | {'Secs':<7} | {'Windows':<7} | {'Per-window (s)':<14} | {'Vectorized (s)':<14} | {'Speedup':<7} | {'Max dRMS':<9} | {'Max dLUFS':<9} | {'Parity':<6}")
+    print("-"*110)
+    for r in results:
+        speedup = r["reference"] / max(r["vectorized"], 1e-9)
+        print(f"{r['media']:<14} | {r['seconds']:<7.1f} | {r['windows']:<7} | {r['reference']:<14.3f} | {r['vectorized']:<14.3f} | "
+              f"{speedup:<7.1f} | {r['rms_diff']:<9.2e} | {r['lufs_diff']:<9.2e} | {'ok' if r['ok'] else 'FAIL':<6}")
+    print("="*110 + "\n")
+
+    if not all(r["ok"] for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    run_comparison()
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import subprocess
+import numpy as np
+import parselmouth
+
+# Add project root to path
+sys.path.append(os.getcwd())
+from src.services.intonation_analyzer import _intensity_at
+
+SAMPLES_DIR = "test_output"
+MEDIA_FILES = ["bad1.mp4", "bad2.mp4", "good1.mp4", "good3.mp4"]
+# Synthetic fixtures: (name, seconds, sample rate)
+SYNTHETIC = [("synth_short", 0.5, 16000), ("synth_1min", 60, 16000), ("synth_10min", 600, 16000)]
+# Maximum allowed difference in dB
+TOLERANCE = 1e-9
+
+def extract_audio_tmp(input_path):
+    output_path = input_path.replace(".mp4", ".wav")
+    if os.path.exists(output_path):
+        return output_path
+
+    print(f"Extracting {input_path}...")
+    subprocess.run([
+        "ffmpeg", "-i", input_path, "-q:a", "0", "-map", "a", "-y", output_path
+    ], check=True, capture_output=True)
+    return output_path
+
+def synthetic_speech(seconds, sr, seed=0):
+    """Gliding harmonic 'voice' with pauses and a noise floor"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 140 + 40 * np.sin(2 * np.pi * 0.2 * t)
+    voiced = np.sin(2 * np.pi * np.cumsum(f0) / sr) * (np.sin(2 * np.pi * 1.5 * t) > -0.2)
+    return 0.3 * voiced + 0.01 * rng.standard_normal(len(t))
+
+def loop_alignment(intensity, times):
+    """The previous engine: one intensity.get_value call per pitch frame"""
+    energy = []
+    for t in times:
+        try:
+            val = intensity.get_value(t)
+            energy.append(val if not np.isnan(val) else 0.0)
+        except Exception:
+            energy.append(0.0)
+    return np.array(energy)
+
+def load_fixtures():
+    fixtures = []
+    for media_file in MEDIA_FILES:
+        mp4_path = os.path.join(SAMPLES_DIR, media_file)
+        if not os.path.exists(mp4_path):
+            print(f"Skipping {mp4_path} - not found")
+            continue
+        fixtures.append((media_file, parselmouth.Sound(extract_audio_tmp(mp4_path))))
+    for name, seconds, sr in SYNTHETIC:
+        fixtures.append((name, parselmouth.Sound(synthetic_speech(seconds, sr), sampling_frequency=sr)))
+    return fixtures
+
+def run_benchmark():
+    results = []
+    for name, snd in load_fixtures():
+        # Same analysis parameters as _get_prosody_features
+        pitch = snd.to_pitch(time_step=0.01, pitch_floor=75, pitch_ceiling=600)
+        intensity = snd.to_intensity(minimum_pitch=75, time_step=0.01)
+        times = pitch.xs()
+        # Also probe off-grid times and the domain edges
+        probes = np.concatenate([times, np.linspace(snd.xmin - 0.05, snd.xmax + 0.05, 997)])
+
+        start = time.perf_counter()
+        expected = loop_alignment(intensity, probes)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = _intensity_at(intensity, probes)
+        vectorized_time = time.perf_counter() - start
+
+        diff = float(np.max(np.abs(expected - actual))) if len(probes) else 0.0
+        results.append({
+            "media": name,
+            "frames": len(times),
+            "loop": loop_time,
+            "vectorized": vectorized_time,
+            "diff": diff,
+            "ok": diff <= TOLERANCE,
+        })
+
+    # Output Table
+    print("\n" + "="*90)
+    print(f"{'Media':<14} | {'Frames':<8} | {'get_value loop (s)':<18} | {'Vectorized (s)':<14} | {'Speedup':<8} | {'Max diff':<9} | {'Parity':<6}")
+    print("-"*90)
+    for r in results:
+        speedup = r["loop"] / max(r["vectorized"], 1e-9)
+        print(f"{r['media']:<14} | {r['frames']:<8} | {r['loop']:<18.4f} | {r['vectorized']:<14.4f} | {speedup:<8.0f} | {r['diff']:<9.2e} | {'ok' if r['ok'] else 'FAIL':<6}")
+    print("="*90 + "\n")
+
+    if not all(r["ok"] for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    run_benchmark()